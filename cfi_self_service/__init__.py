@@ -4,6 +4,7 @@ import logging
 import secrets
 from pyramid.config import Configurator
 from pyramid.session import SignedCookieSessionFactory
+from cfi_self_service.backend.aws.clients import configure_client_registry
 
 # Create and configure a logger instance:
 logger = logging.getLogger(__name__)
@@ -23,13 +24,16 @@ def main(global_config, **settings):
         callable: A callable representing the Pyramid WSGI application.
     Note:
         - The function creates a Configurator instance to configure the Pyramid application.
+        - The shared AWS client registry is sized from the waitress thread count in the ini file.
         - It sets up the session factory using SignedCookieSessionFactory with a randomly generated secret key.
-        - It includes necessary components such as the Jinja2 engine and application routes.
+        - It includes necessary components such as the Jinja2 engine, the request services and application routes.
         - The config.scan() method scans the project for additional configuration and views.
     """
 
     # Log an info message stating that the app has started:
     logger.info('Application has been started successfully.')
+    # Size the shared AWS client connection pools to the waitress thread count:
+    configure_client_registry(global_config, settings)
     # Generate a random secret key for session encryption:
     secret_key = secrets.token_hex(32)
     # Setup the session factory with the generated secret key:
@@ -40,6 +44,8 @@ def main(global_config, **settings):
         config.set_session_factory(session_factory)
         # Include the Jinja2 templating engine:
         config.include('pyramid_jinja2')
+        # Include the request-scoped services shared by the decorator, views and layout:
+        config.include('cfi_self_service.backend.utilities.request_services')
         # Include application routes:
         config.include('.routes')
         # Scan the project for additional configuration and views:
@@ -0,0 +1,153 @@
+import configparser
+import logging
+import threading
+import boto3
+from botocore.config import Config
+from cfi_self_service.backend.aws.concurrency import fan_out_pool
+from cfi_self_service.backend.aws.resilience import install_resilience_hooks
+
+# Create and configure a logger instance:
+logger = logging.getLogger(__name__)
+
+# Waitress serves requests from a pool of four threads unless configured otherwise:
+DEFAULT_WAITRESS_THREADS = 4
+
+class ClientRegistry:
+
+    def __init__(self, threads=DEFAULT_WAITRESS_THREADS, connect_timeout=2, read_timeout=5, max_attempts=3):
+
+        """
+        Summary:
+            A process-wide, thread-safe registry of boto3 clients and resources.
+            Each client is created once per (service, region) pair and shared by every request thread,
+            so service models are loaded once and connections are reused from a single pool instead of
+            opening a new pool (and TLS handshake) for every wrapper instance.
+        Args:
+            threads (int): The number of waitress worker threads that may use a client concurrently.
+            connect_timeout (int): The number of seconds to wait for a connection to be established.
+            read_timeout (int): The number of seconds to wait for a response once connected.
+            max_attempts (int): The maximum number of attempts botocore makes for each call.
+        Note:
+            - Every client is created with botocore's adaptive retry mode (jittered exponential backoff
+              with client-side rate limiting) and is put behind its service's circuit breaker.
+        """
+
+        self._lock = threading.Lock()
+        self._session = boto3.session.Session()
+        self._clients = {}
+        self._resources = {}
+        self.configure(threads, connect_timeout, read_timeout, max_attempts)
+
+    def configure(self, threads, connect_timeout, read_timeout, max_attempts=3):
+
+        """
+        Summary:
+            Sets the botocore configuration used for new clients and discards any existing ones.
+        Args:
+            threads (int): The number of waitress worker threads. The connection pool is sized so that
+                           every thread can hold a connection at the same time.
+            connect_timeout (int): The number of seconds to wait for a connection to be established.
+            read_timeout (int): The number of seconds to wait for a response once connected.
+            max_attempts (int): The maximum number of attempts botocore makes for each call.
+        """
+
+        with self._lock:
+            self.config = Config(
+                max_pool_connections=max(int(threads), 1) * 2,
+                tcp_keepalive=True,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                retries={'mode': 'adaptive', 'max_attempts': max_attempts}
+            )
+            self._clients.clear()
+            self._resources.clear()
+
+    def client(self, service_name, region_name):
+
+        """
+        Summary:
+            Returns the shared low-level client for a service and region, creating it on first use.
+        Args:
+            service_name (str): The AWS service name, e.g. 'secretsmanager'.
+            region_name (str): The AWS region of the service endpoint.
+        Returns:
+            botocore.client.BaseClient: The shared client.
+        """
+
+        key = (service_name, region_name)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._session.client(service_name, region_name=region_name, config=self.config)
+                    install_resilience_hooks(client, service_name)
+                    self._clients[key] = client
+        return client
+
+    def resource(self, service_name, region_name):
+
+        """
+        Summary:
+            Returns the shared service resource for a service and region, creating it on first use.
+        Args:
+            service_name (str): The AWS service name, e.g. 'dynamodb'.
+            region_name (str): The AWS region of the service endpoint.
+        Returns:
+            boto3.resources.base.ServiceResource: The shared resource.
+        Note:
+            - The resource is only used to build Table handles whose operations delegate to the
+              thread-safe low-level client, so it is shared across threads like the clients are.
+        """
+
+        key = (service_name, region_name)
+        resource = self._resources.get(key)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(key)
+                if resource is None:
+                    resource = self._session.resource(service_name, region_name=region_name, config=self.config)
+                    install_resilience_hooks(resource.meta.client, service_name)
+                    self._resources[key] = resource
+        return resource
+
+def waitress_threads(config_file):
+
+    """
+    Summary:
+        Reads the waitress worker thread count from the [server:main] section of an ini file.
+    Args:
+        config_file (str): The path to the PasteDeploy ini file.
+    Returns:
+        int: The configured thread count, or the waitress default when it is not set.
+    """
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(config_file)
+    return parser.getint('server:main', 'threads', fallback=DEFAULT_WAITRESS_THREADS)
+
+def configure_client_registry(global_config, settings):
+
+    """
+    Summary:
+        Sizes the shared client registry for the running application: its connection pools must serve
+        the waitress threads and the shared fan-out pool's workers at the same time.
+    Args:
+        global_config (dict): The global configuration settings from the PasteDeploy ini file.
+        settings (dict): The application settings.
+    """
+
+    threads = DEFAULT_WAITRESS_THREADS
+    if global_config.get('__file__'):
+        threads = waitress_threads(global_config['__file__'])
+    # Fan-out workers make AWS calls alongside the waitress threads, so they need connections too:
+    client_registry.configure(
+        threads + fan_out_pool.max_workers,
+        int(settings.get('aws.connect_timeout', 2)),
+        int(settings.get('aws.read_timeout', 5)),
+        int(settings.get('aws.max_attempts', 3))
+    )
+    logger.info('AWS client registry configured for %s waitress threads and %s fan-out workers.', threads, fan_out_pool.max_workers)
+
+# Shared registry used by every AWS wrapper in this process:
+client_registry = ClientRegistry()
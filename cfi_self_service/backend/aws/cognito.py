@@ -1,10 +1,76 @@
 
-import boto3
 import os
-import qrcode
-import uuid
-from pyramid.httpexceptions import HTTPFound, HTTPNotFound
+import threading
+import time
+import jwt
+from pyramid.httpexceptions import HTTPFound
 from pyramid.security import forget, remember
+from cfi_self_service.backend.aws.clients import client_registry
+from cfi_self_service.backend.aws.lookups import record_lookup
+from cfi_self_service.backend.aws.resilience import aws_error_response, is_transient_error
+from cfi_self_service.backend.security.token_store import refresh_token_store
+from cfi_self_service.backend.security.tokens import TokenVerifier, get_jwks_cache
+
+class AdminGroupCache:
+
+    def __init__(self, ttl_seconds):
+
+        """
+        Summary:
+            A process-wide cache of the email addresses in each Cognito group, used to decide admin
+            status when a token does not carry the cognito:groups claim.
+            Membership is held as a set for O(1) lookups. Once an entry is older than ttl_seconds it
+            is still served while a single background thread reloads it.
+        Args:
+            ttl_seconds (int): The number of seconds a group's membership is served before it is reloaded.
+        """
+
+        self.ttl_seconds = ttl_seconds
+        self._groups = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _refresh(self, key, load_members):
+        # Reload the group membership and record when it was loaded:
+        try:
+            members = load_members()
+            with self._lock:
+                self._groups[key] = (members, time.monotonic())
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def members(self, key, load_members):
+
+        """
+        Summary:
+            Returns the cached email addresses of a group, loading them on first use.
+        Args:
+            key (tuple): The (user_pool_id, group_name) pair identifying the group.
+            load_members (callable): A function returning the group's email addresses as a set.
+        Returns:
+            set: The lower-cased email addresses of the group's members.
+        """
+
+        with self._lock:
+            cached = self._groups.get(key)
+            stale = cached is not None and time.monotonic() - cached[1] >= self.ttl_seconds
+            start_refresh = stale and key not in self._refreshing
+            if start_refresh:
+                self._refreshing.add(key)
+        if cached is None:
+            # Nothing to serve yet, so load the membership synchronously:
+            members = load_members()
+            with self._lock:
+                self._groups[key] = (members, time.monotonic())
+            return members
+        if start_refresh:
+            # Serve the stale membership while it is reloaded in the background:
+            threading.Thread(target=self._refresh, args=(key, load_members), daemon=True).start()
+        return cached[0]
+
+# Shared group membership cache used by every Cognito instance in this process:
+admin_group_cache = AdminGroupCache(ttl_seconds=int(os.environ.get('COGNITO_ADMIN_GROUP_CACHE_TTL_SECONDS', 300)))
 
 class Cognito:
 
@@ -24,14 +90,15 @@ class Cognito:
         Note:
             - The user_pool_id, client_id, and region_name parameters are required for the instance to 
             interact with Amazon Cognito.
-            - The boto3 library is used to create a client for interacting with the Cognito service in 
-            the specified region.
+            - The shared Cognito client for the specified region is taken from the process-wide client
+            registry rather than created per instance.
         """
 
+        record_lookup('cognito')
         self.user_pool_id = user_pool_id
         self.client_id = client_id
         self.region_name = region_name
-        self.cognito_client = boto3.client('cognito-idp', region_name=self.region_name)
+        self.cognito_client = client_registry.client('cognito-idp', self.region_name)
 
     def check_cognito_authentication(self, request):
 
@@ -42,19 +109,111 @@ class Cognito:
             request (Request): The Pyramid request object.
         Returns:
             bool: True if the access token is valid and the user is authenticated, False otherwise.
+        Note:
+            - The access token is renewed first if it is close to expiry (see renew_session_tokens).
+            - When COGNITO_AUTHENTICATION_MODE is 'local' the token is verified in-process against the
+              user pool's signing keys; otherwise a remote get_user call is made on every request.
         """
 
         try:
+            self.renew_session_tokens(request)
+            if os.environ.get('COGNITO_AUTHENTICATION_MODE', 'remote') == 'local':
+                return self.check_local_authentication(request)
             # Attempt to retrieve user information from Cognito using the access token:
             self.cognito_client.get_user(
                 AccessToken=request.session['access_token']
             )
             # If the response is successful, the user is authenticated:
             return True
-        except Exception:
+        except Exception as e:
+            # Throttling and timeouts say nothing about the token, so don't log the user out for them:
+            if is_transient_error(e):
+                raise aws_error_response(e) from e
             # If an exception occurs (e.g., access token is invalid), the user is not authenticated:
             return False
 
+    def check_local_authentication(self, request):
+
+        """
+        Summary:
+            Check if the user is authenticated by verifying the access token locally.
+            The token's signature, expiry, issuer, client ID and token use are checked against the
+            cached JWKS of the user pool, which is loaded from COGNITO_JWKS_FILE when set and from
+            COGNITO_JWKS_URL (defaulting to the user pool's well-known JWKS URL) otherwise.
+        Args:
+            request (Request): The Pyramid request object.
+        Returns:
+            bool: True if the access token is valid.
+        Raises:
+            Exception: If the access token is missing, invalid, or rejected by the remote check.
+            KeySetUnavailableError: If the signing keys could not be downloaded, which
+                                    check_cognito_authentication reports as a 503 rather than a logout.
+        Note:
+            - When COGNITO_REMOTE_CHECK_INTERVAL_MINUTES is set, a remote get_user call is also made
+              once per interval for each session, so that revoked tokens are still picked up.
+        """
+
+        # Verify the access token against the user pool's signing keys:
+        default_jwks_url = f"https://cognito-idp.{self.region_name}.amazonaws.com/{self.user_pool_id}/.well-known/jwks.json"
+        jwks_cache = get_jwks_cache(os.environ.get('COGNITO_JWKS_URL', default_jwks_url), os.environ.get('COGNITO_JWKS_FILE'))
+        token_verifier = TokenVerifier(self.region_name, self.user_pool_id, self.client_id, jwks_cache)
+        token_verifier.verify_access_token(request.session['access_token'])
+        # Periodically confirm the token with Cognito if a remote check interval is configured:
+        remote_check_interval = int(os.environ.get('COGNITO_REMOTE_CHECK_INTERVAL_MINUTES', 0)) * 60
+        if remote_check_interval > 0:
+            if time.time() - request.session.get('remote_auth_checked_at', 0) >= remote_check_interval:
+                self.cognito_client.get_user(
+                    AccessToken=request.session['access_token']
+                )
+                request.session['remote_auth_checked_at'] = time.time()
+        return True
+
+    def renew_session_tokens(self, request):
+
+        """
+        Summary:
+            Renews the session's access token with its server-side refresh token when it is close to expiry.
+            Once fewer than COGNITO_ACCESS_TOKEN_RENEWAL_MARGIN_SECONDS remain, a REFRESH_TOKEN_AUTH call
+            issues a new access token, so an expired token no longer forces a full login and MFA.
+        Args:
+            request (Request): The Pyramid request object.
+        Note:
+            - Renewal holds the lock of the session's token store entry and re-checks the expiry, so
+              concurrent requests from one session refresh only once and then adopt the new token.
+            - Sessions without a stored refresh token (e.g. from another instance) are left unchanged.
+        """
+
+        token_session_id = request.session.get('token_session_id')
+        entry = refresh_token_store.get(token_session_id)
+        if entry is None:
+            return
+        renewal_margin = int(os.environ.get('COGNITO_ACCESS_TOKEN_RENEWAL_MARGIN_SECONDS', 300))
+        if entry['expires_at'] - time.time() <= renewal_margin:
+            with entry['lock']:
+                # Another request may have renewed the token while this one waited for the lock:
+                if entry['expires_at'] - time.time() <= renewal_margin:
+                    try:
+                        response = self.cognito_client.initiate_auth(
+                            AuthFlow='REFRESH_TOKEN_AUTH',
+                            AuthParameters={
+                                'REFRESH_TOKEN': entry['refresh_token']
+                            },
+                            ClientId=self.client_id
+                        )
+                    except Exception as e:
+                        print("renew_session_tokens - an error occurred - ", e)
+                        # Keep the refresh token if Cognito is only throttling or unavailable:
+                        if is_transient_error(e):
+                            return
+                        # The refresh token has been revoked or has expired, so a full login is needed:
+                        refresh_token_store.discard(token_session_id)
+                        return
+                    entry['access_token'] = response["AuthenticationResult"]["AccessToken"]
+                    entry['expires_at'] = time.time() + response["AuthenticationResult"]["ExpiresIn"]
+        # Use the latest access token issued for the session:
+        if request.session.get('access_token') != entry['access_token']:
+            request.session['access_token'] = entry['access_token']
+
     ##############################################################################################################
     ##############################################################################################################
     ##############################################################################################################
@@ -64,37 +223,85 @@ class Cognito:
         """
         Summary:
             Lists users in a specified group within an AWS Cognito User Pool.
-            This method uses the AWS Cognito `list_users_in_group` API to retrieve a list
-            of users that are members of the specified group within the associated User Pool.
+            This method pages through the AWS Cognito `list_users_in_group` API to retrieve every
+            user that is a member of the specified group within the associated User Pool.
+        Returns:
+            dict: A dictionary with a 'Users' key holding every member of the group.
         """
 
         try:
-            response = self.cognito_client.list_users_in_group(
-                UserPoolId=self.user_pool_id,
-                GroupName=group_name,
-                Limit=10
-            )
-            return response
+            users = []
+            paginator = self.cognito_client.get_paginator('list_users_in_group')
+            for page in paginator.paginate(UserPoolId=self.user_pool_id, GroupName=group_name):
+                users.extend(page.get('Users', []))
+            return {'Users': users}
         except Exception as e:
             # Handle general exceptions gracefully:
             print("list_users_in_group - an error occurred - ", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
 
-    def check_user_is_admin(self, admin_group, username):
+    def get_group_emails(self, group_name):
+
+        """
+        Summary:
+            Returns the email addresses of a group's members from the process-wide group cache.
+        Args:
+            group_name (str): The name of the Cognito group.
+        Returns:
+            set: The lower-cased email addresses of the group's members.
+        """
+
+        def load_members():
+            # Collect the email attribute of every member of the group:
+            emails = set()
+            for user in self.list_users_in_group(group_name)['Users']:
+                for attribute in user.get('Attributes', []):
+                    if attribute.get('Name') == 'email':
+                        emails.add(attribute.get('Value', '').lower())
+            return emails
+
+        return admin_group_cache.members((self.user_pool_id, group_name), load_members)
+
+    def get_token_groups(self, token):
+
+        """
+        Summary:
+            Reads the cognito:groups claim from an ID or access token.
+        Args:
+            token (str): An encoded token returned by Cognito in an AuthenticationResult.
+        Returns:
+            list: The names of the groups the user belongs to, or None if the token has no groups claim.
+        Note:
+            - The signature is not verified because the token has just been received directly from
+              Cognito over TLS; tokens presented by the browser must be verified instead.
+        """
+
+        claims = jwt.decode(token, options={'verify_signature': False})
+        return claims.get('cognito:groups')
+
+    def check_user_is_admin(self, authentication_result, username):
 
         """
         Summary:
             Checks if a user is an admin by verifying their membership in the admin group.
-            This method iterates through the users in the provided admin group and checks
-            if the specified username (email) matches any of the users' email attributes.
-            If a match is found, the user is considered an admin.        
+            Membership is read from the cognito:groups claim of the ID or access token. If neither
+            token carries the claim, the user's email is looked up in the cached set of admin group
+            email addresses.
+        Args:
+            authentication_result (dict): The AuthenticationResult returned by Cognito.
+            username (str): The email address of the user.
+        Returns:
+            tuple: A (is_admin, groups) tuple, where groups is the list of groups from the token.
         """
 
-        for user in admin_group.get('Users', []):
-            for attribute in user.get('Attributes', []):
-                if attribute.get('Name') == 'email' and attribute.get('Value') == username:
-                    return True
-        return False
+        admin_group_name = os.environ.get("COGNITO_USER_POOL_ADMIN_GROUP_NAME")
+        for token_name in ('IdToken', 'AccessToken'):
+            if authentication_result.get(token_name):
+                groups = self.get_token_groups(authentication_result[token_name])
+                if groups is not None:
+                    return admin_group_name in groups, groups
+        # Fall back to the cached admin group membership:
+        return username.lower() in self.get_group_emails(admin_group_name), []
 
     ##############################################################################################################
     ##############################################################################################################
@@ -127,15 +334,89 @@ class Cognito:
         except self.cognito_client.exceptions.NotAuthorizedException as e:
             # If user is not authorized, authentication fails:
             print("authenticate_user - NotAuthorizedException - ", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
         except self.cognito_client.exceptions.UserNotFoundException as e:
             # If user is not found, authentication fails:
             print("authenticate_user - UserNotFoundException - ", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
         except Exception as e:
             # Handle general exceptions gracefully:
             print("authenticate_user - an error occurred - ", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
+
+    def handle_auth_challenge(self, request, response, username):
+
+        """
+        Summary:
+            Dispatches the next step of the login flow from a Cognito authentication response.
+            The challenge returned by initiate_auth (or by a previous challenge response) decides the
+            redirect, so no separate user lookup is needed before authenticating.
+        Args:
+            request (Request): The Pyramid request object representing the HTTP request.
+            response (dict): The response from initiate_auth or respond_to_auth_challenge.
+            username (str): The username of the user who is logging in.
+        Raises:
+            HTTPFound: A Pyramid HTTP exception redirecting to the page for the next step.
+        Note:
+            - NEW_PASSWORD_REQUIRED redirects to the forced password reset page.
+            - MFA_SETUP starts the software token association and redirects to the MFA setup page.
+            - SOFTWARE_TOKEN_MFA redirects to the MFA request page.
+            - A response without a challenge completes the login.
+        """
+
+        challenge_name = response.get("ChallengeName")
+        if challenge_name == 'NEW_PASSWORD_REQUIRED':
+            # Keep the challenge session so the new password can be set within the same auth flow:
+            request.session['session_key'] = response["Session"]
+            request.session['password_challenge'] = True
+            redirect_url = request.route_url('change-password-force')
+            raise HTTPFound(location=redirect_url)
+        elif challenge_name == 'MFA_SETUP':
+            # If MFA setup is required, initiate MFA setup process, including QR code generation:
+            self.challenge_mfa_setup(request, response, username)
+            redirect_url = request.route_url('mfa-setup')
+            raise HTTPFound(location=redirect_url)
+        elif challenge_name == 'SOFTWARE_TOKEN_MFA':
+            # If software token MFA is required, add session key and redirect to MFA request page:
+            request.session['session_key'] = response["Session"]
+            redirect_url = request.route_url('mfa-request')
+            raise HTTPFound(location=redirect_url)
+        elif "AuthenticationResult" not in response:
+            # Any other challenge is not supported, so return the user to the login page:
+            redirect_url = request.route_url('login')
+            raise HTTPFound(location=redirect_url)
+        # Cognito has returned tokens without a further challenge, so complete the login:
+        response.setdefault("ChallengeParameters", {})
+        self.handle_verify_successful_auth(request, response)
+
+    def challenge_new_password(self, request, username, new_password):
+
+        """
+        Summary:
+            Responds to the NEW_PASSWORD_REQUIRED challenge with the user's new password.
+        Args:
+            request (Request): The Pyramid request object representing the HTTP request.
+            username (str): The username of the user changing their password.
+            new_password (str): The new password to set for the user.
+        Returns:
+            dict: The respond_to_auth_challenge response, which holds the next challenge (if any).
+        """
+
+        try:
+            response = self.cognito_client.respond_to_auth_challenge(
+                ClientId=self.client_id,
+                Session=request.session.get('session_key'),
+                ChallengeName='NEW_PASSWORD_REQUIRED',
+                ChallengeResponses={
+                    'USERNAME': username,
+                    'NEW_PASSWORD': new_password
+                }
+            )
+            return response
+        except Exception as e:
+            # Handle any exceptions gracefully:
+            print("An error occurred during new password challenge:", e)
+            raise aws_error_response(e) from e
 
     def challenge_mfa_setup(self, request, response, username):
 
@@ -149,8 +430,8 @@ class Cognito:
             bool: True if the MFA setup process is initiated successfully, False otherwise.
         Example:
             This method is called when a user needs to set up multi-factor authentication
-            for the first time. It generates a QR code containing the TOTP secret and redirects the user
-            to the MFA setup page to complete the setup process.
+            for the first time. It stores the TOTP secret in the session so that the MFA setup page can
+            render the QR code in memory, and the user completes the setup process from there.
         """
 
         # Begin first-time setup of TOTP for MFA:
@@ -159,19 +440,13 @@ class Cognito:
             software_token_response = self.cognito_client.associate_software_token(
                 Session=session_key
             )
-            # Create QR Code for the user to add to the TOTP app:
-            qr_img = qrcode.make(f"otpauth://totp/{username}?secret={software_token_response['SecretCode']}")
-            qr_path = f"qr-{str(uuid.uuid4())}.png"
-            qr_img.save(f"cfi_self_service/frontend/assets/qr/{qr_path}")
-            # Add key values to the session:
-            request.session['qr_code_filename'] = qr_path
-            request.session['qr_code_path'] = f"/static/qr/{qr_path}"
+            # Add key values to the session (the QR code is rendered from the secret by the setup view):
             request.session['secret_code'] = software_token_response['SecretCode']
             request.session['session_key'] = software_token_response['Session']
         except Exception as e:
             # Handle any exceptions gracefully:
             print("An error occurred during software token association:", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
 
     def challenge_software_token_mfa(self, request):
 
@@ -212,7 +487,7 @@ class Cognito:
         except Exception as e:
             # Handle any exceptions gracefully:
             print("An error occurred during software token association:", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
 
     def handle_verify_successful_auth(self, request, response):
 
@@ -220,9 +495,10 @@ class Cognito:
         Summary:
             Handle successful authentication verification. This method processes the response from an 
             authentication challenge. If the challenge is successfully completed, it stores the access
-            token in the session, checks if the user is an admin, sets the admin status in the 
-            session, and redirects the user to the home page with the appropriate headers. If the 
-            challenge is not completed, it redirects the user to the login page.
+            token in the session, checks if the user is an admin from the token's group claims, sets 
+            the admin status and group membership in the session, and redirects the user to the home 
+            page with the appropriate headers. If the challenge is not completed, it redirects the user 
+            to the login page.
         Args:
             request: The current request object containing session and routing information.
             response: The response object from the authentication challenge containing the 
@@ -235,10 +511,17 @@ class Cognito:
         if response["ChallengeParameters"] == {}:
             # Store the access token in the session:
             request.session["access_token"] = response["AuthenticationResult"]["AccessToken"]
-            # Retrieve the admin group and check if the user is an admin:
-            admin_group = Cognito.list_users_in_group(self, os.environ.get("COGNITO_USER_POOL_ADMIN_GROUP_NAME"))
-            is_user_admin = Cognito.check_user_is_admin(self, admin_group, request.session["email_address"])
+            # Keep the refresh token on the server so the access token can be renewed before it expires:
+            if response["AuthenticationResult"].get("RefreshToken"):
+                request.session["token_session_id"] = refresh_token_store.add(
+                    response["AuthenticationResult"]["RefreshToken"],
+                    response["AuthenticationResult"]["AccessToken"],
+                    response["AuthenticationResult"].get("ExpiresIn", 3600)
+                )
+            # Check if the user is an admin from the token's group claims:
+            is_user_admin, user_groups = self.check_user_is_admin(response["AuthenticationResult"], request.session["email_address"])
             request.session["admin_user"] = is_user_admin
+            request.session["user_groups"] = user_groups
             # If challenge completed, create headers for authentication and redirect the user to the home page:
             headers = remember(request, response["AuthenticationResult"]["AccessToken"])
             redirect_url = request.route_url('home')
@@ -281,7 +564,7 @@ class Cognito:
         except Exception as e:
             # Log an error if verification fails:
             print("An error occurred:", e)
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
 
     def handle_mfa_user_preferences(self, username):
 
@@ -309,46 +592,7 @@ class Cognito:
         except Exception as e:
             # Log an error if setting MFA preferences fails
             print("An error occurred:", e)
-            raise HTTPNotFound from e
-
-    def check_force_password_change(self, username):
-
-        """
-        Summary:
-            Checks if a force password change is required for a user.
-        Args:
-            username (str): The username of the user to check.
-        Returns:
-            bool: True if a force password change is required, False otherwise.
-        Example:
-            This method is called when a user attempts to log in. It checks if the user's
-            status requires a password change, indicating that the user must change their password
-            before being able to log in.
-        Note:
-            - The method relies on the Amazon Cognito client to query user attributes.
-            - It handles the UserNotFoundException exception, returning False if the user is not found.
-            - General exceptions are caught and logged, returning False to indicate an error occurred.
-        """
-
-        try:
-            # Query user attributes from the user pool:
-            response = self.cognito_client.admin_get_user(
-                UserPoolId=self.user_pool_id,
-                Username=username
-            )
-            # Check if the user requires a password change:
-            user_attributes = response['UserStatus']
-            if user_attributes == 'FORCE_CHANGE_PASSWORD':
-                return True
-            return False
-        except self.cognito_client.exceptions.UserNotFoundException as e:
-            # If the user is not found, return False:
-            print("An error occurred - UserNotFound - ", e)
-            return False
-        except Exception as e:
-            # Handle general exceptions gracefully:
-            print("An error occurred - ", e)
-            return False
+            raise aws_error_response(e) from e
 
     def action_force_password_change(self, username, new_password):
 
@@ -0,0 +1,102 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from cfi_self_service.backend.aws.resilience import CallTimeoutError, aws_error_response
+
+class FanOutPool:
+
+    def __init__(self, max_workers, default_timeout):
+
+        """
+        Summary:
+            A process-wide, bounded thread pool that lets a view issue independent AWS calls in parallel,
+            so a page waits for its slowest call rather than for the sum of all of them.
+        Args:
+            max_workers (int): The number of calls that run at the same time across every request thread.
+            default_timeout (float): The number of seconds a call may take when no timeout is given for it.
+        Note:
+            - Calls made from inside a pool worker run inline, so a call that fans out again can never
+              wait on a pool that its own caller is occupying.
+            - A call that times out is left to finish in the background (a boto3 call cannot be
+              interrupted) and keeps its worker until then; its result is discarded. Calls that may run
+              for long, such as full table scans, should be given no timeout rather than a short one.
+        """
+
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fan-out')
+        self._worker = threading.local()
+
+    def _run(self, call, started):
+        # Record when a worker picked the call up, then mark the thread as a pool worker while it runs:
+        started['at'] = time.monotonic()
+        started['event'].set()
+        self._worker.active = True
+        try:
+            return call()
+        finally:
+            self._worker.active = False
+
+    def gather(self, calls, timeout=None, timeouts=None):
+
+        """
+        Summary:
+            Runs independent calls in parallel and waits for all of their results.
+        Args:
+            calls (dict): The calls to run, as zero-argument callables keyed by name.
+            timeout (float, optional): The number of seconds each call may take. Defaults to the pool's
+                                       default timeout.
+            timeouts (dict, optional): Timeouts for individual calls, keyed by name, overriding timeout.
+                                       A timeout of None lets the call run for as long as it takes,
+                                       e.g. for a full table scan.
+        Returns:
+            dict: The result of each call, keyed by the same names.
+        Raises:
+            HTTPServiceUnavailable: If a call does not finish within its timeout.
+            Exception: The exception raised by a call, once every call has finished or timed out.
+        Example:
+            results = fan_out_pool.gather({
+                'notifications': lambda: request.request_notifications,
+                'item': lambda: dynamodb_table.get_item(request_id)
+            })
+        Note:
+            - A call's timeout starts when a worker picks it up, so time spent waiting for a free worker
+              while the pool is busy is not counted against it.
+        """
+
+        timeout = self.default_timeout if timeout is None else timeout
+        timeouts = timeouts or {}
+        # Run the calls one after another when there is nothing to parallelise or this is a pool worker:
+        if len(calls) < 2 or getattr(self._worker, 'active', False):
+            return {name: call() for name, call in calls.items()}
+        # Run each call in a copy of the caller's context, so context variables (e.g. the request's
+        # recorded lookups) carry over to the worker:
+        started = {name: {'event': threading.Event()} for name in calls}
+        futures = {name: self._executor.submit(contextvars.copy_context().run, self._run, call, started[name]) for name, call in calls.items()}
+        results = {}
+        first_error = None
+        for name, future in futures.items():
+            call_timeout = timeouts[name] if name in timeouts else timeout
+            try:
+                if call_timeout is None:
+                    results[name] = future.result()
+                else:
+                    # Wait for a worker to pick the call up, then for the rest of its timeout:
+                    started[name]['event'].wait()
+                    remaining = call_timeout - (time.monotonic() - started[name]['at'])
+                    results[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                first_error = first_error or aws_error_response(CallTimeoutError(name, call_timeout))
+            except Exception as e:
+                first_error = first_error or e
+        if first_error is not None:
+            raise first_error
+        return results
+
+# Shared fan-out pool used by every view in this process:
+fan_out_pool = FanOutPool(
+    int(os.environ.get('FAN_OUT_MAX_WORKERS', 8)),
+    float(os.environ.get('FAN_OUT_TIMEOUT_SECONDS', 10))
+)
@@ -1,11 +1,400 @@
 
-import boto3
+import base64
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key, Attr
-from pyramid.httpexceptions import HTTPFound, HTTPNotFound
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from pyramid.httpexceptions import HTTPBadRequest
+from cfi_self_service.backend.aws.clients import client_registry
+from cfi_self_service.backend.aws.lookups import record_lookup
+from cfi_self_service.backend.aws.resilience import aws_error_response, transaction_cancellation_reasons
+from cfi_self_service.backend.models.cursor_page import CursorPage
+from cfi_self_service.backend.models.page import Page
+from cfi_self_service.backend.security.cursors import sign_cursor, verify_cursor
+from cfi_self_service.backend.utilities.access_requests import (
+    ACCESS_REQUEST_COUNTS_ID, ACCESS_REQUEST_RECORD_TYPE, ACCESS_REQUEST_STATUSES, EMAIL_STATUS_INDEX_NAME, ENVIRONMENT_DATE_INDEX_NAME,
+    NOTIFICATION_ATTRIBUTES, NOTIFICATIONS_INDEX_NAME, REQUEST_DATE_INDEX_NAME, STATUS_DATE_INDEX_NAME, count_changes, index_attributes,
+    index_key, index_key_names, status_counts_from_counters, INDEX_KEY_ATTRIBUTES, without_empty_index_keys
+)
+
+# Number of keys per BatchGetItem call (DynamoDB's limit), and the number of times unprocessed keys are requested:
+BATCH_GET_SIZE = 100
+BATCH_GET_ATTEMPTS = 5
+# Number of times a transactional write is attempted when the item changes between its read and write:
+TRANSACTION_ATTEMPTS = 3
+
+def indexes_enabled():
+
+    """
+    Summary:
+        Checks whether reads should use the access requests table's secondary indexes.
+    Returns:
+        bool: False if DYNAMO_DB_USE_INDEXES is set to 'false' (e.g. before the indexes have been
+              created with cfi_setup_access_requests_table), otherwise True.
+    """
+
+    return os.environ.get('DYNAMO_DB_USE_INDEXES', 'true').lower() != 'false'
+
+def encode_continuation_token(last_evaluated_key):
+
+    """
+    Summary:
+        Encodes a DynamoDB LastEvaluatedKey as an opaque, URL-safe continuation token.
+    Args:
+        last_evaluated_key (dict): The LastEvaluatedKey returned by a scan or query.
+    Returns:
+        str: The continuation token, or None if there is no key.
+    """
+
+    if not last_evaluated_key:
+        return None
+    serializer = TypeSerializer()
+    typed_key = {name: serializer.serialize(value) for name, value in last_evaluated_key.items()}
+    return base64.urlsafe_b64encode(json.dumps(typed_key, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def decode_continuation_token(continuation_token):
+
+    """
+    Summary:
+        Decodes a continuation token back into the ExclusiveStartKey it was created from.
+    Args:
+        continuation_token (str): A token created by encode_continuation_token.
+    Returns:
+        dict: The ExclusiveStartKey, or None if no token is given.
+    Raises:
+        HTTPBadRequest: If the token is not one created by encode_continuation_token.
+    """
+
+    if not continuation_token:
+        return None
+    deserializer = TypeDeserializer()
+    try:
+        typed_key = json.loads(base64.urlsafe_b64decode(continuation_token.encode('ascii')))
+        return {name: deserializer.deserialize(value) for name, value in typed_key.items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        print("Decoding continuation token - an error occurred - ", e)
+        raise HTTPBadRequest() from e
+
+def projection_parameters(attributes, expression_attribute_names=None):
+
+    """
+    Summary:
+        Builds a ProjectionExpression that reads only the given attributes. Every attribute is referred
+        to through a placeholder, as the access request attribute names contain hyphens.
+    Args:
+        attributes (list): The attributes to read, or None to read whole items.
+        expression_attribute_names (dict, optional): Placeholders already used by the request, which
+                                                     the projection placeholders are added to.
+    Returns:
+        dict: The ProjectionExpression and ExpressionAttributeNames parameters, or only the given
+              ExpressionAttributeNames (if any) when no attributes are given.
+    """
+
+    parameters = {}
+    expression_attribute_names = dict(expression_attribute_names or {})
+    if attributes:
+        placeholders = []
+        for index, attribute_name in enumerate(dict.fromkeys(attributes)):
+            expression_attribute_names[f'#p{index}'] = attribute_name
+            placeholders.append(f'#p{index}')
+        parameters['ProjectionExpression'] = ', '.join(placeholders)
+    if expression_attribute_names:
+        parameters['ExpressionAttributeNames'] = expression_attribute_names
+    return parameters
+
+def access_request_update_parameters(key, attributes, current_item=None):
+
+    """
+    Summary:
+        Builds the update_item parameters that set attributes of an access request, together with the
+        secondary index key attributes derived from them.
+    Args:
+        key (str): The Request-ID of the item to be updated.
+        attributes (dict): The attributes to set. A value of None removes the attribute.
+        current_item (dict, optional): The item as it was read before the update. Defaults to None.
+    Returns:
+        dict: The Key, UpdateExpression, ExpressionAttributeNames and ExpressionAttributeValues.
+    Note:
+        - Derived index key attributes given in attributes are set as given rather than derived again.
+    """
+
+    # Remove blank index key attributes rather than set them, then work out which derived index key
+    # attributes change along with the given attributes, keeping any the caller set explicitly:
+    attributes = without_empty_index_keys(attributes)
+    merged_item = dict(current_item or {}, **attributes)
+    derived = index_attributes(merged_item, changed_attributes=attributes.keys())
+    attributes = dict(attributes, **{name: value for name, value in derived.items() if name not in attributes})
+    # Build the update expression with placeholders for every attribute name and value:
+    set_clauses = []
+    remove_clauses = []
+    expression_attribute_names = {}
+    expression_attribute_values = {}
+    for index, (attribute_name, attribute_value) in enumerate(attributes.items()):
+        expression_attribute_names[f'#a{index}'] = attribute_name
+        if attribute_value is None:
+            remove_clauses.append(f'#a{index}')
+        else:
+            set_clauses.append(f'#a{index} = :v{index}')
+            expression_attribute_values[f':v{index}'] = attribute_value
+    update_expression = ''
+    if set_clauses:
+        update_expression += 'SET ' + ', '.join(set_clauses)
+    if remove_clauses:
+        update_expression += ' REMOVE ' + ', '.join(remove_clauses)
+    update_parameters = {
+        'Key': { 'Request-ID': key },
+        'UpdateExpression': update_expression.strip(),
+        'ExpressionAttributeNames': expression_attribute_names
+    }
+    if expression_attribute_values:
+        update_parameters['ExpressionAttributeValues'] = expression_attribute_values
+    return update_parameters
+
+def unchanged_count_condition(current_item):
+
+    """
+    Summary:
+        Builds a condition that an access request still exists with the status and environment it was
+        read with, so the aggregate counters are only changed against the version they were worked out from.
+    Args:
+        current_item (dict): The item as it was read.
+    Returns:
+        dict: The ConditionExpression with its ExpressionAttributeNames and, if it compares any values,
+              its ExpressionAttributeValues (which DynamoDB does not accept empty).
+    """
+
+    clauses = ['attribute_exists(#k)']
+    expression_attribute_names = {'#k': 'Request-ID'}
+    expression_attribute_values = {}
+    for index, attribute_name in enumerate(('access-status', 'access-environment')):
+        expression_attribute_names[f'#k{index}'] = attribute_name
+        if current_item.get(attribute_name) is None:
+            clauses.append(f'attribute_not_exists(#k{index})')
+        else:
+            clauses.append(f'#k{index} = :k{index}')
+            expression_attribute_values[f':k{index}'] = current_item[attribute_name]
+    condition_parameters = {
+        'ConditionExpression': ' AND '.join(clauses),
+        'ExpressionAttributeNames': expression_attribute_names
+    }
+    if expression_attribute_values:
+        condition_parameters['ExpressionAttributeValues'] = expression_attribute_values
+    return condition_parameters
+
+def is_transaction_conflict(error, condition_failures=True):
+
+    """
+    Summary:
+        Checks whether a transaction was cancelled because the item changed since it was read, or
+        because another transaction was writing it at the same time, in which case it can be retried.
+    Args:
+        error (Exception): The exception raised by transact_write_items.
+        condition_failures (bool, optional): Whether a failed condition counts as a conflict. Defaults to
+                                             True, for writes whose condition is checked against an item
+                                             that is read again before retrying.
+    Returns:
+        bool: True if the transaction should be retried (with a fresh read of the item, if it has one).
+    """
+
+    retryable_reasons = {'TransactionConflict', 'ConditionalCheckFailed'} if condition_failures else {'TransactionConflict'}
+    return bool(transaction_cancellation_reasons(error) & retryable_reasons)
+
+class CapacityRateLimiter:
+
+    def __init__(self, units_per_second):
+
+        """
+        Summary:
+            Limits the rate at which read or write capacity is consumed by one or more workers.
+        Args:
+            units_per_second (float): The capacity units that may be consumed per second.
+        """
+
+        self.units_per_second = units_per_second
+        self._available_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, units):
+
+        """
+        Summary:
+            Records consumed capacity and sleeps for as long as the rate requires.
+        Args:
+            units (float): The capacity units consumed by the last request.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._available_at = max(self._available_at, now) + units / self.units_per_second
+            delay = self._available_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+class AccessRequestCache:
+
+    def __init__(self, ttl_seconds, max_entries):
+
+        """
+        Summary:
+            A process-wide, thread-safe LRU cache of whole access request items, keyed by Request-ID,
+            so that moving back and forth between the dashboard and a record does not read it again.
+            Entries are served for ttl_seconds, and the least recently used entry is evicted once the
+            cache holds max_entries items.
+        Args:
+            ttl_seconds (int): The number of seconds a cached item is served. A value of 0 disables caching.
+            max_entries (int): The maximum number of items held in the cache.
+        Note:
+            - Writes made through this process update or invalidate their entries straight away; writes
+              made by other processes are picked up once an entry outlives the TTL.
+            - Every write takes the next number of a write sequence, so a read that started before the
+              write cannot store the item it read over the newer one. The sequence numbers of the
+              max_entries most recently written keys are remembered, independently of the entries, and
+              a read that started before the oldest forgotten write is not stored, so the bookkeeping
+              stays bounded without letting a stale read through.
+        """
+
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._sequence = 0
+        self._writes = OrderedDict()
+        self._forgotten_sequence = 0
+        self._metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+
+        """
+        Summary:
+            Looks up an access request in the cache.
+        Args:
+            key (str): The Request-ID of the item.
+        Returns:
+            tuple: An (item, generation) tuple. item is a copy of the cached item, or None on a miss, and
+                   generation, the current write sequence number, is passed to store() when the missed
+                   item has been read.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry['stored_at'] >= self.ttl_seconds:
+                # Drop the expired entry:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._metrics['misses'] += 1
+                return None, self._sequence
+            # Mark the entry as most recently used:
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+            return dict(entry['item']), self._sequence
+
+    def generation(self, key):
+
+        """
+        Summary:
+            Returns the current write sequence number, for a read that bypasses the lookup to pass to store().
+        Args:
+            key (str): The Request-ID of the item.
+        Returns:
+            int: The generation to pass to store().
+        """
+
+        with self._lock:
+            return self._sequence
+
+    def _record_write(self, key):
+        # Give the write the next sequence number and forget the oldest writes beyond max_entries
+        # (lock must be held by the caller):
+        self._sequence += 1
+        self._writes[key] = self._sequence
+        self._writes.move_to_end(key)
+        while len(self._writes) > self.max_entries:
+            _, forgotten_sequence = self._writes.popitem(last=False)
+            self._forgotten_sequence = max(self._forgotten_sequence, forgotten_sequence)
+
+    def store(self, key, item, generation=None):
+
+        """
+        Summary:
+            Stores an access request, evicting the least recently used entries if needed.
+        Args:
+            key (str): The Request-ID of the item.
+            item (dict): The whole item.
+            generation (int, optional): The generation returned by the lookup that preceded a read. The
+                item is not stored if the key has been written since. Defaults to None, for writes.
+        """
+
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation is None:
+                self._record_write(key)
+            elif self._writes.get(key, self._forgotten_sequence) > generation:
+                # The key was written, or may have been, after the read started:
+                return
+            self._entries[key] = {'item': dict(item), 'stored_at': time.monotonic()}
+            self._entries.move_to_end(key)
+            # Evict the least recently used items once the cache is full:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics['evictions'] += 1
+
+    def invalidate(self, key):
+
+        """
+        Summary:
+            Removes an access request from the cache so that the next read fetches it again.
+        Args:
+            key (str): The Request-ID of the item.
+        """
+
+        with self._lock:
+            self._record_write(key)
+            if self._entries.pop(key, None) is not None:
+                self._metrics['invalidations'] += 1
+
+    def clear(self):
+
+        """
+        Summary:
+            Removes every item from the cache and resets the metrics.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            # Forget every write, so reads that started before the clear are not stored:
+            self._writes.clear()
+            self._forgotten_sequence = self._sequence
+            self._metrics = dict.fromkeys(self._metrics, 0)
+
+    def metrics(self):
+
+        """
+        Summary:
+            Returns a snapshot of the cache counters.
+        Returns:
+            dict: The hits, misses, evictions and invalidations counts and the number of cached items.
+        """
+
+        with self._lock:
+            return dict(self._metrics, entries=len(self._entries))
+
+# Shared cache of access request items used by every DynamoDB instance in this process:
+access_request_cache = AccessRequestCache(
+    ttl_seconds=int(os.environ.get('ACCESS_REQUEST_CACHE_TTL_SECONDS', 30)),
+    max_entries=int(os.environ.get('ACCESS_REQUEST_CACHE_MAX_ENTRIES', 512))
+)
 
 class DynamoDB:
 
-    def __init__(self, region_name, table_name):
+    def __init__(self, region_name, table_name, cache=None):
 
         """
         Summary:
@@ -13,12 +402,19 @@ class DynamoDB:
         Args:
             table_name (str): The name of the DynamoDB table.
             region_name (str): The AWS region where the DynamoDB table is located.
+            cache (AccessRequestCache, optional): The cache single items are read through. Defaults to
+                                                  the process-wide access_request_cache.
         """
 
+        record_lookup(f'dynamodb:{table_name}')
         self.region_name = region_name
+        # Use the process-wide cache unless a specific one is provided:
+        self.cache = cache if cache is not None else access_request_cache
         self.table_name = table_name
-        self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
+        self.dynamodb = client_registry.resource('dynamodb', region_name)
         self.table = self.dynamodb.Table(table_name)
+        # Aggregate counts of the access requests are kept in step when a counts table is configured:
+        self.counts_table_name = os.environ.get('DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME')
 
     def create_item(self, item):
 
@@ -28,31 +424,127 @@ class DynamoDB:
         Args:
             item (dict): The item to be created in the DynamoDB table.
                          Should be a dictionary representing the item attributes.
+        Note:
+            - The attributes that key the item in the table's secondary indexes are added to it, and
+              index key attributes that are empty or None are left out of it.
+            - When a counts table is configured, the item is written in a transaction that also
+              adds it to the aggregate counters. As every create updates the same counters item,
+              concurrent creates can cancel each other, so a transaction cancelled by a conflict is
+              retried up to TRANSACTION_ATTEMPTS times.
+            - The written item is stored in the access request cache.
         """
 
-        try:
-            self.table.put_item(Item=item)
-        except Exception as e:
-            raise HTTPNotFound from e
+        # Leave out blank index key attributes and add the derived ones (None values keep the item out
+        # of sparse indexes):
+        item = {name: value for name, value in without_empty_index_keys(item).items() if value is not None or name not in INDEX_KEY_ATTRIBUTES}
+        for attribute_name, attribute_value in index_attributes(item).items():
+            if attribute_value is not None:
+                item[attribute_name] = attribute_value
+        for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+            try:
+                if self.counts_table_name:
+                    # Write the item and count it in the same transaction:
+                    self.transact_write([
+                        {'Put': {
+                            'TableName': self.table_name,
+                            'Item': item,
+                            'ConditionExpression': 'attribute_not_exists(#k)',
+                            'ExpressionAttributeNames': {'#k': 'Request-ID'}
+                        }},
+                        self.counter_update(count_changes(None, item))
+                    ])
+                else:
+                    self.table.put_item(Item=item)
+                break
+            except Exception as e:
+                # Only a clash with another transaction on the counters is retried, not an existing item:
+                if attempt == TRANSACTION_ATTEMPTS or not is_transaction_conflict(e, condition_failures=False):
+                    raise aws_error_response(e) from e
+                time.sleep(min(0.05 * 2 ** attempt, 1))
+        # Cache the item as it was written:
+        self.cache.store(item['Request-ID'], item)
 
-    def get_item(self, key):
+    def get_item(self, key, attributes=None, consistent_read=False):
 
         """
         Summary:
             Retrieves an item from the DynamoDB table based on the provided key.
         Args:
-            key (dict): The primary key of the item to be retrieved.
-                        Should be a dictionary representing the primary key attributes.
+            key (str): The Request-ID of the item to be retrieved.
+            attributes (list, optional): The attributes to read. Defaults to None (the whole item).
+            consistent_read (bool, optional): True for a strongly consistent read, which costs twice the
+                                              read units of the default eventually consistent one.
         Returns:
             dict: The retrieved item if found, otherwise None.
+        Note:
+            - Whole items are read through the access request cache. A cached item also serves projected
+              reads, while a strongly consistent read always goes to the table and refreshes the cache.
         """
 
+        if consistent_read:
+            cached_item, generation = None, self.cache.generation(key)
+        else:
+            cached_item, generation = self.cache.lookup(key)
+        if cached_item is not None:
+            if attributes:
+                return {name: cached_item[name] for name in attributes if name in cached_item}
+            return cached_item
         try:
-            response = self.table.query(KeyConditionExpression=Key('Request-ID').eq(key))
-            if response:
-                return response
+            item = self.table.get_item(
+                Key={ 'Request-ID': key },
+                ConsistentRead=consistent_read,
+                **projection_parameters(attributes)
+            ).get('Item')
         except Exception as e:
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
+        # Cache whole items only, unless the key was written while it was being read:
+        if item is not None and not attributes:
+            self.cache.store(key, item, generation)
+        return item
+
+    def batch_get_items(self, keys, attributes=None, consistent_read=False):
+
+        """
+        Summary:
+            Retrieves several items from the DynamoDB table with as few BatchGetItem calls as possible.
+        Args:
+            keys (list): The Request-IDs of the items to be retrieved.
+            attributes (list, optional): The attributes to read. Defaults to None (whole items).
+            consistent_read (bool, optional): True for strongly consistent reads. Defaults to False.
+        Returns:
+            list: The items that were found, in the order of their keys.
+        Note:
+            - Keys are requested BATCH_GET_SIZE at a time, and keys DynamoDB leaves unprocessed (e.g. when
+              throttled) are requested again with exponential backoff, up to BATCH_GET_ATTEMPTS times.
+        """
+
+        # Request-ID is always read, so that the items can be matched back to their keys:
+        if attributes:
+            attributes = ['Request-ID'] + list(attributes)
+        unique_keys = list(dict.fromkeys(keys))
+        items = {}
+        for start in range(0, len(unique_keys), BATCH_GET_SIZE):
+            request_items = {self.table_name: dict(
+                Keys=[{ 'Request-ID': key } for key in unique_keys[start:start + BATCH_GET_SIZE]],
+                ConsistentRead=consistent_read,
+                **projection_parameters(attributes)
+            )}
+            for attempt in range(1, BATCH_GET_ATTEMPTS + 1):
+                try:
+                    response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                except Exception as e:
+                    raise aws_error_response(e) from e
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    items[item['Request-ID']] = item
+                request_items = response.get('UnprocessedKeys')
+                if not request_items:
+                    break
+                if attempt == BATCH_GET_ATTEMPTS:
+                    # Keys are only left unprocessed when the table is throttling or at capacity:
+                    error = ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Keys were left unprocessed.'}}, 'BatchGetItem')
+                    raise aws_error_response(error) from error
+                time.sleep(min(0.05 * 2 ** attempt, 1))
+        return [items[key] for key in unique_keys if key in items]
 
     def update_item(self, key, update_expression, expression_attribute_names, expression_attribute_values):
     
@@ -67,16 +559,91 @@ class DynamoDB:
         """
 
         try:
-            self.table.update_item(
+            response = self.table.update_item(
                 Key={ 'Request-ID': key },
                 UpdateExpression=update_expression,
                 ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
+                ExpressionAttributeValues=expression_attribute_values,
+                ReturnValues='ALL_NEW'
             )
         except Exception as e:
-            raise HTTPNotFound from e
+            self.cache.invalidate(key)
+            raise aws_error_response(e) from e
+        # Cache the item as it is after the update:
+        self.cache.store(key, response['Attributes'])
+
+    def read_access_request(self, key):
+
+        """
+        Summary:
+            Reads the latest version of an access request with a strongly consistent read.
+        Args:
+            key (str): The Request-ID of the item.
+        Returns:
+            dict: The item, or None if it does not exist.
+        """
+
+        return self.get_item(key, consistent_read=True)
+
+    def update_access_request(self, key, attributes, current_item=None):
+
+        """
+        Summary:
+            Sets attributes of an access request and keeps its secondary index key attributes in step.
+        Args:
+            key (str): The Request-ID of the item to be updated.
+            attributes (dict): The attributes to set. A value of None removes the attribute.
+            current_item (dict, optional): The item as it was read before the update. It supplies any
+                other attributes the derived index attributes are built from. Defaults to None.
+        Example:
+            Clearing a notification removes the item from the sparse notifications index:
+            dynamodb_table.update_access_request(request_id, {'notification-alert': 'false'})
+        Note:
+            - When a counts table is configured and the status or environment changes, the item and the
+              aggregate counters are updated in one transaction, on condition that the item still has
+              the status and environment it was read with. If another request changed it first, the
+              item is read again and the update retried, up to TRANSACTION_ATTEMPTS times.
+            - The updated item is stored in the access request cache, or its entry is invalidated when
+              the update was transactional or failed.
+        """
+
+        counted = self.counts_table_name and ('access-status' in attributes or 'access-environment' in attributes)
+        for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+            if counted and current_item is None:
+                current_item = self.read_access_request(key)
+                if current_item is None:
+                    return
+            update_parameters = access_request_update_parameters(key, attributes, current_item)
+            changes = count_changes(current_item, dict(current_item, **attributes)) if counted else {}
+            try:
+                if not changes:
+                    response = self.table.update_item(**update_parameters, ReturnValues='ALL_NEW')
+                    # Cache the item as it is after the update:
+                    self.cache.store(key, response['Attributes'])
+                    return
+                # Update the item, on condition it has not changed since it was read, and its counters together:
+                condition_parameters = unchanged_count_condition(current_item)
+                self.transact_write([
+                    {'Update': {
+                        'TableName': self.table_name,
+                        'Key': update_parameters['Key'],
+                        'UpdateExpression': update_parameters['UpdateExpression'],
+                        'ConditionExpression': condition_parameters['ConditionExpression'],
+                        'ExpressionAttributeNames': dict(update_parameters['ExpressionAttributeNames'], **condition_parameters['ExpressionAttributeNames']),
+                        'ExpressionAttributeValues': dict(update_parameters.get('ExpressionAttributeValues', {}), **condition_parameters.get('ExpressionAttributeValues', {}))
+                    }},
+                    self.counter_update(changes)
+                ])
+                # Transactions return no item, so the next read fetches the updated one:
+                self.cache.invalidate(key)
+                return
+            except Exception as e:
+                self.cache.invalidate(key)
+                if attempt == TRANSACTION_ATTEMPTS or not is_transaction_conflict(e):
+                    raise aws_error_response(e) from e
+                current_item = None
 
-    def delete_item(self, key):
+    def delete_item(self, key, current_item=None):
 
         """
         Summary:
@@ -84,14 +651,303 @@ class DynamoDB:
         Args:
             key (dict): The primary key of the item to be deleted.
                         Should be a dictionary representing the primary key attributes.
+            current_item (dict, optional): The item as it was read before the delete. Defaults to None.
+        Note:
+            - When a counts table is configured, the item is deleted in a transaction that also removes
+              it from the aggregate counters, retried like update_access_request if it changed meanwhile.
+            - The item's entry in the access request cache is invalidated.
         """
 
         try:
-            self.table.delete_item(Key={ 'Request-ID': key })
+            for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+                try:
+                    if not self.counts_table_name:
+                        self.table.delete_item(Key={ 'Request-ID': key })
+                        return
+                    if current_item is None:
+                        current_item = self.read_access_request(key)
+                        if current_item is None:
+                            return
+                    # Delete the item, on condition it has not changed since it was read, and uncount it together:
+                    self.transact_write([
+                        {'Delete': dict(
+                            unchanged_count_condition(current_item),
+                            TableName=self.table_name,
+                            Key={ 'Request-ID': key }
+                        )},
+                        self.counter_update(count_changes(current_item, None))
+                    ])
+                    return
+                except Exception as e:
+                    if attempt == TRANSACTION_ATTEMPTS or not is_transaction_conflict(e):
+                        raise aws_error_response(e) from e
+                    current_item = None
+        finally:
+            # Drop the cached item, whether or not the delete succeeded:
+            self.cache.invalidate(key)
+
+    def transact_write(self, transact_items):
+
+        """
+        Summary:
+            Applies several writes, possibly across tables, as a single all-or-nothing transaction.
+        Args:
+            transact_items (list): The TransactItems. The table resource's client converts their
+                                   attribute values from Python types, as it does for the table methods.
+        """
+
+        self.dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+
+    def counter_update(self, changes):
+
+        """
+        Summary:
+            Builds the transactional update that applies changes to the aggregate access request counters.
+        Args:
+            changes (dict): The amount to add to each counter, as returned by count_changes.
+        Returns:
+            dict: An Update entry for transact_write.
+        """
+
+        return {'Update': {
+            'TableName': self.counts_table_name,
+            'Key': {'Counter-ID': ACCESS_REQUEST_COUNTS_ID},
+            'UpdateExpression': 'ADD ' + ', '.join(f'#c{index} :c{index}' for index in range(len(changes))),
+            'ExpressionAttributeNames': {f'#c{index}': name for index, name in enumerate(changes)},
+            'ExpressionAttributeValues': {f':c{index}': change for index, change in enumerate(changes.values())}
+        }}
+
+    def read_counters(self):
+
+        """
+        Summary:
+            Reads the aggregate access request counters with a single keyed read.
+        Returns:
+            dict: The counters, or an empty dict if nothing has been counted yet.
+        """
+
+        try:
+            return self.dynamodb.Table(self.counts_table_name).get_item(Key={'Counter-ID': ACCESS_REQUEST_COUNTS_ID}).get('Item', {})
         except Exception as e:
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
 
-    def scan_access_requests_table(self, selected_status=None, selected_environment=None):
+    def scan_pages(self, page_size=None, continuation_token=None, **scan_parameters):
+
+        """
+        Summary:
+            Scans the DynamoDB table one page at a time, following LastEvaluatedKey until the end
+            of the table.
+        Args:
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page (the scan
+                                       Limit). Defaults to None, which reads up to 1 MB per page.
+            continuation_token (str, optional): A token from a previous page to resume the scan from.
+            **scan_parameters: Additional parameters passed to the scan call, e.g. FilterExpression.
+        Returns:
+            generator: A generator of Page objects. Pages are only read as the generator is advanced,
+                       so callers can stop early and memory grows with the page size, not the table size.
+        Raises:
+            HTTPBadRequest: If the continuation token is invalid, straight away rather than on first read.
+        """
+
+        if page_size:
+            scan_parameters['Limit'] = page_size
+        return self._scan_pages(decode_continuation_token(continuation_token), scan_parameters)
+
+    def _scan_pages(self, exclusive_start_key, scan_parameters):
+        # Read the pages lazily, from the already decoded start key:
+        while True:
+            if exclusive_start_key:
+                scan_parameters['ExclusiveStartKey'] = exclusive_start_key
+            try:
+                response = self.table.scan(**scan_parameters)
+            except Exception as e:
+                raise aws_error_response(e) from e
+            exclusive_start_key = response.get('LastEvaluatedKey')
+            yield Page(
+                response.get('Items', []),
+                encode_continuation_token(exclusive_start_key),
+                response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
+            )
+            if not exclusive_start_key:
+                return
+
+    def scan_items(self, page_size=None, continuation_token=None, **scan_parameters):
+
+        """
+        Summary:
+            Scans the DynamoDB table and yields matching items one at a time across every page.
+        Args:
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page.
+            continuation_token (str, optional): A token from a previous page to resume the scan from.
+            **scan_parameters: Additional parameters passed to the scan call, e.g. FilterExpression.
+        Returns:
+            generator: A generator of items.
+        """
+
+        # Decode the continuation token now, and only read the pages as the items are iterated over:
+        pages = self.scan_pages(page_size, continuation_token, **scan_parameters)
+        return (item for page in pages for item in page.items)
+
+    def query_pages(self, page_size=None, continuation_token=None, **query_parameters):
+
+        """
+        Summary:
+            Queries the DynamoDB table (or one of its indexes) one page at a time, following
+            LastEvaluatedKey until the last matching item.
+        Args:
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page (the query
+                                       Limit). Defaults to None, which reads up to 1 MB per page.
+            continuation_token (str, optional): A token from a previous page to resume the query from.
+            **query_parameters: Parameters passed to the query call, e.g. IndexName and KeyConditionExpression.
+        Returns:
+            generator: A generator of Page objects, read only as the generator is advanced.
+        Raises:
+            HTTPBadRequest: If the continuation token is invalid, straight away rather than on first read.
+        """
+
+        if page_size:
+            query_parameters['Limit'] = page_size
+        return self._query_pages(decode_continuation_token(continuation_token), query_parameters)
+
+    def _query_pages(self, exclusive_start_key, query_parameters):
+        # Read the pages lazily, from the already decoded start key:
+        while True:
+            if exclusive_start_key:
+                query_parameters['ExclusiveStartKey'] = exclusive_start_key
+            try:
+                response = self.table.query(**query_parameters)
+            except Exception as e:
+                raise aws_error_response(e) from e
+            exclusive_start_key = response.get('LastEvaluatedKey')
+            yield Page(
+                response.get('Items', []),
+                encode_continuation_token(exclusive_start_key),
+                response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
+            )
+            if not exclusive_start_key:
+                return
+
+    def query_items(self, page_size=None, continuation_token=None, **query_parameters):
+
+        """
+        Summary:
+            Queries the DynamoDB table (or one of its indexes) and yields matching items across every page.
+        Args:
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page.
+            continuation_token (str, optional): A token from a previous page to resume the query from.
+            **query_parameters: Parameters passed to the query call, e.g. IndexName and KeyConditionExpression.
+        Returns:
+            generator: A generator of items.
+        """
+
+        # Decode the continuation token now, and only read the pages as the items are iterated over:
+        pages = self.query_pages(page_size, continuation_token, **query_parameters)
+        return (item for page in pages for item in page.items)
+
+    def query_count(self, **query_parameters):
+
+        """
+        Summary:
+            Counts the items matching a query without returning them.
+        Args:
+            **query_parameters: Parameters passed to the query call, e.g. IndexName and KeyConditionExpression.
+        Returns:
+            int: The number of matching items.
+        """
+
+        count = 0
+        query_parameters['Select'] = 'COUNT'
+        while True:
+            try:
+                response = self.table.query(**query_parameters)
+            except Exception as e:
+                raise aws_error_response(e) from e
+            count += response.get('Count', 0)
+            if not response.get('LastEvaluatedKey'):
+                return count
+            query_parameters['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def parallel_scan(self, total_segments=4, max_workers=None, capacity_budget=None, cancel_event=None, **scan_parameters):
+
+        """
+        Summary:
+            Scans the whole DynamoDB table as parallel segments and streams the merged items.
+            Each segment (Segment/TotalSegments) is scanned page by page by a worker of a bounded
+            thread pool, and pages are handed to the caller through a bounded queue as soon as they
+            arrive, so full-table operations scale with the table's partitions instead of its size.
+        Args:
+            total_segments (int): The number of segments to split the table into.
+            max_workers (int, optional): The maximum number of threads scanning at once. Defaults to
+                                         DYNAMO_DB_PARALLEL_SCAN_MAX_WORKERS (8) or total_segments if lower.
+            capacity_budget (float, optional): The read capacity units per second the scan may consume
+                                               across all segments. Defaults to no limit.
+            cancel_event (threading.Event, optional): An event that stops the scan when set.
+            **scan_parameters: Additional parameters passed to every scan call, e.g. FilterExpression.
+        Returns:
+            generator: A generator of items in no particular order. Closing the generator (or breaking
+                       out of the loop) cancels the remaining segment scans.
+        """
+
+        if max_workers is None:
+            max_workers = int(os.environ.get('DYNAMO_DB_PARALLEL_SCAN_MAX_WORKERS', 8))
+        max_workers = max(1, min(max_workers, total_segments))
+        cancel_event = cancel_event or threading.Event()
+        rate_limiter = CapacityRateLimiter(capacity_budget) if capacity_budget else None
+        # Bound the number of pages held in memory while the caller catches up:
+        pages = queue.Queue(maxsize=max_workers * 2)
+        finished = object()
+
+        def put(value):
+            # Hand a value to the caller unless the scan has been cancelled:
+            while not cancel_event.is_set():
+                try:
+                    pages.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_segment(segment):
+            segment_parameters = dict(scan_parameters, Segment=segment, TotalSegments=total_segments)
+            if rate_limiter:
+                segment_parameters['ReturnConsumedCapacity'] = 'TOTAL'
+            try:
+                while not cancel_event.is_set():
+                    response = self.table.scan(**segment_parameters)
+                    if rate_limiter:
+                        rate_limiter.consume(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+                    if not put(response.get('Items', [])):
+                        return
+                    if not response.get('LastEvaluatedKey'):
+                        break
+                    segment_parameters['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            except Exception as e:
+                put(e)
+            finally:
+                put(finished)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='parallel-scan')
+        try:
+            for segment in range(total_segments):
+                executor.submit(scan_segment, segment)
+            remaining_segments = total_segments
+            while remaining_segments and not cancel_event.is_set():
+                try:
+                    page = pages.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if page is finished:
+                    remaining_segments -= 1
+                elif isinstance(page, Exception):
+                    raise aws_error_response(page) from page
+                else:
+                    yield from page
+        finally:
+            # Stop any segments that are still running, e.g. when the caller stops early:
+            cancel_event.set()
+            executor.shutdown(wait=False)
+
+    def scan_access_requests_table(self, selected_status=None, selected_environment=None, page_size=None, continuation_token=None, attributes=None):
 
         """
         Summary:
@@ -101,47 +957,45 @@ class DynamoDB:
                 Defaults to None.
             selected_environment (str, optional): The selected environment to filter items by.
                 Defaults to None.
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page.
+            continuation_token (str, optional): A token from a previous page to resume the scan from.
+            attributes (list, optional): The attributes to read. Defaults to None (whole items).
         Returns:
-            list: A list containing items matching the filter criteria, if any.
-                If no items match the criteria, an empty list is returned.
+            generator: A generator of items matching the filter criteria, read lazily page by page.
         Note:
             - The method supports filtering by both status and environment independently or in combination.
             - If no filters are applied (i.e., both selected_status and selected_environment are None),
             the method will return all items in the DynamoDB table.
         """
 
-        try:
-            status_condition = None
-            environment_condition = None
-            scan_parameters = {}
-            expression_attribute_names = {}
-            expression_attribute_values = {}
-            # Construct filter conditions based on selected status and environment:
-            if selected_status:
-                status_condition = '#access_status = :status'
-                expression_attribute_names['#access_status'] = 'access-status'
-                expression_attribute_values[':status'] = selected_status
-            if selected_environment:
-                environment_condition = '#access_environment = :environment'
-                if status_condition:
-                    status_condition = status_condition + ' AND ' + environment_condition
-                else:
-                    status_condition = environment_condition
-                expression_attribute_names['#access_environment'] = 'access-environment'
-                expression_attribute_values[':environment'] = selected_environment
-            # Add filter expression to scan parameters:
-            if selected_status or selected_environment:
-                scan_parameters['FilterExpression'] = status_condition
-                scan_parameters['ExpressionAttributeNames'] = expression_attribute_names
-                scan_parameters['ExpressionAttributeValues'] = expression_attribute_values
-            # Perform the scan operation:
-            response = self.table.scan(**scan_parameters)
-            # Extract items from the response:
-            return response.get('Items', [])
-        except Exception as e:
-            raise HTTPNotFound from e
+        status_condition = None
+        environment_condition = None
+        scan_parameters = {}
+        expression_attribute_names = {}
+        expression_attribute_values = {}
+        # Construct filter conditions based on selected status and environment:
+        if selected_status:
+            status_condition = '#access_status = :status'
+            expression_attribute_names['#access_status'] = 'access-status'
+            expression_attribute_values[':status'] = selected_status
+        if selected_environment:
+            environment_condition = '#access_environment = :environment'
+            if status_condition:
+                status_condition = status_condition + ' AND ' + environment_condition
+            else:
+                status_condition = environment_condition
+            expression_attribute_names['#access_environment'] = 'access-environment'
+            expression_attribute_values[':environment'] = selected_environment
+        # Add filter expression to scan parameters:
+        if selected_status or selected_environment:
+            scan_parameters['FilterExpression'] = status_condition
+            scan_parameters['ExpressionAttributeValues'] = expression_attribute_values
+        # Read only the requested attributes:
+        scan_parameters.update(projection_parameters(attributes, expression_attribute_names))
+        # Perform the scan operation lazily, page by page:
+        return self.scan_items(page_size, continuation_token, **scan_parameters)
 
-    def scan_for_approved_environments(self, status=None, user=None):
+    def scan_for_approved_environments(self, status=None, user=None, page_size=None, continuation_token=None):
 
         """
         Summary:
@@ -152,22 +1006,19 @@ class DynamoDB:
         Args:
             status (str, optional): The status of the access request. Defaults to None.
             user (str, optional): The email address of the user for whom approved environments are scanned. Defaults to None.
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page.
+            continuation_token (str, optional): A token from a previous page to resume the scan from.
         Returns:
-            list: A list containing items representing approved environments for the specified user.
+            generator: A generator of items representing approved environments for the specified user.
         Note:
             - The method expects the 'status' and 'user' parameters to be provided to filter the results.
-            - The method returns a list of items representing approved environments for the specified user.
+            - Items are read lazily page by page, so every page of the table is covered.
         """
 
-        try:
-            # Perform the scan operation with filtering by access status and user email address:
-            response = self.table.scan(FilterExpression=Attr('access-status').eq(status) & Key('access-email-address').eq(user))
-            # Extract items from the response:
-            return response.get('Items', [])
-        except Exception as e:
-            raise HTTPNotFound from e
+        # Perform the scan operation with filtering by access status and user email address:
+        return self.scan_items(page_size, continuation_token, FilterExpression=Attr('access-status').eq(status) & Key('access-email-address').eq(user))
 
-    def scan_for_request_notifications(self, user=None):
+    def scan_for_request_notifications(self, user=None, page_size=None, continuation_token=None, attributes=None):
 
         """
         Summary:
@@ -175,19 +1026,240 @@ class DynamoDB:
             This method performs a scan operation on the DynamoDB table to retrieve items that match
             the whether the notification alert field is true and user email address.
         Args:
-            status (str, optional): The status of the access request. Defaults to None.
             user (str, optional): The email address of the user for whom approved environments are scanned. Defaults to None.
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page.
+            continuation_token (str, optional): A token from a previous page to resume the scan from.
+            attributes (list, optional): The attributes to read. Defaults to None (whole items).
         Returns:
-            list: A list containing items representing approved environments for the specified user.
+            generator: A generator of items representing unread notifications for the specified user.
         Note:
-            - The method expects the 'status' and 'user' parameters to be provided to filter the results.
-            - The method returns a list of items representing approved environments for the specified user.
+            - Items are read lazily page by page, so every page of the table is covered.
         """
 
-        try:
-            # Perform the scan operation with filtering by access status and user email address:
-            response = self.table.scan(FilterExpression=Attr('notification-alert').eq("true") & Key('access-email-address').eq(user))
-            # Extract items from the response:
-            return response.get('Items', [])
-        except Exception as e:
-            raise HTTPNotFound from e
+        # Perform the scan operation with filtering by notification alert and user email address:
+        return self.scan_items(
+            page_size,
+            continuation_token,
+            FilterExpression=Attr('notification-alert').eq("true") & Key('access-email-address').eq(user),
+            **projection_parameters(attributes)
+        )
+
+    def get_request_notifications(self, user, count_only=False, attributes=NOTIFICATION_ATTRIBUTES):
+
+        """
+        Summary:
+            Retrieves the unread request notifications of a user.
+            The sparse notifications index only holds items whose notification alert is set, keyed by
+            the requester's email address, so this is a small keyed query whose cost does not depend on
+            the size of the table.
+        Args:
+            user (str): The email address of the user.
+            count_only (bool, optional): Return only the number of unread notifications, e.g. for the
+                                         navigation badge. Defaults to False.
+            attributes (list, optional): The attributes to read. Defaults to those the notifications
+                                         dropdown renders; None reads whole items.
+        Returns:
+            list or int: The user's unread notifications, or their number if count_only is True.
+        Note:
+            - If DYNAMO_DB_USE_INDEXES is 'false', the table is scanned instead.
+        """
+
+        record_lookup('request_notifications')
+        if not indexes_enabled():
+            notifications = list(self.scan_for_request_notifications(user, attributes=attributes))
+            return len(notifications) if count_only else notifications
+        query_parameters = {
+            'IndexName': NOTIFICATIONS_INDEX_NAME,
+            'KeyConditionExpression': Key('notification-email').eq(user)
+        }
+        if count_only:
+            return self.query_count(**query_parameters)
+        return list(self.query_items(**query_parameters, **projection_parameters(attributes)))
+
+    def query_requests_by_email(self, user, status=None, newest_first=True, page_size=None, continuation_token=None):
+
+        """
+        Summary:
+            Retrieves a user's access requests, optionally only those with a given status.
+            The email/status index is keyed on the requester's email address and sorted by status and
+            then request date, so this reads only the user's own requests rather than the whole table.
+        Args:
+            user (str): The email address of the user.
+            status (str, optional): Only return requests with this status, e.g. 'Approved'. Defaults to None.
+            newest_first (bool, optional): Order requests with the same status newest first. Defaults to True.
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page.
+            continuation_token (str, optional): A token from a previous page to resume the query from.
+        Returns:
+            generator: A generator of the user's access requests.
+        Note:
+            - If DYNAMO_DB_USE_INDEXES is 'false', the table is scanned instead (which needs a status).
+        """
+
+        if not indexes_enabled():
+            return self.scan_for_approved_environments(status, user, page_size, continuation_token)
+        key_condition = Key('access-email-address').eq(user)
+        if status:
+            key_condition = key_condition & Key('access-status-date').begins_with(f"{status}#")
+        return self.query_items(
+            page_size,
+            continuation_token,
+            IndexName=EMAIL_STATUS_INDEX_NAME,
+            KeyConditionExpression=key_condition,
+            ScanIndexForward=not newest_first
+        )
+
+    def access_requests_query_parameters(self, selected_status=None, selected_environment=None):
+
+        """
+        Summary:
+            Chooses the index and conditions used to query access requests by status and environment.
+        Args:
+            selected_status (str, optional): The selected status to filter items by. Defaults to None.
+            selected_environment (str, optional): The selected environment to filter items by. Defaults to None.
+        Returns:
+            dict: The query parameters. A status filter uses the status index (with the environment as a
+                  filter expression if both are selected), an environment filter uses the environment
+                  index, and no filter uses the request date index of all access requests.
+        """
+
+        if selected_status:
+            query_parameters = {
+                'IndexName': STATUS_DATE_INDEX_NAME,
+                'KeyConditionExpression': Key('access-status').eq(selected_status)
+            }
+            if selected_environment:
+                query_parameters['FilterExpression'] = Attr('access-environment').eq(selected_environment)
+        elif selected_environment:
+            query_parameters = {
+                'IndexName': ENVIRONMENT_DATE_INDEX_NAME,
+                'KeyConditionExpression': Key('access-environment').eq(selected_environment)
+            }
+        else:
+            query_parameters = {
+                'IndexName': REQUEST_DATE_INDEX_NAME,
+                'KeyConditionExpression': Key('record-type').eq(ACCESS_REQUEST_RECORD_TYPE)
+            }
+        return query_parameters
+
+    def query_access_requests(self, selected_status=None, selected_environment=None, page_size=None, continuation_token=None):
+
+        """
+        Summary:
+            Retrieves access requests, newest first, from the status, environment or request date index.
+        Args:
+            selected_status (str, optional): The selected status to filter items by. Defaults to None.
+            selected_environment (str, optional): The selected environment to filter items by. Defaults to None.
+            page_size (int, optional): The maximum number of items DynamoDB evaluates per page, e.g. one
+                                       dashboard page.
+            continuation_token (str, optional): A token from a previous page to resume the query from.
+        Returns:
+            generator: A generator of access requests ordered by request date, newest first. Only the
+                       pages the caller iterates over are read.
+        """
+
+        query_parameters = self.access_requests_query_parameters(selected_status, selected_environment)
+        return self.query_items(page_size, continuation_token, ScanIndexForward=False, **query_parameters)
+
+    def query_keyset_page(self, page_size, exclusive_start_key=None, forward=True, **query_parameters):
+
+        """
+        Summary:
+            Reads exactly one page of query results that starts after a given key. Each query asks for
+            one more item than is still needed, so whether another page follows is known without
+            reading it, and queries are repeated only while a filter expression leaves the page short.
+        Args:
+            page_size (int): The number of items on the page.
+            exclusive_start_key (dict, optional): The key to start after. Defaults to None (the start).
+            forward (bool): True to read in ascending order of the index range key, False for descending.
+            **query_parameters: Parameters passed to the query call, e.g. IndexName and KeyConditionExpression.
+        Returns:
+            tuple: The items on the page, and True if more items follow them in the read order.
+        """
+
+        items = []
+        while True:
+            parameters = dict(query_parameters, Limit=page_size - len(items) + 1, ScanIndexForward=forward)
+            if exclusive_start_key:
+                parameters['ExclusiveStartKey'] = exclusive_start_key
+            try:
+                response = self.table.query(**parameters)
+            except Exception as e:
+                raise aws_error_response(e) from e
+            items.extend(response.get('Items', []))
+            exclusive_start_key = response.get('LastEvaluatedKey')
+            if len(items) > page_size:
+                return items[:page_size], True
+            if not exclusive_start_key:
+                return items, False
+
+    def access_requests_page(self, selected_status=None, selected_environment=None, page_size=10, cursor=None, attributes=None):
+
+        """
+        Summary:
+            Retrieves one page of access requests, newest first, positioned by a signed cursor instead of
+            an offset, so a deep page reads no more of the index than the first one.
+        Args:
+            selected_status (str, optional): The selected status to filter items by. Defaults to None.
+            selected_environment (str, optional): The selected environment to filter items by. Defaults to None.
+            page_size (int): The number of access requests per page.
+            cursor (str, optional): The next or previous cursor of another page. A missing, tampered
+                                    or mismatched cursor opens the first page.
+            attributes (list, optional): The attributes to read; the index key attributes the cursors
+                                         are built from are always added. Defaults to None (whole items).
+        Returns:
+            CursorPage: The access requests on the page and the cursors of the pages either side.
+        Note:
+            - A next cursor holds the index key of the last item on its page, and the page it opens is
+              read descending from there. A previous cursor holds the key of the first item on its page,
+              and the page it opens is read ascending from there and reversed.
+        """
+
+        query_parameters = self.access_requests_query_parameters(selected_status, selected_environment)
+        index_name = query_parameters['IndexName']
+        if attributes:
+            query_parameters.update(projection_parameters(list(attributes) + index_key_names(index_name)))
+        position = verify_cursor(cursor) or {}
+        if position.get('index') != index_name:
+            position = {}
+        exclusive_start_key = decode_continuation_token(position.get('key'))
+        if position.get('direction') == 'previous':
+            items, has_more = self.query_keyset_page(page_size, exclusive_start_key, True, **query_parameters)
+            items.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            items, has_more = self.query_keyset_page(page_size, exclusive_start_key, False, **query_parameters)
+            has_previous, has_next = bool(exclusive_start_key), has_more
+        next_cursor = None
+        previous_cursor = None
+        if items and has_next:
+            next_cursor = sign_cursor({'index': index_name, 'direction': 'next', 'key': encode_continuation_token(index_key(items[-1], index_name))})
+        if items and has_previous:
+            previous_cursor = sign_cursor({'index': index_name, 'direction': 'previous', 'key': encode_continuation_token(index_key(items[0], index_name))})
+        return CursorPage(items, next_cursor, previous_cursor)
+
+    def count_access_requests(self, selected_status=None, selected_environment=None):
+
+        """
+        Summary:
+            Counts access requests by status, from a single read of the aggregate counters when a counts
+            table is configured, and otherwise with count-only index queries.
+        Args:
+            selected_status (str, optional): The selected status to filter items by. Defaults to None.
+            selected_environment (str, optional): The selected environment to filter items by. Defaults to None.
+        Returns:
+            dict: The total, pending, approved and denied counts of the matching requests, keyed like
+                  the result of get_status_counts.
+        Note:
+            - Without a counts table, each count query reads every matching index entry, so the dashboard
+              only counts this way when DASHBOARD_STATUS_COUNTS is set to 'true'.
+        """
+
+        if self.counts_table_name:
+            return status_counts_from_counters(self.read_counters(), selected_status, selected_environment)
+        status_counts = {'total_requests': self.query_count(**self.access_requests_query_parameters(selected_status, selected_environment))}
+        for status in ACCESS_REQUEST_STATUSES:
+            if selected_status and selected_status != status:
+                status_counts[f'{status.lower()}_requests'] = 0
+            else:
+                status_counts[f'{status.lower()}_requests'] = self.query_count(**self.access_requests_query_parameters(status, selected_environment))
+        return status_counts
@@ -0,0 +1,43 @@
+import threading
+from contextvars import ContextVar
+
+# Counter of the lookups made while handling the current request, when they are being recorded. Views
+# run their fan-out calls in a copy of the request's context, so lookups made there are counted too:
+_recorded_lookups = ContextVar('recorded_lookups', default=None)
+_recorded_lookups_lock = threading.Lock()
+
+def record_lookup(name):
+
+    """
+    Summary:
+        Counts a lookup of a service or secret against the current request, if its lookups are being
+        recorded (see start_recording_lookups).
+    Args:
+        name (str): The lookup, e.g. 'cognito' or 'secret:<secret name>'.
+    """
+
+    lookups = _recorded_lookups.get()
+    if lookups is not None:
+        with _recorded_lookups_lock:
+            lookups[name] += 1
+
+def start_recording_lookups(lookups):
+
+    """
+    Summary:
+        Records the lookups made in the current context, and in the fan-out calls it starts, into a counter.
+    Args:
+        lookups (Counter): The counter the lookups are added to.
+    """
+
+    _recorded_lookups.set(lookups)
+
+def stop_recording_lookups():
+
+    """
+    Summary:
+        Stops recording lookups in the current context, e.g. once a request has finished, so the next
+        request served by the same thread is not counted against it.
+    """
+
+    _recorded_lookups.set(None)
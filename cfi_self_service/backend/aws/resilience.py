@@ -0,0 +1,307 @@
+import logging
+import os
+import threading
+import time
+from botocore.exceptions import ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+from pyramid.httpexceptions import HTTPConflict, HTTPNotFound, HTTPServiceUnavailable
+
+# Create and configure a logger instance:
+logger = logging.getLogger(__name__)
+
+# Error codes AWS services return when a request is throttled or the service is struggling:
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException',
+    'LimitExceededException',
+    'InternalServerError',
+    'InternalErrorException',
+    'InternalFailure',
+    'ServiceUnavailable',
+}
+
+# Reasons a DynamoDB transaction is cancelled that say nothing about the request itself, only that the
+# items were busy or the table was throttled, so the transaction can be tried again:
+TRANSIENT_CANCELLATION_REASONS = {'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'}
+
+# Exceptions raised when an AWS endpoint cannot be reached or does not answer in time:
+TIMEOUT_ERRORS = (ConnectTimeoutError, ReadTimeoutError, EndpointConnectionError, ConnectionClosedError)
+
+class CircuitOpenError(Exception):
+
+    def __init__(self, service_name, retry_after):
+
+        """
+        Summary:
+            Raised instead of calling a service whose circuit breaker is open.
+        Args:
+            service_name (str): The AWS service whose circuit is open.
+            retry_after (int): The number of seconds until the breaker lets a trial call through.
+        """
+
+        super().__init__(f"Circuit breaker for {service_name} is open")
+        self.service_name = service_name
+        self.retry_after = retry_after
+
+class CallTimeoutError(Exception):
+
+    def __init__(self, call_name, timeout):
+
+        """
+        Summary:
+            Raised when a call issued in parallel with others does not finish within its timeout.
+        Args:
+            call_name (str): The name the call was issued under.
+            timeout (float): The number of seconds the call was allowed.
+        """
+
+        super().__init__(f"Call {call_name} did not finish within {timeout} seconds")
+        self.call_name = call_name
+        self.timeout = timeout
+
+class KeySetUnavailableError(Exception):
+
+    def __init__(self, source, retry_after):
+
+        """
+        Summary:
+            Raised when the signing keys needed to verify a token cannot be downloaded, so the token can
+            be neither accepted nor rejected.
+        Args:
+            source (str): The URL or file the key set is loaded from.
+            retry_after (int): The number of seconds until the key set is downloaded again.
+        """
+
+        super().__init__(f"Signing keys from {source} are unavailable")
+        self.source = source
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+
+    def __init__(self, service_name, failure_threshold, reset_timeout):
+
+        """
+        Summary:
+            A per-service circuit breaker.
+            After failure_threshold consecutive throttling, timeout or server errors the breaker opens
+            and calls fail fast for reset_timeout seconds. A single trial call is then let through
+            (half-open); its success closes the breaker and its failure opens it again.
+        Args:
+            service_name (str): The AWS service the breaker protects.
+            failure_threshold (int): The number of consecutive failures that opens the breaker.
+            reset_timeout (int): The number of seconds the breaker stays open.
+        """
+
+        self.service_name = service_name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.counters = {'calls': 0, 'failures': 0, 'retries': 0, 'rejected': 0, 'opened': 0}
+        self._lock = threading.Lock()
+
+    def before_call(self):
+
+        """
+        Summary:
+            Checks that a call may be made, moving an expired open breaker to half-open.
+        Raises:
+            CircuitOpenError: If the breaker is open or a half-open trial call is already in flight.
+        """
+
+        with self._lock:
+            if self.state == 'open':
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    self.counters['rejected'] += 1
+                    raise CircuitOpenError(self.service_name, int(remaining) + 1)
+                # Let one trial call through:
+                self.state = 'half-open'
+            elif self.state == 'half-open':
+                self.counters['rejected'] += 1
+                raise CircuitOpenError(self.service_name, 1)
+            self.counters['calls'] += 1
+
+    def record_success(self, retries=0):
+
+        """
+        Summary:
+            Records a call that reached the service and closes the breaker.
+        Args:
+            retries (int): The number of retries botocore made for the call.
+        """
+
+        with self._lock:
+            self.counters['retries'] += retries
+            self.consecutive_failures = 0
+            if self.state != 'closed':
+                logger.info('Circuit breaker for %s closed.', self.service_name)
+            self.state = 'closed'
+
+    def record_failure(self, retries=0):
+
+        """
+        Summary:
+            Records a throttled, timed out or failed call and opens the breaker if needed.
+        Args:
+            retries (int): The number of retries botocore made for the call.
+        """
+
+        with self._lock:
+            self.counters['retries'] += retries
+            self.counters['failures'] += 1
+            self.consecutive_failures += 1
+            if self.state == 'half-open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.counters['opened'] += 1
+                    logger.warning('Circuit breaker for %s opened after %s failures.', self.service_name, self.consecutive_failures)
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def metrics(self):
+
+        """
+        Summary:
+            Returns a snapshot of the breaker state and counters.
+        Returns:
+            dict: The state, consecutive failures and call, failure, retry, rejection and open counts.
+        """
+
+        with self._lock:
+            return dict(self.counters, state=self.state, consecutive_failures=self.consecutive_failures)
+
+# Circuit breakers shared by every client in this process, keyed by service:
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(service_name):
+
+    """
+    Summary:
+        Returns the process-wide circuit breaker for a service, creating it on first use.
+    Args:
+        service_name (str): The AWS service name.
+    Returns:
+        CircuitBreaker: The shared breaker for the service.
+    """
+
+    with _circuit_breakers_lock:
+        if service_name not in _circuit_breakers:
+            _circuit_breakers[service_name] = CircuitBreaker(
+                service_name,
+                failure_threshold=int(os.environ.get('AWS_CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5)),
+                reset_timeout=int(os.environ.get('AWS_CIRCUIT_BREAKER_RESET_SECONDS', 30))
+            )
+        return _circuit_breakers[service_name]
+
+def resilience_metrics():
+
+    """
+    Summary:
+        Returns the circuit breaker state and retry counts of every service.
+    Returns:
+        dict: A dictionary keyed by service name with each breaker's metrics.
+    """
+
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return {breaker.service_name: breaker.metrics() for breaker in breakers}
+
+def install_resilience_hooks(client, service_name):
+
+    """
+    Summary:
+        Registers botocore event handlers that put a client's calls behind the service's circuit breaker.
+    Args:
+        client (botocore.client.BaseClient): The client to instrument.
+        service_name (str): The AWS service name used to select the breaker.
+    Note:
+        - 'before-call' rejects calls while the breaker is open.
+        - 'after-call' fires once botocore has finished retrying; throttling and server errors count
+          as failures, while any other response (including client errors such as a missing item)
+          shows the service is healthy.
+        - 'after-call-error' fires when the endpoint could not be reached or timed out.
+    """
+
+    breaker = get_circuit_breaker(service_name)
+
+    def before_call(**kwargs):
+        breaker.before_call()
+
+    def after_call(http_response, parsed, **kwargs):
+        retries = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        error_code = parsed.get('Error', {}).get('Code')
+        if http_response.status_code >= 500 or error_code in THROTTLING_ERROR_CODES:
+            breaker.record_failure(retries)
+        else:
+            breaker.record_success(retries)
+
+    def after_call_error(**kwargs):
+        breaker.record_failure()
+
+    client.meta.events.register('before-call', before_call, unique_id=f'circuit-breaker-before-{service_name}')
+    client.meta.events.register('after-call', after_call, unique_id=f'circuit-breaker-after-{service_name}')
+    client.meta.events.register('after-call-error', after_call_error, unique_id=f'circuit-breaker-error-{service_name}')
+
+def transaction_cancellation_reasons(error):
+
+    """
+    Summary:
+        Lists the reasons DynamoDB gave for cancelling a transaction.
+    Args:
+        error (Exception): The exception raised by transact_write_items.
+    Returns:
+        set: The cancellation reason codes, e.g. 'ConditionalCheckFailed' or 'TransactionConflict', or an
+             empty set if the error is not a cancelled transaction.
+    """
+
+    if not isinstance(error, ClientError) or error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+        return set()
+    return {reason.get('Code') for reason in error.response.get('CancellationReasons', [])} - {None, 'None'}
+
+def is_transient_error(error):
+
+    """
+    Summary:
+        Checks whether an error means the service is throttling, unavailable or too slow, rather than
+        that the request itself was wrong.
+    Args:
+        error (Exception): The exception raised by a boto3 call.
+    Returns:
+        bool: True for throttling, timeout, server and open circuit errors, for signing keys that could
+              not be downloaded, and for transactions cancelled because another transaction was writing
+              the same items.
+    """
+
+    if isinstance(error, (CircuitOpenError, CallTimeoutError, KeySetUnavailableError) + TIMEOUT_ERRORS):
+        return True
+    if transaction_cancellation_reasons(error) & TRANSIENT_CANCELLATION_REASONS:
+        return True
+    if isinstance(error, ClientError):
+        error_code = error.response.get('Error', {}).get('Code')
+        status_code = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return error_code in THROTTLING_ERROR_CODES or status_code >= 500
+    return False
+
+def aws_error_response(error):
+
+    """
+    Summary:
+        Maps an exception raised by an AWS call to the HTTP exception the view should raise.
+    Args:
+        error (Exception): The exception raised by a boto3 call.
+    Returns:
+        HTTPException: HTTPServiceUnavailable with a Retry-After header for transient errors,
+                       HTTPConflict for a transaction cancelled because an item was not in the state
+                       it was written against, otherwise HTTPNotFound.
+    """
+
+    if is_transient_error(error):
+        retry_after = getattr(error, 'retry_after', int(os.environ.get('AWS_RETRY_AFTER_SECONDS', 5)))
+        return HTTPServiceUnavailable(headers={'Retry-After': str(retry_after)})
+    if transaction_cancellation_reasons(error):
+        return HTTPConflict()
+    return HTTPNotFound()
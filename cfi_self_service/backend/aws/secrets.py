@@ -1,24 +1,237 @@
-
 import json
-import boto3
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from botocore.exceptions import ClientError
-from pyramid.httpexceptions import HTTPNotFound
+from cfi_self_service.backend.aws.clients import client_registry
+from cfi_self_service.backend.aws.lookups import record_lookup
+from cfi_self_service.backend.aws.resilience import aws_error_response
+
+class SecretCache:
+
+    def __init__(self, ttl_seconds, max_entries):
+
+        """
+        Summary:
+            A process-wide, thread-safe cache of parsed Secrets Manager values.
+            Entries are kept for ttl_seconds before they must be revalidated against the current
+            version ID of the secret, and the least recently used entry is evicted once the cache
+            holds max_entries secrets.
+        Args:
+            ttl_seconds (int): The number of seconds a cached secret is served without revalidation.
+                               A value of 0 disables caching.
+            max_entries (int): The maximum number of secrets held in the cache.
+        """
+
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _record(self, secret_name, metric):
+        # Increment a named counter for the given secret (lock must be held by the caller):
+        counters = self._metrics.setdefault(secret_name, {
+            'hits': 0, 'misses': 0, 'revalidations': 0, 'refreshes': 0, 'evictions': 0, 'invalidations': 0
+        })
+        counters[metric] += 1
+
+    def lookup(self, secret_name):
+
+        """
+        Summary:
+            Looks up a secret in the cache.
+        Args:
+            secret_name (str): The name of the secret to look up.
+        Returns:
+            tuple: A (value, version_id, fresh) tuple if the secret is cached, otherwise None.
+                   fresh is False once the entry has outlived the TTL and must be revalidated.
+        """
+
+        with self._lock:
+            entry = self._entries.get(secret_name)
+            if entry is None:
+                self._record(secret_name, 'misses')
+                return None
+            # Mark the entry as most recently used:
+            self._entries.move_to_end(secret_name)
+            fresh = (time.monotonic() - entry['checked_at']) < self.ttl_seconds
+            if fresh:
+                self._record(secret_name, 'hits')
+            return entry['value'], entry['version_id'], fresh
+
+    def store(self, secret_name, value, version_id):
+
+        """
+        Summary:
+            Stores a freshly fetched secret value, evicting the least recently used entries if needed.
+        Args:
+            secret_name (str): The name of the secret.
+            value: The parsed secret value.
+            version_id (str): The Secrets Manager version ID of the value.
+        """
+
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[secret_name] = {'value': value, 'version_id': version_id, 'checked_at': time.monotonic()}
+            self._entries.move_to_end(secret_name)
+            self._record(secret_name, 'refreshes')
+            # Evict the least recently used secrets once the cache is full:
+            while len(self._entries) > self.max_entries:
+                evicted_name, _ = self._entries.popitem(last=False)
+                self._record(evicted_name, 'evictions')
+
+    def revalidate(self, secret_name):
+
+        """
+        Summary:
+            Restarts the TTL of a cached secret whose version ID has been confirmed as current.
+        Args:
+            secret_name (str): The name of the secret.
+        """
+
+        with self._lock:
+            entry = self._entries.get(secret_name)
+            if entry is not None:
+                entry['checked_at'] = time.monotonic()
+                self._record(secret_name, 'revalidations')
+
+    def invalidate(self, secret_name):
+
+        """
+        Summary:
+            Removes a secret from the cache so that the next read fetches it again.
+        Args:
+            secret_name (str): The name of the secret.
+        """
+
+        with self._lock:
+            if self._entries.pop(secret_name, None) is not None:
+                self._record(secret_name, 'invalidations')
+
+    def clear(self):
+
+        """
+        Summary:
+            Removes every secret from the cache and resets the metrics.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._metrics.clear()
+
+    def metrics(self):
+
+        """
+        Summary:
+            Returns a snapshot of the per-secret cache counters.
+        Returns:
+            dict: A dictionary keyed by secret name with hits, misses, revalidations, refreshes,
+                  evictions and invalidations counts.
+        """
+
+        with self._lock:
+            return {secret_name: dict(counters) for secret_name, counters in self._metrics.items()}
+
+# Staging label of a secret version written by update_secret_keys before it is made current:
+PENDING_UPDATE_STAGE = 'CFI-PENDING-UPDATE'
+
+# Shared cache used by every Secrets instance in this process:
+secret_cache = SecretCache(
+    ttl_seconds=int(os.environ.get('SECRETS_CACHE_TTL_SECONDS', 300)),
+    max_entries=int(os.environ.get('SECRETS_CACHE_MAX_ENTRIES', 64))
+)
 
 class Secrets:
 
-    def __init__(self, region_name):
+    def __init__(self, region_name, cache=None):
 
         """
         Summary:
             Initialize the Secrets Manager client with the specified AWS region.
         Args:
             region_name (str): The AWS region where the Secrets Manager client will be instantiated.
+            cache (SecretCache, optional): The cache to read secrets through. Defaults to the
+                                           process-wide secret_cache.
         """
 
         # Store the AWS region name:
         self.region_name = region_name
-        # Initialize the Secrets Manager client with the specified region:
-        self.client = boto3.client('secretsmanager', region_name=self.region_name)
+        # Use the process-wide cache unless a specific one is provided:
+        self.cache = cache if cache is not None else secret_cache
+        # Take the shared Secrets Manager client for the specified region from the registry:
+        self.client = client_registry.client('secretsmanager', self.region_name)
+
+    def _fetch_secret(self, secret_name):
+        # Retrieve the secret value from AWS Secrets Manager and cache the parsed result:
+        get_secret_value_response = self.client.get_secret_value(
+            SecretId=secret_name
+        )
+        if 'SecretString' in get_secret_value_response:
+            # If the secret value is a string, parse it as JSON:
+            secret_value = json.loads(get_secret_value_response["SecretString"])
+        else:
+            # If the secret value is binary, handle it accordingly:
+            secret_value = get_secret_value_response['SecretBinary']
+        self.cache.store(secret_name, secret_value, get_secret_value_response.get('VersionId'))
+        return secret_value
+
+    def _current_version_id(self, secret_name):
+        # Describe the secret (metadata only, no decryption) to find the AWSCURRENT version ID:
+        describe_secret_response = self.client.describe_secret(SecretId=secret_name)
+        for version_id, stages in describe_secret_response.get('VersionIdsToStages', {}).items():
+            if 'AWSCURRENT' in stages:
+                return version_id
+        return None
+
+    def _remove_pending_stage(self, secret_name, version_id):
+        # Take the pending label off a version written by update_secret_keys once it is no longer needed.
+        # The write itself has already succeeded or failed, so a failure here is only reported:
+        try:
+            self.client.update_secret_version_stage(
+                SecretId=secret_name,
+                VersionStage=PENDING_UPDATE_STAGE,
+                RemoveFromVersionId=version_id
+            )
+        except Exception as e:
+            print("Removing pending secret version label - an error occurred - ", e)
+
+    def get_secret_values(self, secret_name):
+
+        """
+        Summary:
+            Retrieves every key/value pair of a secret from AWS Secrets Manager.
+        Args:
+            secret_name (str): The name of the secret to retrieve.
+        Returns:
+            dict: The parsed secret value.
+        Raises:
+            ClientError: If an error occurs during the retrieval process, it is raised to be handled by the caller.
+        Note:
+            - Values are served from the process-wide cache while they are within the TTL.
+            - Once the TTL expires, the cached version ID is compared with the current one and the
+              value is only fetched again if the secret has been rotated.
+        """
+
+        record_lookup(f'secret:{secret_name}')
+        try:
+            cached = self.cache.lookup(secret_name)
+            if cached is not None:
+                secret_value, version_id, fresh = cached
+                if not fresh:
+                    # Revalidate the cached value against the current version of the secret:
+                    if version_id is not None and self._current_version_id(secret_name) == version_id:
+                        self.cache.revalidate(secret_name)
+                    else:
+                        secret_value = self._fetch_secret(secret_name)
+            else:
+                secret_value = self._fetch_secret(secret_name)
+            return secret_value
+        except Exception as e:
+            raise aws_error_response(e) from e
 
     def get_secret(self, secret_name, secret_key):
 
@@ -32,23 +245,16 @@ class Secrets:
             str: The value associated with the specified secret key.
         Raises:
             ClientError: If an error occurs during the retrieval process, it is raised to be handled by the caller.
+        Note:
+            - The secret is read through the process-wide cache (see get_secret_values).
         """
 
+        secret_value = self.get_secret_values(secret_name)
         try:
-            # Retrieve the secret value from AWS Secrets Manager:
-            get_secret_value_response = self.client.get_secret_value(
-                SecretId=secret_name
-            )
-            if 'SecretString' in get_secret_value_response:
-                # If the secret value is a string, parse it as JSON:
-                secret_value = json.loads(get_secret_value_response["SecretString"])
-            else:
-                # If the secret value is binary, handle it accordingly:
-                secret_value = get_secret_value_response['SecretBinary']
             # Return the value associated with the specified secret key:
             return secret_value[secret_key]
         except Exception as e:
-            raise HTTPNotFound from e
+            raise aws_error_response(e) from e
 
     def update_secret(self, secret_name, secret_key, new_secret_value):
 
@@ -59,28 +265,82 @@ class Secrets:
             secret_name (str): The name or ARN of the secret.
             secret_key (str): The key whose value needs to be updated.
             new_secret_value (str): The new value to be assigned to the specified key.
+        Returns:
+            dict: The secret's new value.
+        Raises:
+            ClientError: If an error occurs while updating the secret.
+        """
+
+        return self.update_secret_keys(secret_name, {secret_key: new_secret_value})
+
+    def update_secret_keys(self, secret_name, new_secret_values):
+
+        """
+        Summary:
+            Updates several key/value pairs in a secret stored in AWS Secrets Manager with a single read
+            and write, without overwriting changes another writer made in the meantime.
+        Args:
+            secret_name (str): The name or ARN of the secret.
+            new_secret_values (dict): The new values, keyed by the secret keys to update.
+        Returns:
+            dict: The secret's new value, which is also stored in the cache so the next read needs no fetch.
         Raises:
             ClientError: If an error occurs while updating the secret.
+            HTTPServiceUnavailable: If the secret kept changing underneath the update for
+                                    SECRETS_UPDATE_ATTEMPTS attempts.
+        Note:
+            - The new value is written as a new version under a pending staging label, and AWSCURRENT is
+              then moved to it from the version that was read. Moving the label fails if another writer
+              has made a different version current, in which case the update is retried from a fresh read.
+              The pending label is removed again once AWSCURRENT has moved, or the update has given up.
+            - Binary secrets are read as JSON too, and are written back as a string.
         """
 
+        attempts = int(os.environ.get('SECRETS_UPDATE_ATTEMPTS', 3))
         try:
-            # Retrieve the current secret value from AWS Secrets Manager:
-            get_secret_value_response = self.client.get_secret_value(SecretId=secret_name)
-            # Determine whether the secret value is a string or binary:
-            if 'SecretString' in get_secret_value_response:
-                current_secret_value = get_secret_value_response['SecretString']
-            else:
-                # Handle binary secrets if needed:
-                current_secret_value = get_secret_value_response['SecretBinary']
-            # Parse the current secret value as JSON and update the specified key with the new value:
-            secret_dict = json.loads(current_secret_value)
-            secret_dict[secret_key] = new_secret_value
-            # Convert the updated dictionary back to a JSON string:
-            updated_secret_value = json.dumps(secret_dict)
-            # Update the secret in AWS Secrets Manager with the new value:
-            self.client.update_secret(
-                SecretId=secret_name,
-                SecretString=updated_secret_value
-            )
+            for attempt in range(1, attempts + 1):
+                # Retrieve the current secret value and apply every change to it:
+                get_secret_value_response = self.client.get_secret_value(SecretId=secret_name)
+                current_version_id = get_secret_value_response['VersionId']
+                if 'SecretString' in get_secret_value_response:
+                    current_secret_value = get_secret_value_response['SecretString']
+                else:
+                    # Handle binary secrets, which hold the same JSON as bytes:
+                    current_secret_value = get_secret_value_response['SecretBinary']
+                secret_dict = json.loads(current_secret_value)
+                secret_dict.update(new_secret_values)
+                # Write the new value as a version that is not current yet:
+                new_version_id = str(uuid.uuid4())
+                self.client.put_secret_value(
+                    SecretId=secret_name,
+                    ClientRequestToken=new_version_id,
+                    SecretString=json.dumps(secret_dict),
+                    VersionStages=[PENDING_UPDATE_STAGE]
+                )
+                try:
+                    # Make it current only if the version that was read is still current:
+                    self.client.update_secret_version_stage(
+                        SecretId=secret_name,
+                        VersionStage='AWSCURRENT',
+                        MoveToVersionId=new_version_id,
+                        RemoveFromVersionId=current_version_id
+                    )
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') != 'InvalidParameterException':
+                        raise
+                    if attempt == attempts:
+                        self._remove_pending_stage(secret_name, new_version_id)
+                        # Losing to other writers every time is transient, so report it as throttling:
+                        raise ClientError({'Error': {'Code': 'TooManyRequestsException', 'Message': 'The secret kept changing during the update.'}}, 'UpdateSecretVersionStage') from e
+                    print("Updating secret - another update won, retrying - ", e)
+                    time.sleep(0.1 * attempt)
+                    continue
+                # The version is current now, so it no longer needs the pending label:
+                self._remove_pending_stage(secret_name, new_version_id)
+                # Prime the cache with the value that was just written:
+                self.cache.store(secret_name, secret_dict, new_version_id)
+                return secret_dict
         except Exception as e:
-            raise HTTPNotFound from e
+            # Drop the cached copy so the next read picks up whichever value is current:
+            self.cache.invalidate(secret_name)
+            raise aws_error_response(e) from e
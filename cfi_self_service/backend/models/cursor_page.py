@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+
+@dataclass
+class CursorPage:
+
+    """
+    Summary:
+        Represents one page of results shown to the user, with signed cursors for the pages either side.
+    Attributes:
+        items (list): The items on the page.
+        next_cursor (str): A cursor that opens the following page, or None if this is the last page.
+        previous_cursor (str): A cursor that opens the preceding page, or None if this is the first page.
+    Note:
+        - This class is decorated with the @dataclass decorator, which automatically generates
+          special methods such as __init__(), __repr__(), and __eq__() based on the defined attributes.
+    """
+
+    items: list
+    next_cursor: str
+    previous_cursor: str
@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+
+@dataclass
+class Environment:
+
+    """
+    Summary:
+        Represents an environment users can be granted access to, and where its URL is stored.
+    Attributes:
+        name (str): The environment name, as stored in the access-environment attribute of requests.
+        url (str): The environment URL shown to users with approved access.
+        order (int): The position of the environment when environments are listed.
+        secret_name (str): The secret holding the environment's URL.
+        secret_key (str): The key of the environment's entry in that secret.
+    Note:
+        - This class is decorated with the @dataclass decorator, which automatically generates
+          special methods such as __init__(), __repr__(), and __eq__() based on the defined attributes.
+    """
+
+    name: str
+    url: str
+    order: int
+    secret_name: str = None
+    secret_key: str = None
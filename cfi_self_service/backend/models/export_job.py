@@ -0,0 +1,34 @@
+from dataclasses import dataclass
+
+@dataclass
+class ExportJob:
+
+    """
+    Summary:
+        Represents a background export of access requests and its progress.
+    Attributes:
+        job_id (str): The opaque ID used to poll and download the export.
+        owner (str): The email address of the user who requested the export.
+        selected_status (str): The status filter the export was requested with.
+        selected_environment (str): The environment filter the export was requested with.
+        status (str): 'queued', 'running', 'complete' or 'failed'.
+        rows_written (int): The number of access requests written so far.
+        total_rows (int): The expected number of access requests, or None if it is not known.
+        created_at (float): The time the export was requested, in seconds since the epoch.
+        finished_at (float): The time the export completed or failed, or None while it is in progress.
+        file_path (str): The gzipped CSV in the spool directory, once the export is complete.
+    Note:
+        - This class is decorated with the @dataclass decorator, which automatically generates
+          special methods such as __init__(), __repr__(), and __eq__() based on the defined attributes.
+    """
+
+    job_id: str
+    owner: str
+    selected_status: str
+    selected_environment: str
+    status: str = 'queued'
+    rows_written: int = 0
+    total_rows: int = None
+    created_at: float = None
+    finished_at: float = None
+    file_path: str = None
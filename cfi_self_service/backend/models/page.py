@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+@dataclass
+class Page:
+
+    """
+    Summary:
+        Represents one page of results read from a DynamoDB table.
+    Attributes:
+        items (list): The items on the page.
+        continuation_token (str): An opaque token that resumes the read after this page, or None
+                                  if this is the last page.
+        consumed_capacity (float): The capacity units the read consumed, when the request asked for
+                                   ReturnConsumedCapacity. Defaults to 0.
+    Note:
+        - This class is decorated with the @dataclass decorator, which automatically generates
+          special methods such as __init__(), __repr__(), and __eq__() based on the defined attributes.
+    """
+
+    items: list
+    continuation_token: str
+    consumed_capacity: float = 0
@@ -1,8 +1,5 @@
 
-import os
 from pyramid.httpexceptions import HTTPFound
-from cfi_self_service.backend.aws.secrets import Secrets
-from cfi_self_service.backend.aws.cognito import Cognito
 
 def authenticated_view(view_func):
 
@@ -14,20 +11,15 @@ def authenticated_view(view_func):
     Returns:
         callable: The wrapped view function.
     Notes:
-        This decorator checks if the user is authenticated using AWS Cognito.
+        This decorator checks if the user is authenticated using AWS Cognito, through the request's
+        reified user_identity, so the check runs once per request however often it is consulted.
         If authentication succeeds, it allows access to the decorated view function.
         If authentication fails, it redirects the user to the login page.
     """
 
     def wrapped_view(request):
-        # Retrieve secrets from AWS Secrets Manager:
-        region_name = os.environ.get('REGION_NAME')
-        secrets_instance = Secrets(region_name)
-        client_id = secrets_instance.get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY'))
-        user_pool_id = secrets_instance.get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY'))
-        # Initialize Cognito instance and handle MFA verification and user preferences:
-        cognito = Cognito(client_id, user_pool_id, region_name)
-        if cognito.check_cognito_authentication(request):
+        # Check the user's session with Cognito, reusing the request's resolved config and identity:
+        if request.user_identity is not None:
             # User is authenticated, proceed to the view function:
             return view_func(request)
         else:
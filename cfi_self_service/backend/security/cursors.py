@@ -0,0 +1,50 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+# Key used to sign pagination cursors. Every instance behind the load balancer must share it, so it
+# should be set through the environment; a random key only keeps cursors valid within one process:
+CURSOR_SIGNING_KEY = (os.environ.get('PAGINATION_CURSOR_SECRET') or secrets.token_hex(32)).encode('utf-8')
+
+def sign_cursor(position):
+
+    """
+    Summary:
+        Encodes a pagination position as an opaque, signed cursor that can be handed to the browser.
+    Args:
+        position (dict): The JSON-serialisable position, e.g. the key of the last item on a page.
+    Returns:
+        str: The URL-safe cursor.
+    """
+
+    body = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('utf-8')).decode('ascii')
+    signature = hmac.new(CURSOR_SIGNING_KEY, body.encode('ascii'), hashlib.sha256).hexdigest()
+    return f'{body}.{signature}'
+
+def verify_cursor(cursor):
+
+    """
+    Summary:
+        Checks the signature of a cursor created by sign_cursor and decodes its position.
+    Args:
+        cursor (str): The cursor received from the browser.
+    Returns:
+        dict: The position, or None if there is no cursor or it has been tampered with.
+    """
+
+    if not cursor:
+        return None
+    body, _, signature = cursor.partition('.')
+    expected_signature = hmac.new(CURSOR_SIGNING_KEY, body.encode('utf-8', 'replace'), hashlib.sha256).hexdigest()
+    # Compare bytes, as compare_digest rejects strings with non-ASCII characters:
+    if not hmac.compare_digest(signature.encode('utf-8', 'replace'), expected_signature.encode('ascii')):
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(body.encode('ascii')))
+    except (TypeError, ValueError) as e:
+        print("Decoding pagination cursor - an error occurred - ", e)
+        return None
+    return position if isinstance(position, dict) else None
@@ -0,0 +1,92 @@
+import os
+import secrets
+import threading
+import time
+
+class RefreshTokenStore:
+
+    def __init__(self, refresh_token_validity, max_entries):
+
+        """
+        Summary:
+            A process-wide, server-side store of Cognito refresh tokens.
+            The signed session cookie only carries an opaque ID for its entry, so the refresh token
+            never leaves the server. Each entry also holds the most recently issued access token and
+            a lock, so that concurrent requests from the same session renew the tokens only once.
+        Args:
+            refresh_token_validity (int): The number of seconds a refresh token remains valid.
+            max_entries (int): The maximum number of sessions held; the oldest entries are dropped first.
+        """
+
+        self.refresh_token_validity = refresh_token_validity
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, refresh_token, access_token, expires_in):
+
+        """
+        Summary:
+            Stores the tokens issued at login.
+        Args:
+            refresh_token (str): The refresh token from the AuthenticationResult.
+            access_token (str): The access token from the AuthenticationResult.
+            expires_in (int): The lifetime of the access token in seconds.
+        Returns:
+            str: The opaque ID to keep in the session.
+        """
+
+        token_session_id = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            # Drop expired sessions, then the oldest ones if the store is still full:
+            for expired_id in [key for key, entry in self._entries.items() if entry['refresh_expires_at'] <= now]:
+                del self._entries[expired_id]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._entries[token_session_id] = {
+                'refresh_token': refresh_token,
+                'access_token': access_token,
+                'expires_at': now + expires_in,
+                'refresh_expires_at': now + self.refresh_token_validity,
+                'lock': threading.Lock()
+            }
+        return token_session_id
+
+    def get(self, token_session_id):
+
+        """
+        Summary:
+            Returns the stored entry for a session.
+        Args:
+            token_session_id (str): The opaque ID kept in the session.
+        Returns:
+            dict: The entry, or None if the session is unknown or its refresh token has expired.
+        """
+
+        if not token_session_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(token_session_id)
+            if entry is not None and entry['refresh_expires_at'] <= time.time():
+                del self._entries[token_session_id]
+                return None
+            return entry
+
+    def discard(self, token_session_id):
+
+        """
+        Summary:
+            Removes a session's tokens, e.g. when the user logs out.
+        Args:
+            token_session_id (str): The opaque ID kept in the session.
+        """
+
+        with self._lock:
+            self._entries.pop(token_session_id, None)
+
+# Shared refresh token store used by every request in this process:
+refresh_token_store = RefreshTokenStore(
+    refresh_token_validity=int(os.environ.get('COGNITO_REFRESH_TOKEN_VALIDITY_DAYS', 30)) * 86400,
+    max_entries=int(os.environ.get('COGNITO_REFRESH_TOKEN_STORE_MAX_ENTRIES', 10000))
+)
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+import urllib.request
+import jwt
+from cfi_self_service.backend.aws.resilience import KeySetUnavailableError
+
+# Minimum number of seconds between JWKS reloads triggered by an unknown key ID:
+JWKS_MIN_REFRESH_INTERVAL = 60
+
+class JWKSCache:
+
+    def __init__(self, jwks_url=None, jwks_file=None, timeout=5):
+
+        """
+        Summary:
+            Loads and caches the JSON Web Key Set used to sign a Cognito user pool's tokens.
+            The key set is read from a local file when jwks_file is given, so verification can run
+            offline and in tests, and from jwks_url otherwise.
+        Args:
+            jwks_url (str, optional): The URL of the user pool's JWKS document.
+            jwks_file (str, optional): The path to a local copy of the JWKS document.
+            timeout (int): The number of seconds to wait when downloading the JWKS document.
+        """
+
+        self.jwks_url = jwks_url
+        self.jwks_file = jwks_file
+        self.timeout = timeout
+        self._keys = {}
+        self._loaded_at = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Read the JWKS document from the local file or the remote URL, keeping the last good key set
+        # if it cannot be read (URLError and socket timeouts are OSErrors):
+        try:
+            if self.jwks_file:
+                with open(self.jwks_file, encoding='utf-8') as jwks_document:
+                    jwks = json.load(jwks_document)
+            else:
+                with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as jwks_document:
+                    jwks = json.load(jwks_document)
+            self._keys = {key['kid']: jwt.PyJWK(key) for key in jwks.get('keys', []) if 'kid' in key}
+            self._load_failed = False
+        except (OSError, ValueError) as e:
+            print("Loading JWKS - an error occurred - ", e)
+            self._load_failed = True
+        self._loaded_at = time.monotonic()
+
+    def get_key(self, kid):
+
+        """
+        Summary:
+            Returns the signing key for a key ID, reloading the key set once if the ID is unknown.
+        Args:
+            kid (str): The key ID from the token header.
+        Returns:
+            jwt.PyJWK: The matching key, or None if the key set does not contain it.
+        Raises:
+            KeySetUnavailableError: If the key ID is unknown and the key set could not be downloaded,
+                                    so it is not known whether the key exists.
+        Note:
+            - Reloads triggered by unknown key IDs are limited to one every JWKS_MIN_REFRESH_INTERVAL
+              seconds so that forged tokens cannot force a download on every request.
+            - Keys from the last key set that was downloaded keep being served while the download fails.
+        """
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is None and (self._loaded_at is None or time.monotonic() - self._loaded_at >= JWKS_MIN_REFRESH_INTERVAL):
+                self._load()
+                key = self._keys.get(kid)
+            if key is None and self._load_failed:
+                retry_after = JWKS_MIN_REFRESH_INTERVAL - (time.monotonic() - self._loaded_at)
+                raise KeySetUnavailableError(self.jwks_file or self.jwks_url, max(int(retry_after), 0) + 1)
+        return key
+
+class TokenVerifier:
+
+    def __init__(self, region_name, user_pool_id, client_id, jwks_cache):
+
+        """
+        Summary:
+            Verifies Cognito access tokens locally against the user pool's signing keys.
+        Args:
+            region_name (str): The AWS region where the user pool is located.
+            user_pool_id (str): The ID of the Cognito user pool that issued the tokens.
+            client_id (str): The app client ID the tokens must have been issued to.
+            jwks_cache (JWKSCache): The cache holding the user pool's signing keys.
+        """
+
+        self.issuer = f"https://cognito-idp.{region_name}.amazonaws.com/{user_pool_id}"
+        self.client_id = client_id
+        self.jwks_cache = jwks_cache
+
+    def verify_access_token(self, access_token):
+
+        """
+        Summary:
+            Checks the signature, expiry, issuer, client ID and token use of an access token.
+        Args:
+            access_token (str): The encoded access token.
+        Returns:
+            dict: The verified token claims.
+        Raises:
+            jwt.InvalidTokenError: If the token fails any of the checks.
+            KeySetUnavailableError: If the signing keys needed to check the token could not be downloaded.
+        """
+
+        # Find the signing key named in the token header:
+        header = jwt.get_unverified_header(access_token)
+        signing_key = self.jwks_cache.get_key(header.get('kid'))
+        if signing_key is None:
+            raise jwt.InvalidTokenError('Unknown signing key')
+        # Verify the signature, expiry and issuer (access tokens carry client_id rather than aud):
+        claims = jwt.decode(
+            access_token,
+            signing_key.key,
+            algorithms=['RS256'],
+            issuer=self.issuer,
+            options={'require': ['exp', 'iss', 'token_use'], 'verify_aud': False}
+        )
+        if claims.get('token_use') != 'access':
+            raise jwt.InvalidTokenError('Token is not an access token')
+        if claims.get('client_id') != self.client_id:
+            raise jwt.InvalidTokenError('Token was issued to a different client')
+        return claims
+
+# Signing key caches shared by every request in this process, keyed by JWKS source:
+_jwks_caches = {}
+_jwks_caches_lock = threading.Lock()
+
+def get_jwks_cache(jwks_url=None, jwks_file=None):
+
+    """
+    Summary:
+        Returns the process-wide JWKS cache for a key set source, creating it on first use.
+    Args:
+        jwks_url (str, optional): The URL of the user pool's JWKS document.
+        jwks_file (str, optional): The path to a local copy of the JWKS document.
+    Returns:
+        JWKSCache: The shared cache for the source.
+    """
+
+    source = (jwks_url, jwks_file)
+    with _jwks_caches_lock:
+        if source not in _jwks_caches:
+            _jwks_caches[source] = JWKSCache(jwks_url, jwks_file)
+        return _jwks_caches[source]
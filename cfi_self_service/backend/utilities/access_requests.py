@@ -1,3 +1,247 @@
+import csv
+import heapq
+import io
+import zlib
+from datetime import datetime
+from operator import itemgetter
+
+# Sparse index holding only the access requests with an unread notification, keyed by requester email:
+NOTIFICATIONS_INDEX_NAME = 'notification-email-index'
+# Index of each requester's access requests, sorted by status and then request date:
+EMAIL_STATUS_INDEX_NAME = 'email-status-index'
+# Indexes of all access requests, of those with a given status and of those for a given environment,
+# each sorted by request date:
+REQUEST_DATE_INDEX_NAME = 'request-date-index'
+STATUS_DATE_INDEX_NAME = 'status-date-index'
+ENVIRONMENT_DATE_INDEX_NAME = 'environment-date-index'
+# Partition key value shared by every access request in the request date index:
+ACCESS_REQUEST_RECORD_TYPE = 'access-request'
+# The statuses an access request can have:
+ACCESS_REQUEST_STATUSES = ["Pending", "Approved", "Denied"]
+# Attributes the dashboard table renders, and those the notifications dropdown renders, so their
+# reads can project only what is shown:
+DASHBOARD_ATTRIBUTES = [
+    'Request-ID', 'access-first-name', 'access-last-name', 'access-team', 'access-environment',
+    'access-request-date', 'access-request-timestamp', 'access-status'
+]
+NOTIFICATION_ATTRIBUTES = ['Request-ID', 'access-status', 'access-environment', 'admin-response-date']
+# Key of the item holding the aggregate access request counters, and its counter of every request:
+ACCESS_REQUEST_COUNTS_ID = 'access-request-counts'
+TOTAL_REQUESTS_COUNTER = 'total-requests'
+# Request timestamp given to access requests without a valid request date, so they sort as the oldest:
+UNDATED_REQUEST_TIMESTAMP = '0000-00-00T00:00'
+
+# Secondary indexes of the access requests table, in the form expected by DynamoDB's update_table:
+ACCESS_REQUEST_INDEXES = [
+    {
+        'IndexName': NOTIFICATIONS_INDEX_NAME,
+        'KeySchema': [{'AttributeName': 'notification-email', 'KeyType': 'HASH'}],
+        'Projection': {
+            'ProjectionType': 'INCLUDE',
+            'NonKeyAttributes': ['access-status', 'access-environment', 'admin-response-date']
+        },
+        'AttributeDefinitions': [{'AttributeName': 'notification-email', 'AttributeType': 'S'}]
+    },
+    {
+        'IndexName': EMAIL_STATUS_INDEX_NAME,
+        'KeySchema': [
+            {'AttributeName': 'access-email-address', 'KeyType': 'HASH'},
+            {'AttributeName': 'access-status-date', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+        'AttributeDefinitions': [
+            {'AttributeName': 'access-email-address', 'AttributeType': 'S'},
+            {'AttributeName': 'access-status-date', 'AttributeType': 'S'}
+        ]
+    },
+    {
+        'IndexName': REQUEST_DATE_INDEX_NAME,
+        'KeySchema': [
+            {'AttributeName': 'record-type', 'KeyType': 'HASH'},
+            {'AttributeName': 'access-request-timestamp', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+        'AttributeDefinitions': [
+            {'AttributeName': 'record-type', 'AttributeType': 'S'},
+            {'AttributeName': 'access-request-timestamp', 'AttributeType': 'S'}
+        ]
+    },
+    {
+        'IndexName': STATUS_DATE_INDEX_NAME,
+        'KeySchema': [
+            {'AttributeName': 'access-status', 'KeyType': 'HASH'},
+            {'AttributeName': 'access-request-timestamp', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+        'AttributeDefinitions': [
+            {'AttributeName': 'access-status', 'AttributeType': 'S'},
+            {'AttributeName': 'access-request-timestamp', 'AttributeType': 'S'}
+        ]
+    },
+    {
+        'IndexName': ENVIRONMENT_DATE_INDEX_NAME,
+        'KeySchema': [
+            {'AttributeName': 'access-environment', 'KeyType': 'HASH'},
+            {'AttributeName': 'access-request-timestamp', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+        'AttributeDefinitions': [
+            {'AttributeName': 'access-environment', 'AttributeType': 'S'},
+            {'AttributeName': 'access-request-timestamp', 'AttributeType': 'S'}
+        ]
+    },
+]
+
+# Attributes that key an entry in one of the secondary indexes. DynamoDB rejects an empty string for
+# any of them, so an empty value leaves the attribute out and the item out of the (sparse) index:
+INDEX_KEY_ATTRIBUTES = {key['AttributeName'] for index in ACCESS_REQUEST_INDEXES for key in index['KeySchema']}
+
+def without_empty_index_keys(attributes):
+
+    """
+    Summary:
+        Replaces empty strings given for secondary index key attributes, e.g. from a blank form field,
+        with None, which leaves the attribute off a new item and removes it in an update.
+    Args:
+        attributes (dict): The attributes of an access request, or those being changed.
+    Returns:
+        dict: The attributes with every empty index key value set to None.
+    """
+
+    return {name: None if name in INDEX_KEY_ATTRIBUTES and value == '' else value for name, value in attributes.items()}
+
+def sortable_date(date_string):
+
+    """
+    Summary:
+        Converts a "%d/%m/%Y %H:%M" date, as stored on access requests, to a lexically sortable form.
+    Args:
+        date_string (str): The date to convert.
+    Returns:
+        str: The date as "%Y-%m-%dT%H:%M", or an empty string if it is missing or invalid.
+    """
+
+    if not isinstance(date_string, str):
+        return ''
+    # Rearrange the fields of a zero-padded date by position and let fromisoformat validate them,
+    # which is much cheaper than strptime when every scanned item is converted:
+    if len(date_string) == 16 and date_string[2] + date_string[5] + date_string[10] + date_string[13] == '// :':
+        sortable = f'{date_string[6:10]}-{date_string[3:5]}-{date_string[0:2]}T{date_string[11:16]}'
+        try:
+            datetime.fromisoformat(sortable)
+            return sortable
+        except ValueError:
+            pass
+    # Fall back to strptime, which also accepts dates that are not zero-padded, e.g. "1/2/2024 9:05":
+    try:
+        return datetime.strptime(date_string, "%d/%m/%Y %H:%M").strftime("%Y-%m-%dT%H:%M")
+    except ValueError:
+        return ''
+
+def sortable_timestamp(moment):
+
+    """
+    Summary:
+        Formats a moment as the ISO-8601 timestamp stored alongside the display dates of access requests.
+    Args:
+        moment (datetime): The moment to format.
+    Returns:
+        str: The moment as "%Y-%m-%dT%H:%M:%S", which sorts lexically in date order.
+    """
+
+    return moment.isoformat(timespec='seconds')
+
+def request_timestamp(item):
+
+    """
+    Summary:
+        Returns the sortable request timestamp of an access request, preferring the stored
+        'access-request-timestamp' attribute and only parsing 'access-request-date' for items
+        that have not been backfilled, or whose request date was edited after the timestamp was written.
+    Args:
+        item (dict): The access request.
+    Returns:
+        str: The timestamp, or an empty string if the request has no valid date.
+    """
+
+    # The stored timestamp is kept while it still matches the display date to the minute:
+    stored = item.get('access-request-timestamp')
+    parsed = sortable_date(item.get('access-request-date'))
+    if stored and stored != UNDATED_REQUEST_TIMESTAMP and stored.startswith(parsed):
+        return stored
+    return parsed
+
+def _notification_email(item):
+    # Only items with an unread notification carry the key of the sparse notifications index:
+    if item.get('notification-alert') == 'true':
+        return item.get('access-email-address') or None
+    return None
+
+def _status_date(item):
+    # Prefix the request date with the status so a user's requests can be queried by status:
+    if item.get('access-status'):
+        return f"{item['access-status']}#{request_timestamp(item)}"
+    return None
+
+def _request_timestamp(item):
+    # Index range keys cannot be empty:
+    return request_timestamp(item) or UNDATED_REQUEST_TIMESTAMP
+
+# Attributes derived from an access request to key its secondary indexes, with the attributes they are built from:
+DERIVED_INDEX_ATTRIBUTES = {
+    'notification-email': (('notification-alert', 'access-email-address'), _notification_email),
+    'access-status-date': (('access-status', 'access-request-date', 'access-request-timestamp'), _status_date),
+    'access-request-timestamp': (('access-request-date', 'access-request-timestamp'), _request_timestamp),
+    'record-type': ((), lambda item: ACCESS_REQUEST_RECORD_TYPE),
+}
+
+def index_attributes(item, changed_attributes=None):
+
+    """
+    Summary:
+        Builds the attributes that key an access request in the table's secondary indexes.
+    Args:
+        item (dict): The access request, including any attributes being changed.
+        changed_attributes (iterable, optional): The names of the attributes being changed. When given,
+            only derived attributes built from one of them are returned. Defaults to None (all of them).
+    Returns:
+        dict: The derived attributes. A value of None means the attribute must be removed, which takes
+              the item out of a sparse index.
+    """
+
+    derived = {}
+    for attribute_name, (source_attributes, build) in DERIVED_INDEX_ATTRIBUTES.items():
+        if changed_attributes is None or any(source in changed_attributes for source in source_attributes):
+            derived[attribute_name] = build(item)
+    return derived
+
+def index_key(item, index_name):
+
+    """
+    Summary:
+        Builds the key that positions an index query at an access request, for use as its ExclusiveStartKey.
+    Args:
+        item (dict): The access request, read with every key attribute of the index.
+        index_name (str): The name of one of the table's secondary indexes.
+    Returns:
+        dict: The table key and the index key attributes of the item.
+    """
+
+    return {name: item[name] for name in index_key_names(index_name)}
+
+def index_key_names(index_name):
+
+    """
+    Summary:
+        Lists the attributes that make up the key of an entry in one of the table's secondary indexes.
+    Args:
+        index_name (str): The name of the index.
+    Returns:
+        list: The table key attribute followed by the index key attributes.
+    """
+
+    index = next(index for index in ACCESS_REQUEST_INDEXES if index['IndexName'] == index_name)
+    return ['Request-ID'] + [key['AttributeName'] for key in index['KeySchema']]
 
 def get_status_counts(sorted_items):
 
@@ -11,11 +255,11 @@ def get_status_counts(sorted_items):
         dict: A dictionary containing counts of requests for different status types.
             Keys represent the status type, and values represent the count of requests for that status type.
     Note:
-        The 'all_requests' count represents the number of requests with statuses other than 'Pending', 'Approved', or 'Denied'.
+        Requests with a status other than 'Pending', 'Approved' or 'Denied' only count towards 'total_requests'.
     """
 
     # Define the status types:
-    status_type = ["Pending", "Approved", "Denied"]
+    status_type = ACCESS_REQUEST_STATUSES
     # Initialize counts for different status types:
     status_counts = {status: 0 for status in ['total_requests'] + [f'{status.lower()}_requests' for status in status_type]}
     # Iterate through sorted_items and update counts:
@@ -24,34 +268,217 @@ def get_status_counts(sorted_items):
         status = item.get('access-status')
         if status in status_type:
             status_counts[f'{status.lower()}_requests'] += 1
+    return status_counts
+
+def count_attribute_names(item):
+
+    """
+    Summary:
+        Lists the counters of the aggregate counts item that an access request is counted in.
+    Args:
+        item (dict): The access request.
+    Returns:
+        list: The counter attribute names: the total, the request's status, its environment, and
+              its status and environment together.
+    """
+
+    status = item.get('access-status')
+    environment = item.get('access-environment')
+    names = [TOTAL_REQUESTS_COUNTER]
+    if status:
+        names.append(f'status#{status}')
+    if environment:
+        names.append(f'environment#{environment}')
+    if status and environment:
+        names.append(f'status#{status}#environment#{environment}')
+    return names
+
+def count_changes(old_item=None, new_item=None):
+
+    """
+    Summary:
+        Works out how the aggregate counters change when an access request is created, updated or deleted.
+    Args:
+        old_item (dict, optional): The request before the change, or None if it is being created.
+        new_item (dict, optional): The request after the change, or None if it is being deleted.
+    Returns:
+        dict: The amount to add to each counter that changes. It is empty when neither the status nor
+              the environment of the request changes.
+    """
+
+    changes = {}
+    for name in count_attribute_names(old_item) if old_item else []:
+        changes[name] = changes.get(name, 0) - 1
+    for name in count_attribute_names(new_item) if new_item else []:
+        changes[name] = changes.get(name, 0) + 1
+    return {name: change for name, change in changes.items() if change}
+
+def aggregate_counts(items):
+
+    """
+    Summary:
+        Counts access requests into the counters of the aggregate counts item, e.g. to reconcile them.
+    Args:
+        items (iterable): The access requests.
+    Returns:
+        dict: The value of every counter the requests are counted in.
+    """
+
+    counters = {TOTAL_REQUESTS_COUNTER: 0}
+    for item in items:
+        for name in count_attribute_names(item):
+            counters[name] = counters.get(name, 0) + 1
+    return counters
+
+def status_counts_from_counters(counters, selected_status=None, selected_environment=None):
+
+    """
+    Summary:
+        Reads the dashboard's status counts for a status and environment filter from the aggregate counters.
+    Args:
+        counters (dict): The aggregate counts item.
+        selected_status (str, optional): The selected status to filter by. Defaults to None.
+        selected_environment (str, optional): The selected environment to filter by. Defaults to None.
+    Returns:
+        dict: The total, pending, approved and denied counts of the matching requests, keyed like
+              the result of get_status_counts.
+    """
+
+    def counter(status=None):
+        if status and selected_environment:
+            name = f'status#{status}#environment#{selected_environment}'
+        elif status:
+            name = f'status#{status}'
+        elif selected_environment:
+            name = f'environment#{selected_environment}'
         else:
-            status_counts['all_requests'] += 1
+            name = TOTAL_REQUESTS_COUNTER
+        # Guard against a counter that drifted below zero before it was reconciled:
+        return max(int(counters.get(name, 0)), 0)
+
+    status_counts = {'total_requests': counter(selected_status)}
+    for status in ACCESS_REQUEST_STATUSES:
+        if selected_status and selected_status != status:
+            status_counts[f'{status.lower()}_requests'] = 0
+        else:
+            status_counts[f'{status.lower()}_requests'] = counter(status)
     return status_counts
 
+def access_request_sort_key(item):
+
+    """
+    Summary:
+        Builds the key the dashboard orders access requests by: status, then request timestamp.
+    Args:
+        item (dict): The access request.
+    Returns:
+        tuple: The status and the sortable request timestamp, compared as plain strings.
+    """
+
+    return (item.get('access-status', ''), request_timestamp(item))
+
+def top_access_requests(items, count):
+
+    """
+    Summary:
+        Selects the highest-sorting access requests and counts every request by status in one pass.
+        Only a heap of `count` items is kept, so selecting a page from n requests costs O(n log count)
+        rather than the O(n log n) of sorting them all, and each sort key is built once per item.
+    Args:
+        items (iterable): The access requests, e.g. the generator returned by a paginated scan.
+        count (int): The number of requests to select, e.g. up to the end of the requested page.
+    Returns:
+        tuple: The selected requests ordered as sorted(items, key=access_request_sort_key, reverse=True)
+               would order them, and their status counts keyed like the result of get_status_counts.
+    """
+
+    status_counts = {status: 0 for status in ['total_requests'] + [f'{status.lower()}_requests' for status in ACCESS_REQUEST_STATUSES]}
+    def keyed_items():
+        # Count each request as it streams past on its way into the heap:
+        for item in items:
+            status_counts['total_requests'] += 1
+            status = item.get('access-status')
+            if status in ACCESS_REQUEST_STATUSES:
+                status_counts[f'{status.lower()}_requests'] += 1
+            yield access_request_sort_key(item), item
+    selected = heapq.nlargest(count, keyed_items(), key=itemgetter(0))
+    return [item for _, item in selected], status_counts
+
+# Columns of the CSV export, in order. The header is fixed rather than taken from the first item,
+# so every row lines up whatever attributes an individual request happens to have:
+EXPORT_COLUMNS = [
+    'Request-ID',
+    'access-first-name',
+    'access-last-name',
+    'access-email-address',
+    'access-team',
+    'access-environment',
+    'access-status',
+    'access-comments',
+    'access-request-date',
+    'admin-full-name',
+    'admin-response-date',
+    'admin-comments',
+]
+
+def csv_export_chunks(items, chunk_size=65536, compress=False):
+
+    """
+    Summary:
+        Writes access requests as CSV, yielding the output in chunks as the items are read.
+    Args:
+        items (iterable): The access requests, e.g. a generator that reads scan or query pages lazily.
+        chunk_size (int): The number of characters buffered before a chunk is yielded.
+        compress (bool): True to gzip the output. Defaults to False.
+    Returns:
+        generator: A generator of UTF-8 (or gzipped) byte strings. Only one chunk and one page of items
+                   are held in memory at a time, and the header is yielded before any item is read.
+    Note:
+        - Values are quoted by csv.writer, so commas, quotes and line breaks in comments are preserved.
+        - Missing attributes are written as empty cells.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def flush():
+        # Hand over what has been written so far and start a new buffer:
+        chunk = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor:
+            # A sync flush sends the compressed rows now rather than when the compressor's window fills:
+            return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return chunk
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+    for item in items:
+        writer.writerow([item.get(column, '') for column in EXPORT_COLUMNS])
+        if buffer.tell() >= chunk_size:
+            chunk = flush()
+            if chunk:
+                yield chunk
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
 def csv_data_export(sorted_items):
 
     """
     Summary:
         Export data in CSV format.
     Args:
-        data (list of dict): A list of dictionaries representing rows of data.
+        sorted_items (list of dict): A list of dictionaries representing access requests.
     Returns:
         str: A string containing the data in CSV format.
     Example:
         This function is used to export data in CSV format, such as access request details.
     Note:
-        - The function checks if the input data list is not empty before processing.
-        - It constructs the CSV content by joining keys of the first dictionary (column headers)
-          with commas and appending a newline character.
-        - It then iterates over each dictionary in the list, joins the values with commas,
-          and appends a newline character to form each row.
-    """
-
-    csv_content = ''
-    if sorted_items:
-        # Construct CSV header with column names:
-        csv_content += ','.join(sorted_items[0].keys()) + '\n'
-        # Add rows of data:
-        for row in sorted_items:
-            csv_content += ','.join(map(str, row.values())) + '\n'
-    return csv_content
+        - The whole export is built in memory; csv_export_chunks streams it instead.
+    """
+
+    return b''.join(csv_export_chunks(sorted_items)).decode('utf-8')
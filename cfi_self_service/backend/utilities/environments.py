@@ -0,0 +1,161 @@
+import json
+import os
+from cfi_self_service.backend.models.environment import Environment
+
+# Environments whose URLs are stored in individual DEA_*_ENVIRONMENT_URL_NAME/_KEY secrets when no
+# consolidated environments secret is configured:
+LEGACY_ENVIRONMENTS = [
+    ('Test', 'DEA_TEST_ENVIRONMENT_URL'),
+    ('Development', 'DEA_DEV_ENVIRONMENT_URL'),
+    ('Production', 'DEA_PROD_ENVIRONMENT_URL'),
+]
+
+def parse_environment_entry(entry):
+
+    """
+    Summary:
+        Reads an environment's entry in a secret, which is either the URL itself or an object holding
+        the URL and metadata. The object may be nested JSON, or a JSON string as stored by the Secrets
+        Manager console's key/value editor.
+    Args:
+        entry (str | dict): The environment's entry in the secret.
+    Returns:
+        dict: The entry as an object with at least a 'url' key.
+    """
+
+    if isinstance(entry, dict):
+        return entry
+    if isinstance(entry, str) and entry.lstrip().startswith('{'):
+        try:
+            return json.loads(entry)
+        except ValueError:
+            pass
+    return {'url': entry}
+
+def updated_environment_entry(entry, url):
+
+    """
+    Summary:
+        Sets the URL of an environment's entry in a secret, keeping the entry's format and metadata.
+    Args:
+        entry (str | dict): The environment's current entry in the secret, or None if it has none.
+        url (str): The new URL.
+    Returns:
+        str | dict: The updated entry.
+    """
+
+    parsed_entry = parse_environment_entry(entry)
+    if isinstance(entry, dict):
+        return dict(parsed_entry, url=url)
+    # An entry that parsed to more than its own URL is a JSON string, so write it back as one:
+    if parsed_entry != {'url': entry}:
+        return json.dumps(dict(parsed_entry, url=url))
+    return url
+
+class EnvironmentRegistry:
+
+    def __init__(self, secrets_instance, secret_name=None):
+
+        """
+        Summary:
+            The environments users can be granted access to and their URLs, loaded from Secrets Manager.
+            When a consolidated secret is configured, each of its keys is an environment, so environments
+            are added or removed by editing the secret alone, and every URL is read with a single fetch.
+            Otherwise the Test, Development and Production URLs are read from their DEA_* secrets.
+        Args:
+            secrets_instance (Secrets): The Secrets instance the secrets are read and written through,
+                                        whose process-wide cache keeps them between requests.
+            secret_name (str, optional): The consolidated environments secret. Defaults to the
+                                         DEA_ENVIRONMENTS_SECRET_NAME environment variable.
+        Example:
+            {"Test": {"url": "https://test.example", "order": 0}, "Production": "https://prod.example"}
+        """
+
+        self.secrets_instance = secrets_instance
+        self.secret_name = secret_name if secret_name is not None else os.environ.get('DEA_ENVIRONMENTS_SECRET_NAME')
+        self._secret_values = {}
+
+    def _get_secret_values(self, secret_name):
+        # Read each secret once for the lifetime of the registry (one request), however many environments it holds:
+        if secret_name not in self._secret_values:
+            self._secret_values[secret_name] = self.secrets_instance.get_secret_values(secret_name)
+        return self._secret_values[secret_name]
+
+    def _environment_locations(self):
+        # List each environment with the secret and key its entry is stored under:
+        if self.secret_name:
+            return [(name, self.secret_name, name) for name in self._get_secret_values(self.secret_name)]
+        locations = []
+        for name, prefix in LEGACY_ENVIRONMENTS:
+            secret_name = os.environ.get(f'{prefix}_NAME')
+            if secret_name:
+                locations.append((name, secret_name, os.environ.get(f'{prefix}_KEY')))
+        return locations
+
+    def environments(self):
+
+        """
+        Summary:
+            Lists the configured environments with their URLs.
+        Returns:
+            list: Environment objects ordered by their 'order' metadata, then as they appear in the secret.
+                  An environment whose order is not a number is placed as it appears in the secret.
+        Note:
+            - Each secret is read once per registry however many environments it holds, and is served
+              from the secret cache to later requests.
+        """
+
+        environments = []
+        for index, (name, secret_name, secret_key) in enumerate(self._environment_locations()):
+            entry = parse_environment_entry(self._get_secret_values(secret_name).get(secret_key))
+            # Fall back to the position in the secret when the order is missing or not a number:
+            try:
+                order = int(entry.get('order', index))
+            except (TypeError, ValueError) as e:
+                print("Reading environment order - an error occurred - ", e)
+                order = index
+            environments.append(Environment(
+                name,
+                entry.get('url'),
+                order,
+                secret_name,
+                secret_key
+            ))
+        return sorted(environments, key=lambda environment: environment.order)
+
+    def environment_urls(self):
+
+        """
+        Summary:
+            Maps each environment to its URL.
+        Returns:
+            dict: The environment URLs, keyed by environment name.
+        """
+
+        return {environment.name: environment.url for environment in self.environments()}
+
+    def update_environment_urls(self, new_urls):
+
+        """
+        Summary:
+            Saves changed environment URLs, writing each secret that holds a changed URL exactly once.
+        Args:
+            new_urls (dict): The submitted URLs, keyed by environment name. Unknown environments and
+                             unchanged URLs are ignored.
+        Returns:
+            list: The names of the environments whose URLs changed.
+        """
+
+        changes = {}
+        changed_environments = []
+        for environment in self.environments():
+            new_url = new_urls.get(environment.name)
+            if new_url is None or new_url == environment.url:
+                continue
+            entry = self._get_secret_values(environment.secret_name).get(environment.secret_key)
+            changes.setdefault(environment.secret_name, {})[environment.secret_key] = updated_environment_entry(entry, new_url)
+            changed_environments.append(environment.name)
+        # Write all of a secret's changed keys back together:
+        for secret_name, new_secret_values in changes.items():
+            self._secret_values[secret_name] = self.secrets_instance.update_secret_keys(secret_name, new_secret_values)
+        return changed_environments
@@ -0,0 +1,195 @@
+import dataclasses
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cfi_self_service.backend.models.export_job import ExportJob
+from cfi_self_service.backend.utilities.access_requests import csv_export_chunks
+
+# Names of the files export jobs write to the spool directory: the job ID (from secrets.token_urlsafe(16))
+# followed by .csv.gz, or .csv.gz.tmp while the export is being written. Only these are ever cleaned up:
+EXPORT_FILE_PATTERN = re.compile(r'[A-Za-z0-9_-]{22}\.csv\.gz(\.tmp)?')
+
+class ExportLimitError(Exception):
+
+    def __init__(self, message):
+
+        """
+        Summary:
+            Raised when an export cannot be queued because too many exports are already waiting or running.
+        Args:
+            message (str): The reason the export was refused.
+        """
+
+        super().__init__(message)
+
+class ExportJobManager:
+
+    def __init__(self, spool_directory, max_workers, max_pending, max_pending_per_user, ttl_seconds):
+
+        """
+        Summary:
+            Runs access request exports in the background, so that a large export neither ties up a
+            waitress request thread for the whole read nor runs into proxy timeouts.
+            Exports run on a small worker pool of their own, write gzipped CSV files to a spool
+            directory, and are removed, files included, once they are older than the TTL.
+        Args:
+            spool_directory (str): The directory finished exports are written to. It is created if needed.
+            max_workers (int): The number of exports that run at the same time, which bounds the DynamoDB
+                               reads and connections taken away from interactive requests.
+            max_pending (int): The number of exports that may be queued or running across all users.
+            max_pending_per_user (int): The number of exports that may be queued or running for one user.
+            ttl_seconds (int): The number of seconds an export (and its file) is kept after it finishes.
+        Note:
+            - Jobs are held in this process only; a restart loses their status, and the TTL cleanup
+              removes any files left behind.
+        """
+
+        self.spool_directory = spool_directory
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner, selected_status, selected_environment, load_items, total_rows=None):
+
+        """
+        Summary:
+            Queues an export of the access requests matching a status and environment filter.
+        Args:
+            owner (str): The email address of the user requesting the export.
+            selected_status (str): The selected status filter, or None.
+            selected_environment (str): The selected environment filter, or None.
+            load_items (callable): Returns the access requests to export, e.g. a lazy index query.
+                                   It is called on the worker thread, not the request thread.
+            total_rows (int, optional): The expected number of rows, used to report progress as a percentage.
+        Returns:
+            ExportJob: The queued export.
+        Raises:
+            ExportLimitError: If the user, or everyone together, already has the maximum number of
+                              exports queued or running.
+        """
+
+        self.cleanup()
+        with self._lock:
+            pending = [job for job in self._jobs.values() if job.status in ('queued', 'running')]
+            if len(pending) >= self.max_pending:
+                raise ExportLimitError('Too many exports are in progress.')
+            if len([job for job in pending if job.owner == owner]) >= self.max_pending_per_user:
+                raise ExportLimitError('You already have the maximum number of exports in progress.')
+            job = ExportJob(secrets.token_urlsafe(16), owner, selected_status, selected_environment, total_rows=total_rows, created_at=time.time())
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, load_items)
+        return job
+
+    def get(self, job_id, owner):
+
+        """
+        Summary:
+            Looks up an export for the user who requested it.
+        Args:
+            job_id (str): The ID of the export.
+            owner (str): The email address of the user asking for it.
+        Returns:
+            ExportJob: A copy of the export, or None if it does not exist, has expired or belongs
+                       to another user.
+        """
+
+        self.cleanup()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.owner != owner:
+                return None
+            return dataclasses.replace(job)
+
+    def cleanup(self):
+
+        """
+        Summary:
+            Removes exports that finished more than the TTL ago, and any export files in the spool directory
+            older than the TTL, including those left behind by a previous process.
+        Note:
+            - Only files named like an export (see EXPORT_FILE_PATTERN) are removed, so other files in a
+              shared spool directory are left alone.
+        """
+
+        expiry = time.time() - self.ttl_seconds
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished_at and job.finished_at < expiry:
+                    del self._jobs[job_id]
+        try:
+            for entry in os.scandir(self.spool_directory):
+                if EXPORT_FILE_PATTERN.fullmatch(entry.name) and entry.is_file() and entry.stat().st_mtime < expiry:
+                    os.remove(entry.path)
+        except OSError as e:
+            print("Cleaning up the export spool directory - an error occurred - ", e)
+
+    def _run(self, job, load_items):
+        # Write to a temporary file first so a download never sees a partial export:
+        file_path = os.path.join(self.spool_directory, f'{job.job_id}.csv.gz')
+        temporary_path = f'{file_path}.tmp'
+        with self._lock:
+            job.status = 'running'
+        try:
+            os.makedirs(self.spool_directory, exist_ok=True)
+            with open(temporary_path, 'wb') as file:
+                for chunk in csv_export_chunks(self._count_rows(job, load_items()), compress=True):
+                    file.write(chunk)
+            os.replace(temporary_path, file_path)
+            with self._lock:
+                job.file_path = file_path
+                job.status = 'complete'
+                job.finished_at = time.time()
+        except Exception as e:
+            print("Running export job - an error occurred - ", e)
+            with self._lock:
+                job.status = 'failed'
+                job.finished_at = time.time()
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _count_rows(self, job, items):
+        # Record progress as each access request is handed to the CSV writer:
+        for item in items:
+            yield item
+            job.rows_written += 1
+
+def export_job_progress(job):
+
+    """
+    Summary:
+        Describes the progress of an export for the status page and its polling requests.
+    Args:
+        job (ExportJob): The export.
+    Returns:
+        dict: The export's ID, status, rows written, expected rows and percentage complete (None when
+              the expected number of rows is not known).
+    """
+
+    percent_complete = None
+    if job.status == 'complete':
+        percent_complete = 100
+    elif job.total_rows:
+        percent_complete = min(int(job.rows_written * 100 / job.total_rows), 99)
+    return {
+        'job_id': job.job_id,
+        'status': job.status,
+        'rows_written': job.rows_written,
+        'total_rows': job.total_rows,
+        'percent_complete': percent_complete
+    }
+
+# Process-wide export job manager, shared by every request thread:
+export_job_manager = ExportJobManager(
+    os.environ.get('EXPORT_SPOOL_DIRECTORY', os.path.join(tempfile.gettempdir(), 'cfi_self_service_exports')),
+    int(os.environ.get('EXPORT_JOB_WORKERS', '2')),
+    int(os.environ.get('EXPORT_JOB_MAX_PENDING', '10')),
+    int(os.environ.get('EXPORT_JOB_MAX_PENDING_PER_USER', '2')),
+    int(os.environ.get('EXPORT_JOB_TTL_SECONDS', '3600'))
+)
@@ -0,0 +1,77 @@
+import os
+from cfi_self_service.backend.models.cursor_page import CursorPage
+from cfi_self_service.backend.security.cursors import sign_cursor, verify_cursor
+
+def dashboard_page_size(requested_page_size=None):
+
+    """
+    Summary:
+        Works out how many access requests to show per dashboard page.
+    Args:
+        requested_page_size (str, optional): The page size asked for in the request parameters.
+    Returns:
+        int: The requested page size, limited to DASHBOARD_MAX_PAGE_SIZE (default 100), or
+             DASHBOARD_PAGE_SIZE (default 10) if none or an invalid one was requested.
+    """
+
+    default_page_size = int(os.environ.get('DASHBOARD_PAGE_SIZE', '10'))
+    max_page_size = int(os.environ.get('DASHBOARD_MAX_PAGE_SIZE', '100'))
+    try:
+        return min(max(int(requested_page_size), 1), max_page_size)
+    except (TypeError, ValueError):
+        return default_page_size
+
+def dashboard_counts_enabled():
+
+    """
+    Summary:
+        Checks whether the dashboard should show the status counts of the matching access requests.
+    Returns:
+        bool: The DASHBOARD_STATUS_COUNTS setting ('true' or 'false'). When it is not set, True only if
+              a counts table (DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME) is configured: the counts are
+              then a single keyed read, whereas without one counting reads every matching index entry,
+              so each dashboard page would cost as much as the table is large.
+    """
+
+    default = 'true' if os.environ.get('DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME') else 'false'
+    return os.environ.get('DASHBOARD_STATUS_COUNTS', default).lower() != 'false'
+
+def cursor_offset(cursor=None):
+
+    """
+    Summary:
+        Reads the offset held in a cursor created by offset_page.
+    Args:
+        cursor (str, optional): A cursor from a previous page. Defaults to None (the first page).
+    Returns:
+        int: The offset of the first item on the page, or 0 if the cursor is missing or invalid.
+    """
+
+    offset = (verify_cursor(cursor) or {}).get('offset', 0)
+    if not isinstance(offset, int) or offset < 0:
+        return 0
+    return offset
+
+def offset_page(items, page_size, cursor=None, total_items=None):
+
+    """
+    Summary:
+        Pages through a list that is already in memory, using the same signed cursors as the index
+        queries so the dashboard links work whichever way the results were read.
+    Args:
+        items (list): The matching items in display order, from the first one up to at least the end
+                      of the requested page.
+        page_size (int): The number of items per page.
+        cursor (str, optional): A cursor from a previous page. Defaults to None (the first page).
+        total_items (int, optional): The number of matching items, when `items` only holds those up to
+                                     the end of the page. Defaults to None (the length of `items`).
+    Returns:
+        CursorPage: The items on the page and the cursors of the pages either side.
+    """
+
+    offset = cursor_offset(cursor)
+    if total_items is None:
+        total_items = len(items)
+    next_cursor = sign_cursor({'offset': offset + page_size}) if offset + page_size < total_items else None
+    previous_cursor = sign_cursor({'offset': max(offset - page_size, 0)}) if offset > 0 else None
+    return CursorPage(items[offset:offset + page_size], next_cursor, previous_cursor)
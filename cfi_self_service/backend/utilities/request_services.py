@@ -0,0 +1,203 @@
+import os
+import logging
+from collections import Counter
+from pyramid.events import NewRequest
+from cfi_self_service.backend.aws.cognito import Cognito
+from cfi_self_service.backend.aws.dynamodb import DynamoDB
+from cfi_self_service.backend.aws.lookups import start_recording_lookups, stop_recording_lookups
+from cfi_self_service.backend.aws.resilience import aws_error_response
+from cfi_self_service.backend.aws.secrets import Secrets
+from cfi_self_service.backend.utilities.environments import EnvironmentRegistry
+
+# Create and configure a logger instance:
+logger = logging.getLogger(__name__)
+
+def request_services_debug_enabled():
+
+    """
+    Summary:
+        Checks whether the lookups made by each request should be recorded and logged once it has finished.
+    Returns:
+        bool: True when REQUEST_SERVICES_DEBUG is set to 'true'.
+    """
+
+    return os.environ.get('REQUEST_SERVICES_DEBUG', 'false').lower() == 'true'
+
+def service_lookups(request):
+
+    """
+    Summary:
+        Counts the lookups made while handling a request: every Secrets Manager secret read (served from
+        the cache or not), every Cognito and DynamoDB handle built and every notifications read, by name.
+        As the request services are shared, every count should be 1.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        Counter: The number of times each lookup was made, e.g. {'cognito': 1, 'secret:<name>': 1}.
+    Note:
+        - Lookups are only counted when REQUEST_SERVICES_DEBUG is 'true' (see record_service_lookups).
+    """
+
+    return Counter()
+
+def record_service_lookups(event):
+
+    """
+    Summary:
+        NewRequest subscriber that, when REQUEST_SERVICES_DEBUG is 'true', records the lookups made by the
+        request (including those made by its fan-out calls) into request.service_lookups. Once the
+        request has finished the counts are logged, and a warning is logged for any lookup that ran twice.
+    Args:
+        event (NewRequest): The event raised as Pyramid starts handling a request.
+    """
+
+    if not request_services_debug_enabled():
+        return
+    request = event.request
+    start_recording_lookups(request.service_lookups)
+    request.add_finished_callback(_log_service_lookups)
+
+def _log_service_lookups(request):
+    # Stop recording, then log the lookups made by the finished request, highlighting any that were repeated:
+    stop_recording_lookups()
+    lookups = request.service_lookups
+    summary = ', '.join(f'{name}={count}' for name, count in sorted(lookups.items())) or 'none'
+    logger.debug('Request services for %s %s: %s', request.method, request.path, summary)
+    repeated = [name for name, count in lookups.items() if count > 1]
+    if repeated:
+        logger.warning('Request services looked up more than once for %s %s: %s', request.method, request.path, ', '.join(repeated))
+
+def cognito_config(request):
+
+    """
+    Summary:
+        Resolves the Cognito client ID and user pool ID from AWS Secrets Manager once per request.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        dict: The client_id, user_pool_id and region_name used to construct a Cognito instance.
+    """
+
+    # Retrieve secrets from AWS Secrets Manager, reading a secret that holds both IDs only once:
+    region_name = os.environ.get('REGION_NAME')
+    secrets_instance = Secrets(region_name)
+    secret_values = {}
+
+    def get_secret(secret_name, secret_key):
+        if secret_name not in secret_values:
+            secret_values[secret_name] = secrets_instance.get_secret_values(secret_name)
+        try:
+            return secret_values[secret_name][secret_key]
+        except Exception as e:
+            raise aws_error_response(e) from e
+
+    return {
+        'client_id': get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY')),
+        'user_pool_id': get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY')),
+        'region_name': region_name
+    }
+
+def cognito(request):
+
+    """
+    Summary:
+        Provides the Cognito instance shared by the authentication decorator and the views of a request.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        Cognito: A Cognito instance built from the request's resolved Cognito config.
+    """
+
+    return Cognito(**request.cognito_config)
+
+def access_requests_table():
+
+    """
+    Summary:
+        Builds a handle on the access requests table, configured the same way for a request as for work
+        that outlives one, such as a background export.
+    Returns:
+        DynamoDB: The access requests table named by DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME.
+    """
+
+    return DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
+
+def dynamodb_table(request):
+
+    """
+    Summary:
+        Provides the access requests table handle shared by everything that runs during a request.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        DynamoDB: The access requests table, built by access_requests_table.
+    """
+
+    return access_requests_table()
+
+def environment_registry(request):
+
+    """
+    Summary:
+        Provides the registry of environments and their URLs for the rest of the request.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        EnvironmentRegistry: A registry reading the environments secret through the process-wide secret cache.
+    """
+
+    return EnvironmentRegistry(Secrets(os.environ.get('REGION_NAME')))
+
+def user_identity(request):
+
+    """
+    Summary:
+        Checks the current user's session with Cognito once per request and describes the user.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        dict: The email_address, admin_user and user_groups of the authenticated user, or None if the
+              user is not authenticated.
+    """
+
+    if not request.cognito.check_cognito_authentication(request):
+        return None
+    return {
+        'email_address': request.session.get('email_address'),
+        'admin_user': request.session.get('admin_user', False),
+        'user_groups': request.session.get('user_groups', [])
+    }
+
+def request_notifications(request):
+
+    """
+    Summary:
+        Reads the current user's unread notifications once per request, for the navigation dropdown.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        list: The unread notifications of the current user.
+    """
+
+    return request.dynamodb_table.get_request_notifications(request.session["email_address"])
+
+def includeme(config):
+
+    """
+    Summary:
+        Pyramid config hook that adds the request services as reified request properties, so each
+        is computed on first use and then reused for the rest of the request.
+    Args:
+        config (pyramid.config.Configurator): The Pyramid configurator object.
+    Example:
+        request.dynamodb_table, request.request_notifications, request.cognito, request.user_identity
+    """
+
+    config.add_request_method(service_lookups, 'service_lookups', reify=True)
+    config.add_subscriber(record_service_lookups, NewRequest)
+    config.add_request_method(cognito_config, 'cognito_config', reify=True)
+    config.add_request_method(cognito, 'cognito', reify=True)
+    config.add_request_method(dynamodb_table, 'dynamodb_table', reify=True)
+    config.add_request_method(environment_registry, 'environment_registry', reify=True)
+    config.add_request_method(user_identity, 'user_identity', reify=True)
+    config.add_request_method(request_notifications, 'request_notifications', reify=True)
@@ -41,6 +41,9 @@ def includeme(config):
     config.add_route(name='access-requests-dashboard', path='/access-requests/')
     config.add_route(name='access-requests-existing', path='/access-requests/{id}')
     config.add_route(name='access-requests-export', path='/access-requests/export/')
+    config.add_route(name='access-requests-export-status', path='/access-requests/export/{job_id}')
+    config.add_route(name='access-requests-export-progress', path='/access-requests/export/{job_id}/progress')
+    config.add_route(name='access-requests-export-download', path='/access-requests/export/{job_id}/download')
     config.add_route(name='access-requests-admin', path='/access-requests/admin/{id}')
     config.add_route(name='access-requests-new', path='/access-requests/new/')
 
@@ -49,5 +52,8 @@ def includeme(config):
     config.add_route(name='environment-urls-vpn-update', path='/environment-urls-vpn/update/')
     config.add_route(name='environment-urls-vpn-notification', path='/environment-urls-vpn/notification/{id}')
 
+    # Admin Metrics Route:
+    config.add_route(name='admin-metrics', path='/admin/metrics/')
+
     # Logout Route:
     config.add_route('logout', '/logout/')
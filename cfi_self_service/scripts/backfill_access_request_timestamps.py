@@ -0,0 +1,191 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cfi_self_service.backend.aws.dynamodb import CapacityRateLimiter, DynamoDB
+from cfi_self_service.backend.utilities.access_requests import request_timestamp, sortable_date
+
+# Create and configure a logger instance:
+logger = logging.getLogger(__name__)
+
+# Checkpoint value recorded for a scan segment that has been read to the end:
+SEGMENT_COMPLETE = 'complete'
+
+class BackfillCheckpoint:
+
+    def __init__(self, checkpoint_file, total_segments):
+
+        """
+        Summary:
+            Records how far each scan segment of a backfill has got, so an interrupted run can resume
+            from the last page it finished instead of rescanning the table.
+        Args:
+            checkpoint_file (str): The JSON file the progress is kept in. It is created if it does not exist.
+            total_segments (int): The number of parallel scan segments. A checkpoint written with a
+                different number of segments cannot be resumed and is ignored.
+        """
+
+        self.checkpoint_file = checkpoint_file
+        self.total_segments = total_segments
+        self.segments = {}
+        self._lock = threading.Lock()
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            with open(checkpoint_file) as file:
+                checkpoint = json.load(file)
+            if checkpoint.get('total_segments') == total_segments:
+                self.segments = checkpoint.get('segments', {})
+            else:
+                logger.warning('Ignoring checkpoint %s written for %s segments.', checkpoint_file, checkpoint.get('total_segments'))
+
+    def position(self, segment):
+
+        """
+        Summary:
+            Returns where a segment should resume from.
+        Args:
+            segment (int): The scan segment.
+        Returns:
+            str: The continuation token to resume from, None to start from the beginning,
+                 or SEGMENT_COMPLETE if the segment has already been backfilled.
+        """
+
+        return self.segments.get(str(segment))
+
+    def save(self, segment, continuation_token):
+
+        """
+        Summary:
+            Records the position of a segment after a page has been backfilled.
+        Args:
+            segment (int): The scan segment.
+            continuation_token (str): The token of the next page, or None if the segment is complete.
+        """
+
+        with self._lock:
+            self.segments[str(segment)] = continuation_token or SEGMENT_COMPLETE
+            if not self.checkpoint_file:
+                return
+            # Write to a temporary file first so an interruption never leaves a partial checkpoint:
+            temporary_file = f'{self.checkpoint_file}.tmp'
+            with open(temporary_file, 'w') as file:
+                json.dump({'total_segments': self.total_segments, 'segments': self.segments}, file)
+            os.replace(temporary_file, self.checkpoint_file)
+
+def timestamp_changes(item):
+
+    """
+    Summary:
+        Works out the sortable timestamp attributes an existing access request is missing.
+    Args:
+        item (dict): The access request.
+    Returns:
+        dict: The 'access-request-timestamp' and 'admin-response-timestamp' attributes that need to be
+              written, which is empty if the item is already up to date or has no valid dates.
+    """
+
+    changes = {}
+    access_request_timestamp = request_timestamp(item)
+    if access_request_timestamp and item.get('access-request-timestamp') != access_request_timestamp:
+        changes['access-request-timestamp'] = access_request_timestamp
+    admin_response_timestamp = sortable_date(item.get('admin-response-date'))
+    if admin_response_timestamp and not item.get('admin-response-timestamp', '').startswith(admin_response_timestamp):
+        changes['admin-response-timestamp'] = admin_response_timestamp
+    return changes
+
+def backfill_segment(dynamodb_table, segment, total_segments, checkpoint, page_size, read_limiter, write_limiter):
+
+    """
+    Summary:
+        Backfills the timestamp attributes of the access requests in one parallel scan segment,
+        checkpointing after every page.
+    Args:
+        dynamodb_table (DynamoDB): The access requests table.
+        segment (int): The scan segment to backfill.
+        total_segments (int): The number of parallel scan segments.
+        checkpoint (BackfillCheckpoint): The progress of the backfill.
+        page_size (int): The maximum number of items read per page.
+        read_limiter (CapacityRateLimiter): Limits the read capacity consumed by the scan, or None.
+        write_limiter (CapacityRateLimiter): Limits the write capacity consumed by the updates, or None.
+    Returns:
+        int: The number of items that were updated.
+    """
+
+    continuation_token = checkpoint.position(segment)
+    if continuation_token == SEGMENT_COMPLETE:
+        logger.info('Segment %s was already backfilled.', segment)
+        return 0
+    scan_parameters = {'Segment': segment, 'TotalSegments': total_segments}
+    if read_limiter:
+        scan_parameters['ReturnConsumedCapacity'] = 'TOTAL'
+    updated = 0
+    for page in dynamodb_table.scan_pages(page_size, continuation_token, **scan_parameters):
+        if read_limiter:
+            read_limiter.consume(page.consumed_capacity)
+        for item in page.items:
+            changes = timestamp_changes(item)
+            if changes:
+                dynamodb_table.update_access_request(item['Request-ID'], changes, item)
+                updated += 1
+                # Each update of a small item consumes about one write unit on the table:
+                if write_limiter:
+                    write_limiter.consume(1)
+        checkpoint.save(segment, page.continuation_token)
+    logger.info('Segment %s backfilled, %s items updated.', segment, updated)
+    return updated
+
+def backfill_timestamps(dynamodb_table, total_segments=4, checkpoint_file=None, page_size=100, read_capacity=None, write_capacity=None):
+
+    """
+    Summary:
+        Adds the sortable 'access-request-timestamp' and 'admin-response-timestamp' attributes to every
+        existing access request, scanning the table's segments in parallel. The request date indexes
+        are re-keyed on the new timestamps as the items are updated.
+    Args:
+        dynamodb_table (DynamoDB): The access requests table.
+        total_segments (int): The number of parallel scan segments.
+        checkpoint_file (str, optional): A JSON file recording the progress of each segment, so that
+            rerunning the command resumes where it stopped. Defaults to None (not resumable).
+        page_size (int): The maximum number of items read per page, and so between checkpoints.
+        read_capacity (float, optional): The read capacity units per second the scan may consume.
+        write_capacity (float, optional): The write capacity units per second the updates may consume.
+    Returns:
+        int: The number of items that were updated.
+    """
+
+    checkpoint = BackfillCheckpoint(checkpoint_file, total_segments)
+    read_limiter = CapacityRateLimiter(read_capacity) if read_capacity else None
+    write_limiter = CapacityRateLimiter(write_capacity) if write_capacity else None
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        futures = [
+            executor.submit(backfill_segment, dynamodb_table, segment, total_segments, checkpoint, page_size, read_limiter, write_limiter)
+            for segment in range(total_segments)
+        ]
+        return sum(future.result() for future in futures)
+
+def main(argv=sys.argv):
+
+    """
+    Summary:
+        Backfills the sortable timestamp attributes of the access requests table. The table is taken
+        from the REGION_NAME and DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME environment variables used by
+        the application.
+    Args:
+        argv (list): The command line arguments.
+    Example:
+        cfi_backfill_access_request_timestamps --checkpoint-file backfill.json --segments 8 --read-capacity 50 --write-capacity 25
+    """
+
+    parser = argparse.ArgumentParser(description='Backfill sortable timestamps on existing access requests.')
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments')
+    parser.add_argument('--checkpoint-file', default=None, help='JSON file used to resume an interrupted backfill')
+    parser.add_argument('--page-size', type=int, default=100, help='items read per page and between checkpoints')
+    parser.add_argument('--read-capacity', type=float, default=None, help='read capacity units per second for the scan')
+    parser.add_argument('--write-capacity', type=float, default=None, help='write capacity units per second for the updates')
+    args = parser.parse_args(argv[1:])
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", datefmt="%d/%m/%Y %H:%M:%S")
+    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
+    updated = backfill_timestamps(dynamodb_table, args.segments, args.checkpoint_file, args.page_size, args.read_capacity, args.write_capacity)
+    logger.info('Backfilled timestamps on %s items.', updated)
@@ -0,0 +1,87 @@
+import argparse
+import logging
+import os
+import sys
+from cfi_self_service.backend.aws.dynamodb import DynamoDB
+from cfi_self_service.backend.utilities.access_requests import ACCESS_REQUEST_COUNTS_ID, aggregate_counts
+
+# Create and configure a logger instance:
+logger = logging.getLogger(__name__)
+
+def create_counts_table(dynamodb_table):
+
+    """
+    Summary:
+        Creates the table holding the aggregate access request counters if it does not exist yet.
+    Args:
+        dynamodb_table (DynamoDB): The access requests table, configured with a counts table name.
+    """
+
+    client = dynamodb_table.dynamodb.meta.client
+    if dynamodb_table.counts_table_name in client.list_tables().get('TableNames', []):
+        logger.info('Table %s already exists.', dynamodb_table.counts_table_name)
+        return
+    logger.info('Creating table %s...', dynamodb_table.counts_table_name)
+    client.create_table(
+        TableName=dynamodb_table.counts_table_name,
+        KeySchema=[{'AttributeName': 'Counter-ID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'Counter-ID', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    client.get_waiter('table_exists').wait(TableName=dynamodb_table.counts_table_name)
+
+def reconcile_counts(dynamodb_table, total_segments=4, capacity_budget=None):
+
+    """
+    Summary:
+        Recomputes the aggregate access request counters from a full scan and overwrites the stored ones,
+        correcting any drift, e.g. from writes made before the counters existed.
+    Args:
+        dynamodb_table (DynamoDB): The access requests table, configured with a counts table name.
+        total_segments (int): The number of parallel scan segments.
+        capacity_budget (float, optional): The read capacity units per second the scan may consume.
+    Returns:
+        dict: The counters that changed, with their stored and recomputed values.
+    Note:
+        - Requests created, updated or deleted while the scan runs may be counted twice or not at all,
+          so run it when the portal is quiet, or run it again afterwards.
+    """
+
+    counters = aggregate_counts(dynamodb_table.parallel_scan(total_segments=total_segments, capacity_budget=capacity_budget))
+    stored_counters = dynamodb_table.read_counters()
+    differences = {
+        name: (int(stored_counters.get(name, 0)), counters.get(name, 0))
+        for name in (set(counters) | set(stored_counters)) - {'Counter-ID'}
+        if int(stored_counters.get(name, 0)) != counters.get(name, 0)
+    }
+    dynamodb_table.dynamodb.Table(dynamodb_table.counts_table_name).put_item(Item=dict(counters, **{'Counter-ID': ACCESS_REQUEST_COUNTS_ID}))
+    return differences
+
+def main(argv=sys.argv):
+
+    """
+    Summary:
+        Reconciles the aggregate access request counters with the access requests table. The tables are
+        taken from the REGION_NAME, DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME and
+        DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME environment variables used by the application.
+    Args:
+        argv (list): The command line arguments.
+    Example:
+        cfi_reconcile_access_request_counts --create-table --segments 8 --capacity-budget 50
+    """
+
+    parser = argparse.ArgumentParser(description='Recompute the aggregate access request counters from a scan.')
+    parser.add_argument('--create-table', action='store_true', help='create the counts table if it does not exist')
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments')
+    parser.add_argument('--capacity-budget', type=float, default=None, help='read capacity units per second for the scan')
+    args = parser.parse_args(argv[1:])
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", datefmt="%d/%m/%Y %H:%M:%S")
+    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
+    if not dynamodb_table.counts_table_name:
+        parser.error('DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME is not set.')
+    if args.create_table:
+        create_counts_table(dynamodb_table)
+    differences = reconcile_counts(dynamodb_table, args.segments, args.capacity_budget)
+    for name, (stored, counted) in sorted(differences.items()):
+        logger.info('Corrected %s from %s to %s.', name, stored, counted)
+    logger.info('Reconciled the access request counters, %s corrected.', len(differences))
@@ -0,0 +1,113 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from cfi_self_service.backend.aws.dynamodb import DynamoDB
+from cfi_self_service.backend.utilities.access_requests import ACCESS_REQUEST_INDEXES, index_attributes
+
+# Create and configure a logger instance:
+logger = logging.getLogger(__name__)
+
+def wait_for_index(client, table_name, index_name, poll_seconds=10):
+
+    """
+    Summary:
+        Waits until a global secondary index (and its table) are ACTIVE.
+    Args:
+        client (botocore.client.BaseClient): The DynamoDB client.
+        table_name (str): The name of the table.
+        index_name (str): The name of the index.
+        poll_seconds (int): The number of seconds between status checks.
+    """
+
+    while True:
+        table = client.describe_table(TableName=table_name)['Table']
+        index_status = {index['IndexName']: index['IndexStatus'] for index in table.get('GlobalSecondaryIndexes', [])}
+        if table['TableStatus'] == 'ACTIVE' and index_status.get(index_name) == 'ACTIVE':
+            return
+        logger.info('Waiting for index %s (%s)...', index_name, index_status.get(index_name, 'PENDING'))
+        time.sleep(poll_seconds)
+
+def create_indexes(dynamodb_table):
+
+    """
+    Summary:
+        Creates any of the access requests table's secondary indexes that do not exist yet.
+        DynamoDB only builds one new index per update_table call, so each index is created in turn
+        and waited for before the next one.
+    Args:
+        dynamodb_table (DynamoDB): The access requests table.
+    """
+
+    client = dynamodb_table.dynamodb.meta.client
+    table = client.describe_table(TableName=dynamodb_table.table_name)['Table']
+    existing_indexes = {index['IndexName'] for index in table.get('GlobalSecondaryIndexes', [])}
+    for index in ACCESS_REQUEST_INDEXES:
+        if index['IndexName'] in existing_indexes:
+            logger.info('Index %s already exists.', index['IndexName'])
+            continue
+        logger.info('Creating index %s...', index['IndexName'])
+        create_index = {key: index[key] for key in ('IndexName', 'KeySchema', 'Projection')}
+        # Provisioned tables need throughput for the new index as well:
+        if table.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+            create_index['ProvisionedThroughput'] = {
+                'ReadCapacityUnits': table['ProvisionedThroughput']['ReadCapacityUnits'],
+                'WriteCapacityUnits': table['ProvisionedThroughput']['WriteCapacityUnits']
+            }
+        client.update_table(
+            TableName=dynamodb_table.table_name,
+            AttributeDefinitions=index['AttributeDefinitions'],
+            GlobalSecondaryIndexUpdates=[{'Create': create_index}]
+        )
+        wait_for_index(client, dynamodb_table.table_name, index['IndexName'])
+
+def backfill_index_attributes(dynamodb_table, total_segments=4, capacity_budget=None):
+
+    """
+    Summary:
+        Adds or corrects the secondary index key attributes of every existing access request.
+    Args:
+        dynamodb_table (DynamoDB): The access requests table.
+        total_segments (int): The number of parallel scan segments.
+        capacity_budget (float, optional): The read capacity units per second the scan may consume.
+    Returns:
+        int: The number of items that were updated.
+    """
+
+    updated = 0
+    for item in dynamodb_table.parallel_scan(total_segments=total_segments, capacity_budget=capacity_budget):
+        derived = index_attributes(item)
+        changes = {name: value for name, value in derived.items() if item.get(name) != value}
+        if changes:
+            # Pass the whole item, so attributes derived from the changes are built from all of its attributes:
+            dynamodb_table.update_access_request(item['Request-ID'], changes, item)
+            updated += 1
+    return updated
+
+def main(argv=sys.argv):
+
+    """
+    Summary:
+        Creates the secondary indexes of the access requests table and backfills their key attributes.
+        The table is taken from the REGION_NAME and DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME environment
+        variables used by the application.
+    Args:
+        argv (list): The command line arguments.
+    Example:
+        cfi_setup_access_requests_table --backfill --segments 8 --capacity-budget 50
+    """
+
+    parser = argparse.ArgumentParser(description='Create and backfill the access requests table indexes.')
+    parser.add_argument('--backfill', action='store_true', help='backfill index key attributes on existing items')
+    parser.add_argument('--skip-create', action='store_true', help='do not create missing indexes')
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments used by the backfill')
+    parser.add_argument('--capacity-budget', type=float, default=None, help='read capacity units per second for the backfill scan')
+    args = parser.parse_args(argv[1:])
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", datefmt="%d/%m/%Y %H:%M:%S")
+    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
+    if not args.skip_create:
+        create_indexes(dynamodb_table)
+    if args.backfill:
+        updated = backfill_index_attributes(dynamodb_table, args.segments, args.capacity_budget)
+        logger.info('Backfilled index attributes on %s items.', updated)
@@ -1,14 +1,16 @@
 from datetime import datetime
 import uuid
-import math
-import os
-from pyramid.httpexceptions import HTTPFound
-from pyramid.response import Response
+from pyramid.httpexceptions import HTTPFound, HTTPNotFound
+from pyramid.response import FileResponse
 from pyramid.view import view_config
-from cfi_self_service.backend.aws.dynamodb import DynamoDB
+from cfi_self_service.backend.aws.concurrency import fan_out_pool
+from cfi_self_service.backend.aws.dynamodb import indexes_enabled
 from cfi_self_service.backend.models.access_request import Access_Request
 from cfi_self_service.backend.security.authentication import authenticated_view
-from cfi_self_service.backend.utilities.access_requests import get_status_counts, csv_data_export
+from cfi_self_service.backend.utilities.access_requests import DASHBOARD_ATTRIBUTES, sortable_timestamp, top_access_requests
+from cfi_self_service.backend.utilities.export_jobs import ExportLimitError, export_job_manager, export_job_progress
+from cfi_self_service.backend.utilities.pagination import cursor_offset, dashboard_counts_enabled, dashboard_page_size, offset_page
+from cfi_self_service.backend.utilities.request_services import access_requests_table
 
 @view_config(route_name='access-requests-dashboard', renderer='cfi_self_service:frontend/templates/access_requests/dashboard.jinja2')
 @authenticated_view
@@ -20,52 +22,64 @@ def access_requests_dashboard_view(request):
         This view handles displaying the dashboard, including filtering access requests by status
         and environment, querying the DynamoDB table, sorting the results, calculating status counts,
         setting up pagination, and rendering the template.
+        When the table's indexes are enabled, the filters become newest-first queries on the status,
+        environment or request date index that read a single page from the position held in a signed
+        cursor, and the counts come from count-only queries.
+        Exports of the matching records are queued through access_requests_export_view.
     Args:
         request (Request): The Pyramid request object representing the HTTP request.
     Returns:
         dict: A dictionary containing data to be passed to the renderer for rendering the template.
             It includes information such as subtitle, title, paginated items, selected status and environment,
-            status counts, page number, and total number of pages.
+            the environments to filter by, status counts, and the cursors and link parameters of the next and previous pages.
+    Note:
+        - The page size comes from the 'page_size' parameter or DASHBOARD_PAGE_SIZE. With the indexes, the
+          status counts are only shown by default when a counts table makes them a single read, so no
+          request reads the whole index; DASHBOARD_STATUS_COUNTS turns them on or off explicitly.
     """
 
     # Load any flash messages that are available to display to the user:
     messages = request.session.pop_flash()
-    # Perform a query to see if there are any outstanding notifications for the user:
-    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-    request_notifications = dynamodb_table.scan_for_request_notifications(request.session["email_address"])
-    # Raise an alert on the navigation if notifications are unread:
-    request_notifications_alert = False
-    if request_notifications:
-        request_notifications_alert = True
+    dynamodb_table = request.dynamodb_table
     # Obtain form data values:
     form_data = request.params
     selected_status = form_data.get('status')
     selected_environment = form_data.get('environment')
-    # Perform DynamoDB table query to return list of records:
-    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-    response = dynamodb_table.scan_access_requests_table(selected_status, selected_environment)
-    sorted_items = sorted(response, key=lambda x: ( x.get('access-status', ''), datetime.strptime(x.get('access-request-date'), '%d/%m/%Y %H:%M') ), reverse=True)
-    # Get status counts based on returned results:
-    status_counts = get_status_counts(sorted_items)
-    # Setup pagination on the final set of results:
-    items_per_page = 10
-    page = int(request.params.get('page', 1))
-    # Perform calculations on page numbers based on final set of results:
-    total_pages = math.ceil(len(sorted_items) / items_per_page)
-    start_index = (page - 1) * items_per_page
-    end_index = start_index + items_per_page
-    paginated_items = sorted_items[start_index:end_index]
-    # Handle POST request for exporting data:
-    if request.method == "POST":
-        # Get the current date and time as format as required:
-        current_datetime = datetime.now()
-        formatted_datetime = current_datetime.strftime("%d-%m-%Y-%H:%M")
-        # Export data in CSV format:
-        csv_content = csv_data_export(sorted_items)
-        csv_response = Response(content_type='text/csv')
-        csv_response.content_disposition = f'attachment;filename=cfi_self_service_exported_data_{formatted_datetime}.csv'
-        csv_response.text = csv_content
-        return csv_response
+    # Setup cursor pagination, keeping the filters and page size on the page links:
+    page_size = dashboard_page_size(form_data.get('page_size'))
+    cursor = form_data.get('cursor')
+    pagination_params = {'status': selected_status or '', 'environment': selected_environment or ''}
+    if form_data.get('page_size'):
+        pagination_params['page_size'] = page_size
+    # Read the outstanding notifications for the user and the environments to filter by in parallel with the records:
+    calls = {
+        'notifications': lambda: request.request_notifications,
+        'environments': lambda: request.environment_registry.environments()
+    }
+    if indexes_enabled():
+        # Count the matching records and read only the requested page of the newest-first index query:
+        calls['result_page'] = lambda: dynamodb_table.access_requests_page(selected_status, selected_environment, page_size, cursor, DASHBOARD_ATTRIBUTES)
+        if dashboard_counts_enabled():
+            calls['status_counts'] = lambda: dynamodb_table.count_access_requests(selected_status, selected_environment)
+        results = fan_out_pool.gather(calls)
+        result_page = results['result_page']
+        status_counts = results.get('status_counts')
+    else:
+        # Perform DynamoDB table query to return list of records, reading only the rendered attributes,
+        # and select only the records up to the end of the requested page, counting statuses in the same pass.
+        # The scan reads the whole table, so it is not held to the fan-out timeout:
+        calls['top_items'] = lambda: top_access_requests(
+            dynamodb_table.scan_access_requests_table(selected_status, selected_environment, attributes=DASHBOARD_ATTRIBUTES),
+            cursor_offset(cursor) + page_size
+        )
+        results = fan_out_pool.gather(calls, timeouts={'top_items': None})
+        top_items, status_counts = results['top_items']
+        result_page = offset_page(top_items, page_size, cursor, status_counts['total_requests'])
+    request_notifications = results['notifications']
+    # Raise an alert on the navigation if notifications are unread:
+    request_notifications_alert = False
+    if request_notifications:
+        request_notifications_alert = True
     # Return data for rendering the template:
     return {
         'subtitle': 'CFI Self Service Portal',
@@ -74,12 +88,14 @@ def access_requests_dashboard_view(request):
         'notifications_alert_show': request_notifications_alert,
         'notifications': request_notifications,
         'message': messages,
-        'result': paginated_items,
+        'result': result_page.items,
         'selected_status': selected_status,
         'selected_environment': selected_environment,
+        'environments': results['environments'],
         'status_counts': status_counts,
-        'page': page,
-        'total_pages': total_pages
+        'pagination_params': pagination_params,
+        'next_cursor': result_page.next_cursor,
+        'previous_cursor': result_page.previous_cursor
     }
 
 @view_config(route_name='access-requests-new', renderer='cfi_self_service:frontend/templates/access_requests/new.jinja2')
@@ -93,18 +109,19 @@ def access_requests_new_view(request):
         request (Request): The Pyramid request object representing the HTTP request.
     Returns:
         dict: A dictionary containing data to be passed to the renderer for rendering the template.
-            In this case, it includes 'subtitle' and 'title' for the template.
+            In this case, it includes 'subtitle', 'title' and the environments that can be requested.
     Example:
         This view is used to render a form for creating a new access request.
         Upon form submission, it processes the request and redirects the user to the dashboard.
     Note:
-        - The 'access-request-date' field is set to the current date and time.
+        - The 'access-request-date' field is set to the current date and time, and 'access-request-timestamp'
+          to the same moment in a sortable ISO-8601 form.
         - The 'access-status' field is set to 'Pending' by default for a new request.
     """
 
     # Perform a query to see if there are any outstanding notifications for the user:
-    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-    request_notifications = dynamodb_table.scan_for_request_notifications(request.session["email_address"])
+    dynamodb_table = request.dynamodb_table
+    request_notifications = request.request_notifications
     # Raise an alert on the navigation if notifications are unread:
     request_notifications_alert = False
     if request_notifications:
@@ -113,7 +130,8 @@ def access_requests_new_view(request):
     if request.method == "POST":
         # Extract form data from the request:
         form_data = request.params
-        # Construct item representing the access request:
+        # Construct item representing the access request, with a sortable copy of its request date:
+        request_date = datetime.now()
         item = {
             'Request-ID': str(uuid.uuid4()),
             'access-first-name': form_data.get('firstName'),
@@ -122,22 +140,23 @@ def access_requests_new_view(request):
             'access-environment': form_data.get('environmentRequired'),
             'access-email-address': form_data.get('emailAddress'),
             'access-status': 'Pending',
-            'access-request-date': datetime.now().strftime("%d/%m/%Y %H:%M"),
+            'access-request-date': request_date.strftime("%d/%m/%Y %H:%M"),
+            'access-request-timestamp': sortable_timestamp(request_date),
             'access-comments': form_data.get('requestComments'),
         }
-        # Initialize DynamoDB instance and create the item:
-        dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
+        # Create the item in the DynamoDB table:
         dynamodb_table.create_item(item)
         # Redirect user to the access requests dashboard:
         request.session.flash('Record Submitted')
         redirect_url = request.route_url('access-requests-dashboard')
         raise HTTPFound(redirect_url)
-    # Return data for rendering the template:
+    # Return data for rendering the template, with the environments that can be requested:
     return {
         'subtitle': 'CFI Self Service Portal - Access Requests',
         'title': 'New Request',
         'notifications_alert_show': request_notifications_alert,
         'notifications': request_notifications,
+        'environments': request.environment_registry.environments(),
     }
 
 @view_config(route_name='access-requests-existing', renderer='cfi_self_service:frontend/templates/access_requests/existing.jinja2')
@@ -162,57 +181,52 @@ def access_requests_existing_view(request):
         - Admin users can update the access request status and provide comments via a form submission.
     """
 
-    # Perform a query to see if there are any outstanding notifications for the user:
-    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-    request_notifications = dynamodb_table.scan_for_request_notifications(request.session["email_address"])
+    dynamodb_table = request.dynamodb_table
+    # Retrieve request ID from route parameters:
+    request_id = request.matchdict['id']
+    # Retrieve the outstanding notifications for the user and the access request details in parallel:
+    results = fan_out_pool.gather({
+        'notifications': lambda: request.request_notifications,
+        'item': lambda: dynamodb_table.get_item(request_id)
+    })
+    request_notifications = results['notifications']
+    current_item = results['item']
     # Raise an alert on the navigation if notifications are unread:
     request_notifications_alert = False
     if request_notifications:
         request_notifications_alert = True
-    # Retrieve request ID from route parameters:
-    request_id = request.matchdict['id']
-    # Initialize DynamoDB instance and retrieve access request details:
-    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-    response = dynamodb_table.get_item(request_id)
-    # Initialize Access_Request object to hold access request details:
-    access_request_values = None
-    # Extract and populate Access_Request object with retrieved data:
-    for item in response['Items']:
-        access_request_values = Access_Request(
-            item.get('access-first-name'),
-            item.get('access-last-name'),
-            item.get('access-email-address'),
-            item.get('access-team'),
-            item.get('access-environment'),
-            item.get('access-status'),
-            item.get('access-comments'),
-            item.get('access-request-date'),
-            item.get('admin-full-name'),
-            item.get('admin-response-date'),
-            item.get('admin-comments')
-        )
+    if current_item is None:
+        raise HTTPNotFound()
+    # Populate Access_Request object with retrieved data:
+    access_request_values = Access_Request(
+        current_item.get('access-first-name'),
+        current_item.get('access-last-name'),
+        current_item.get('access-email-address'),
+        current_item.get('access-team'),
+        current_item.get('access-environment'),
+        current_item.get('access-status'),
+        current_item.get('access-comments'),
+        current_item.get('access-request-date'),
+        current_item.get('admin-full-name'),
+        current_item.get('admin-response-date'),
+        current_item.get('admin-comments')
+    )
     # Handle POST request for updating access request details:
     if request.method == "POST":
         # Extract form data from the request:
         form_data = request.params
-        # Define update expression and attribute values for updating the item in DynamoDB:
-        update_expression = "SET #access_status = :access_form_status, #admin_comments = :admin_form_comments, #admin_full_name = :admin_form_full_name, #admin_response_date = :admin_form_response_date, #notification_alert = :notification_alert"
-        expression_attribute_names = {
-            '#access_status': 'access-status',
-            '#admin_comments': 'admin-comments',
-            '#admin_full_name': 'admin-full-name',
-            '#admin_response_date': 'admin-response-date',
-            '#notification_alert': 'notification-alert'
-        }
-        expression_attribute_values = {
-            ':access_form_status': form_data.get('adminStatus'),
-            ':admin_form_comments': form_data.get('adminComments'),
-            ':admin_form_full_name': 'Ryan Jackson',  # Assuming admin's full name is hardcoded
-            ':admin_form_response_date': datetime.now().strftime("%d/%m/%Y %H:%M"),
-            ':notification_alert': 'true',
+        # Define the attributes to update, raising a notification for the requester:
+        response_date = datetime.now()
+        attributes = {
+            'access-status': form_data.get('adminStatus'),
+            'admin-comments': form_data.get('adminComments'),
+            'admin-full-name': 'Ryan Jackson',  # Assuming admin's full name is hardcoded
+            'admin-response-date': response_date.strftime("%d/%m/%Y %H:%M"),
+            'admin-response-timestamp': sortable_timestamp(response_date),
+            'notification-alert': 'true',
         }
         # Update the item in DynamoDB with the provided information:
-        dynamodb_table.update_item(request_id, update_expression, expression_attribute_names, expression_attribute_values)
+        dynamodb_table.update_access_request(request_id, attributes, current_item)
         # Redirect user to the access requests dashboard:
         request.session.flash('Record Updated')
         redirect_url = request.route_url('access-requests-dashboard')
@@ -238,7 +252,8 @@ def access_requests_admin_view(request):
         request (Request): The Pyramid request object representing the HTTP request.
     Returns:
         dict: A dictionary containing data to be passed to the renderer for rendering the template.
-            It includes information such as subtitle, title, access request details, and current date-time.
+            It includes information such as subtitle, title, access request details, the environments
+            it can be moved to, and current date-time.
     Example:
         This view is used by administrators to manage access requests.
         It allows administrators to update access request details and delete access requests as needed.
@@ -249,72 +264,63 @@ def access_requests_admin_view(request):
     """
 
     if (request.session["admin_user"] is True):
-        # Perform a query to see if there are any outstanding notifications for the user:
-        dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-        request_notifications = dynamodb_table.scan_for_request_notifications(request.session["email_address"])
+        dynamodb_table = request.dynamodb_table
+        # Retrieve request ID from route parameters:
+        request_id = request.matchdict['id']
+        # Retrieve the outstanding notifications for the user, the access request details and the
+        # environments it can be moved to in parallel:
+        results = fan_out_pool.gather({
+            'notifications': lambda: request.request_notifications,
+            'item': lambda: dynamodb_table.get_item(request_id),
+            'environments': lambda: request.environment_registry.environments()
+        })
+        request_notifications = results['notifications']
+        current_item = results['item']
         # Raise an alert on the navigation if notifications are unread:
         request_notifications_alert = False
         if request_notifications:
             request_notifications_alert = True
-        # Retrieve request ID from route parameters:
-        request_id = request.matchdict['id']
-        # Initialize DynamoDB instance and retrieve access request details:
-        dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-        response = dynamodb_table.get_item(request_id)
-        # Initialize Access_Request object to hold access request details:
-        access_request_values = None
-        # Extract and populate Access_Request object with retrieved data:
-        for item in response['Items']:
-            access_request_values = Access_Request(
-                item.get('access-first-name'),
-                item.get('access-last-name'),
-                item.get('access-email-address'),
-                item.get('access-team'),
-                item.get('access-environment'),
-                item.get('access-status'),
-                item.get('access-comments'),
-                item.get('access-request-date'),
-                item.get('admin-full-name'),
-                item.get('admin-response-date'),
-                item.get('admin-comments')
-            )
+        if current_item is None:
+            raise HTTPNotFound()
+        # Populate Access_Request object with retrieved data:
+        access_request_values = Access_Request(
+            current_item.get('access-first-name'),
+            current_item.get('access-last-name'),
+            current_item.get('access-email-address'),
+            current_item.get('access-team'),
+            current_item.get('access-environment'),
+            current_item.get('access-status'),
+            current_item.get('access-comments'),
+            current_item.get('access-request-date'),
+            current_item.get('admin-full-name'),
+            current_item.get('admin-response-date'),
+            current_item.get('admin-comments')
+        )
         # Handle POST request for administrative actions:
         if request.method == "POST":
             form_data = request.params
             # Handle update action:
             if form_data.get('AdminControlPanel') == "Update":
-                update_expression = "SET #access_email_address = :access_email_address, #access_environment = :access_environment, #access_first_name = :access_first_name, #access_last_name = :access_last_name, #access_request_date = :access_request_date, #access_status = :access_status, #access_team = :access_team, #admin_full_name = :admin_full_name, #admin_comments = :admin_comments, #admin_response_date = :admin_response_date, #notification_alert = :notification_alert"
-                expression_attribute_names = {
-                    '#access_email_address': 'access-email-address',
-                    '#access_environment': 'access-environment',
-                    '#access_first_name': 'access-first-name',
-                    '#access_last_name': 'access-last-name',
-                    '#access_request_date': 'access-request-date',
-                    '#access_status': 'access-status',
-                    '#access_team': 'access-team',
-                    '#admin_full_name': 'admin-full-name',
-                    '#admin_comments': 'admin-comments',
-                    '#admin_response_date': 'admin-response-date',
-                    '#notification_alert': 'notification-alert',
-                }
-                expression_attribute_values = {
-                    ':access_email_address': form_data.get('emailAddress'),
-                    ':access_environment': form_data.get('environmentRequired'),
-                    ':access_first_name': form_data.get('firstName'),
-                    ':access_last_name': form_data.get('lastName'),
-                    ':access_request_date': form_data.get('requestDate'),
-                    ':access_status': form_data.get('requestStatus'),
-                    ':access_team': form_data.get('teamName'),
-                    ':admin_full_name': 'Ryan Jackson',  # Assuming admin's full name is hardcoded
-                    ':admin_comments': form_data.get('adminComments'),
-                    ':admin_response_date': datetime.now().strftime("%d/%m/%Y %H:%M"),
-                    ':notification_alert': 'false',
+                response_date = datetime.now()
+                attributes = {
+                    'access-email-address': form_data.get('emailAddress'),
+                    'access-environment': form_data.get('environmentRequired'),
+                    'access-first-name': form_data.get('firstName'),
+                    'access-last-name': form_data.get('lastName'),
+                    'access-request-date': form_data.get('requestDate'),
+                    'access-status': form_data.get('requestStatus'),
+                    'access-team': form_data.get('teamName'),
+                    'admin-full-name': 'Ryan Jackson',  # Assuming admin's full name is hardcoded
+                    'admin-comments': form_data.get('adminComments'),
+                    'admin-response-date': response_date.strftime("%d/%m/%Y %H:%M"),
+                    'admin-response-timestamp': sortable_timestamp(response_date),
+                    'notification-alert': 'false',
                 }
-                dynamodb_table.update_item(request_id, update_expression, expression_attribute_names, expression_attribute_values)    
+                dynamodb_table.update_access_request(request_id, attributes, current_item)
                 request.session.flash('Record Updated')
             # Handle delete action:
             if form_data.get('AdminControlPanel') == "Delete":
-                dynamodb_table.delete_item(request_id)
+                dynamodb_table.delete_item(request_id, current_item)
                 request.session.flash('Record Deleted')
             raise HTTPFound(request.route_url('access-requests-dashboard'))  # Redirect to environment dashboard after deletion
         # Return data for rendering the template:
@@ -324,9 +330,133 @@ def access_requests_admin_view(request):
             'notifications_alert_show': request_notifications_alert,
             'notifications': request_notifications,
             'access_request': access_request_values,
+            'environments': results['environments'],
             'current_date_time': datetime.now().strftime("%d/%m/%Y %H:%M")
         }
     else:
         # Redirect user to the access requests dashboard:
         redirect_url = request.route_url('access-requests-dashboard')
         raise HTTPFound(redirect_url)
+
+@view_config(route_name='access-requests-export', request_method='POST')
+@authenticated_view
+def access_requests_export_view(request):
+
+    """
+    Summary:
+        Queues a background export of the access requests matching the dashboard's filters.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        HTTPFound: A redirect to the export's status page, or back to the dashboard with a flash
+                   message if too many exports are already in progress.
+    Note:
+        - The export reads the table on the export worker pool rather than this request thread.
+        - The expected number of rows is only looked up when the aggregate counters make it a single read.
+    """
+
+    # Obtain form data values:
+    form_data = request.params
+    selected_status = form_data.get('status') or None
+    selected_environment = form_data.get('environment') or None
+    dynamodb_table = request.dynamodb_table
+    total_rows = None
+    if dynamodb_table.counts_table_name:
+        total_rows = dynamodb_table.count_access_requests(selected_status, selected_environment)['total_requests']
+
+    def load_items():
+        # Read the matching records lazily on the export worker, with a table handle of its own built
+        # like the request's:
+        export_table = access_requests_table()
+        if indexes_enabled():
+            return export_table.query_access_requests(selected_status, selected_environment)
+        return export_table.scan_access_requests_table(selected_status, selected_environment)
+
+    try:
+        job = export_job_manager.submit(request.session["email_address"], selected_status, selected_environment, load_items, total_rows)
+    except ExportLimitError as e:
+        print("Queuing access requests export - an error occurred - ", e)
+        request.session.flash('Export Limit')
+        raise HTTPFound(request.route_url('access-requests-dashboard'))
+    raise HTTPFound(request.route_url('access-requests-export-status', job_id=job.job_id))
+
+@view_config(route_name='access-requests-export-status', renderer='cfi_self_service:frontend/templates/access_requests/export.jinja2')
+@authenticated_view
+def access_requests_export_status_view(request):
+
+    """
+    Summary:
+        Renders the status page of a background export, which polls its progress until the file
+        can be downloaded.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        dict: A dictionary containing data to be passed to the renderer for rendering the template.
+            It includes information such as subtitle, title and the progress of the export.
+    """
+
+    job = export_job_manager.get(request.matchdict['job_id'], request.session["email_address"])
+    if job is None:
+        raise HTTPNotFound()
+    # Perform a query to see if there are any outstanding notifications for the user:
+    request_notifications = request.request_notifications
+    # Raise an alert on the navigation if notifications are unread:
+    request_notifications_alert = False
+    if request_notifications:
+        request_notifications_alert = True
+    # Return data for rendering the template:
+    return {
+        'subtitle': 'CFI Self Service Portal - Access Requests',
+        'title': 'Export Access Requests',
+        'admin_user': request.session["admin_user"],
+        'notifications_alert_show': request_notifications_alert,
+        'notifications': request_notifications,
+        'selected_status': job.selected_status,
+        'selected_environment': job.selected_environment,
+        'progress': export_job_progress(job)
+    }
+
+@view_config(route_name='access-requests-export-progress', renderer='json')
+@authenticated_view
+def access_requests_export_progress_view(request):
+
+    """
+    Summary:
+        Returns the progress of a background export as JSON, for the status page to poll.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        dict: The progress of the export, as described by export_job_progress.
+    """
+
+    job = export_job_manager.get(request.matchdict['job_id'], request.session["email_address"])
+    if job is None:
+        raise HTTPNotFound()
+    request.response.cache_control = 'no-store'
+    return export_job_progress(job)
+
+@view_config(route_name='access-requests-export-download')
+@authenticated_view
+def access_requests_export_download_view(request):
+
+    """
+    Summary:
+        Downloads the gzipped CSV of a completed background export.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        FileResponse: The export, streamed from the spool directory as a .csv.gz attachment.
+    """
+
+    job = export_job_manager.get(request.matchdict['job_id'], request.session["email_address"])
+    if job is None or job.status != 'complete':
+        raise HTTPNotFound()
+    formatted_datetime = datetime.fromtimestamp(job.finished_at).strftime("%d-%m-%Y-%H:%M")
+    try:
+        file_response = FileResponse(job.file_path, request=request, content_type='application/gzip')
+    except OSError as e:
+        print("Downloading access requests export - an error occurred - ", e)
+        raise HTTPNotFound()
+    file_response.content_disposition = f'attachment;filename=cfi_self_service_exported_data_{formatted_datetime}.csv.gz'
+    file_response.cache_control = 'no-store'
+    return file_response
@@ -1,8 +1,6 @@
 
-import os
 from pyramid.view import view_config
 from cfi_self_service.backend.security.authentication import authenticated_view
-from cfi_self_service.backend.aws.dynamodb import DynamoDB
 
 @view_config(route_name='home', renderer='cfi_self_service:frontend/templates/dashboard/home.jinja2')
 @authenticated_view
@@ -21,8 +19,8 @@ def home_view(request):
     """
 
     # Perform a query to see if there are any outstanding notifications for the user:
-    dynamodb_table = DynamoDB(os.environ.get('REGION_NAME'), os.environ.get('DYNAMO_DB_ACCESS_REQUESTS_TABLE_NAME'))
-    request_notifications = dynamodb_table.scan_for_request_notifications(request.session["email_address"])
+    dynamodb_table = request.dynamodb_table
+    request_notifications = request.request_notifications
     # Raise an alert on the navigation if notifications are unread:
     request_notifications_alert = False
     if request_notifications:
@@ -0,0 +1,35 @@
+from pyramid.httpexceptions import HTTPFound
+from pyramid.view import view_config
+from cfi_self_service.backend.aws.dynamodb import access_request_cache
+from cfi_self_service.backend.aws.resilience import resilience_metrics
+from cfi_self_service.backend.aws.secrets import secret_cache
+from cfi_self_service.backend.security.authentication import authenticated_view
+
+@view_config(route_name='admin-metrics', renderer='json')
+@authenticated_view
+def admin_metrics_view(request):
+
+    """
+    Summary:
+        Returns this process's AWS resilience and cache metrics as JSON, for administrators.
+    Args:
+        request (Request): The Pyramid request object representing the HTTP request.
+    Returns:
+        dict: The circuit breaker state and retry counts of each AWS service, the per-secret counters of
+              the secret cache, and the hit, miss, eviction and invalidation counts of the access request cache.
+    Note:
+        - The metrics are held in memory, so each process behind the load balancer reports its own.
+        - Users who are not administrators are redirected to the access requests dashboard.
+    """
+
+    if (request.session["admin_user"] is True):
+        request.response.cache_control = 'no-store'
+        return {
+            'circuit_breakers': resilience_metrics(),
+            'secret_cache': secret_cache.metrics(),
+            'access_request_cache': access_request_cache.metrics()
+        }
+    else:
+        # Redirect user to the access requests dashboard:
+        redirect_url = request.route_url('access-requests-dashboard')
+        raise HTTPFound(redirect_url)
@@ -1,10 +1,8 @@
 
-import os
 from pyramid.httpexceptions import HTTPFound
 from pyramid.security import remember
 from pyramid.view import view_config
-from cfi_self_service.backend.aws.cognito import Cognito
-from cfi_self_service.backend.aws.secrets import Secrets
+from cfi_self_service.backend.utilities.qr_codes import render_totp_qr_svg, svg_data_uri
 
 @view_config(route_name='mfa-setup', renderer='cfi_self_service:frontend/templates/login/mfa/setup.jinja2')
 def mfa_setup_view(request):
@@ -24,28 +22,27 @@ def mfa_setup_view(request):
         process, handles user preferences, and redirects the user to the login page after successful setup.
     Note:
         - The method relies on an instance of the Cognito class to handle MFA setup and user preferences.
-        - The request.session['qr_code_path'] stores the path to the QR code image temporarily during the MFA 
-          setup process.
+        - The QR code is rendered in memory from request.session['secret_code'] and embedded in the page
+          as an SVG data URI, so it is never written to disk. The page is marked as not cacheable because
+          it contains the TOTP secret.
     """
 
-    # Retrieve the path to the QR code image from the session:
-    qr_image = request.session.get('qr_code_path', 'Default')
+    # Render the QR code image for the TOTP secret held in the session:
+    qr_image = None
+    if request.session.get('secret_code'):
+        qr_image = svg_data_uri(render_totp_qr_svg(request.session.get('email_address'), request.session['secret_code']))
+    request.response.cache_control = 'no-store'
     if request.method == "POST":
         # Extract form data:
         form_data = request.params
         verification_code = form_data.get('authVerificationCode')
         username = request.session['email_address']
-        # Retrieve secrets from AWS Secrets Manager:
-        region_name = os.environ.get('REGION_NAME')
-        secrets_instance = Secrets(region_name)
-        client_id = secrets_instance.get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY'))
-        user_pool_id = secrets_instance.get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY'))
         # Initialize Cognito instance and handle MFA verification and user preferences:
-        cognito = Cognito(client_id, user_pool_id, region_name)
+        cognito = request.cognito
         cognito.handle_verify_software_token(request, verification_code)
         cognito.handle_mfa_user_preferences(username)
-        # Remove the QR code file after successful setup:
-        os.remove(f"cfi_self_service/frontend/assets/qr/{request.session['qr_code_filename']}")
+        # Remove the TOTP secret from the session after successful setup:
+        request.session.pop('secret_code', None)
         # Redirect user to login page after completing MFA setup:
         request.session.flash('MFA Setup')
         redirect_url = request.route_url('login')
@@ -79,13 +76,8 @@ def mfa_request_view(request):
     """
 
     if request.method == "POST":
-        # Retrieve secrets from AWS Secrets Manager:
-        region_name = os.environ.get('REGION_NAME')
-        secrets_instance = Secrets(region_name)
-        client_id = secrets_instance.get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY'))
-        user_pool_id = secrets_instance.get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY'))
         # Initialize Cognito instance and handle MFA verification and user preferences:
-        cognito = Cognito(client_id, user_pool_id, region_name)
+        cognito = request.cognito
         software_token_response = cognito.challenge_software_token_mfa(request)
         # Check that authentication has been successful and redirect accordingly:
         cognito.handle_verify_successful_auth(request, software_token_response)
@@ -1,11 +1,8 @@
 
-import os
 from pyramid.httpexceptions import HTTPFound
 from pyramid.response import Response
 from pyramid.security import forget
 from pyramid.view import view_config
-from cfi_self_service.backend.aws.cognito import Cognito
-from cfi_self_service.backend.aws.secrets import Secrets
 
 @view_config(route_name='change-password-force', renderer='cfi_self_service:frontend/templates/login/password/reset.jinja2')
 def password_force_reset_view(request):
@@ -29,6 +26,8 @@ def password_force_reset_view(request):
         - The method relies on an instance of the Cognito class to perform the forced password reset action.
         - The request.session['email_address'] is used to store the user's email address temporarily during 
           the forced password reset process.
+        - When the login returned a NEW_PASSWORD_REQUIRED challenge, the new password is sent as the
+          challenge response and the login continues to MFA from there.
     """
 
     if request.method == "POST":
@@ -38,13 +37,15 @@ def password_force_reset_view(request):
         new_password = form_data.get('newPassword')
         # Store username in session:
         request.session['email_address'] = username
-        # Retrieve secrets from AWS Secrets Manager:
-        region_name = os.environ.get('REGION_NAME')
-        secrets_instance = Secrets(region_name)
-        client_id = secrets_instance.get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY'))
-        user_pool_id = secrets_instance.get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY'))
-        # Initialize Cognito instance and perform forced password change:
-        cognito = Cognito(client_id, user_pool_id, region_name)
+        # Initialize Cognito instance:
+        cognito = request.cognito
+        if request.session.get('password_challenge', False):
+            # Answer the NEW_PASSWORD_REQUIRED challenge from the login and continue the same auth flow,
+            # keeping the challenge flag until it has been answered so a failed attempt can be retried:
+            new_password_response = cognito.challenge_new_password(request, username, new_password)
+            request.session.pop('password_challenge', None)
+            cognito.handle_auth_challenge(request, new_password_response, username)
+        # Otherwise perform the forced password change directly:
         cognito.action_force_password_change(username, new_password)
         # Redirect user to login page after changing password:
         request.session.flash('Password Changed')
@@ -84,11 +85,7 @@ def password_change_request_view(request):
         # Store email address in session:
         request.session['email_address'] = email
         # Initialize Cognito instance and request manual password change:
-        region_name = os.environ.get('REGION_NAME')
-        secrets_instance = Secrets(region_name)
-        client_id = secrets_instance.get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY'))
-        user_pool_id = secrets_instance.get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY'))
-        cognito = Cognito(client_id, user_pool_id, region_name)
+        cognito = request.cognito
         cognito.request_manual_password_change(email)
         # Redirect user to password reset page after submitting request:
         redirect_url = request.route_url('password-reset')
@@ -129,11 +126,7 @@ def password_reset_view(request):
         # Store email address in session:
         request.session['email_address'] = email
         # Initialize Cognito instance and perform password change action:
-        region_name = os.environ.get('REGION_NAME')
-        secrets_instance = Secrets(region_name)
-        client_id = secrets_instance.get_secret(os.environ.get('COGNITO_CLIENT_ID_NAME'), os.environ.get('COGNITO_CLIENT_ID_KEY'))
-        user_pool_id = secrets_instance.get_secret(os.environ.get('COGNITO_USER_POOL_ID_NAME'), os.environ.get('COGNITO_USER_POOL_ID_KEY'))
-        cognito = Cognito(client_id, user_pool_id, region_name)
+        cognito = request.cognito
         cognito.action_manual_password_change(email, verification_code, new_password)
         # Redirect user to login page after password reset:
         request.session.flash('Password Changed')
@@ -0,0 +1,89 @@
+"""
+Summary:
+    Benchmarks the admin check made on each login as the Cognito admin group grows.
+    Compares the original single list_users_in_group call (Limit=10) with a nested attribute loop,
+    a full paginated group listing, the cached admin email set and the cognito:groups token claim.
+    Cognito is replaced by an in-memory stand-in that sleeps for API_LATENCY seconds per call.
+Usage:
+    python scripts/benchmarks/admin_lookup_benchmark.py
+"""
+
+import os
+import time
+import jwt
+from cfi_self_service.backend.aws.cognito import Cognito
+
+# Simulated round-trip time of one Cognito API call:
+API_LATENCY = 0.025
+# Maximum page size of list_users_in_group:
+PAGE_SIZE = 60
+GROUP_SIZES = [10, 100, 1000, 5000]
+LOGINS = 20
+
+class StubPaginator:
+
+    def __init__(self, users):
+        self.users = users
+
+    def paginate(self, **kwargs):
+        for start in range(0, len(self.users), PAGE_SIZE):
+            time.sleep(API_LATENCY)
+            yield {'Users': self.users[start:start + PAGE_SIZE]}
+
+class StubCognitoClient:
+
+    def __init__(self, group_size):
+        self.users = [
+            {'Username': f'user-{index}', 'Attributes': [
+                {'Name': 'sub', 'Value': str(index)},
+                {'Name': 'email_verified', 'Value': 'true'},
+                {'Name': 'email', 'Value': f'admin-{index}@example.com'}
+            ]} for index in range(group_size)
+        ]
+
+    def list_users_in_group(self, Limit, **kwargs):
+        time.sleep(API_LATENCY)
+        return {'Users': self.users[:Limit]}
+
+    def get_paginator(self, operation_name):
+        return StubPaginator(self.users)
+
+def legacy_check(client, username):
+    # The original behaviour: one page of ten users and a nested attribute loop:
+    admin_group = client.list_users_in_group(Limit=10)
+    for user in admin_group.get('Users', []):
+        for attribute in user.get('Attributes', []):
+            if attribute.get('Name') == 'email' and attribute.get('Value') == username:
+                return True
+    return False
+
+def timed(function, logins=LOGINS):
+    start = time.perf_counter()
+    for _ in range(logins):
+        result = function()
+    return (time.perf_counter() - start) / logins * 1000, result
+
+def main():
+    os.environ['COGNITO_USER_POOL_ADMIN_GROUP_NAME'] = 'admins'
+    print(f"{'group size':>10} | {'legacy ms':>10} {'correct':>7} | {'paginated ms':>12} | {'cached ms':>9} | {'claim ms':>8}")
+    for group_size in GROUP_SIZES:
+        client = StubCognitoClient(group_size)
+        cognito = Cognito.__new__(Cognito)
+        cognito.user_pool_id = f'pool-{group_size}'
+        cognito.cognito_client = client
+        username = f'admin-{group_size - 1}@example.com'
+        legacy_ms, legacy_result = timed(lambda: legacy_check(client, username))
+        # Full paginated listing on every login (no cache):
+        start = time.perf_counter()
+        cognito.list_users_in_group('admins')
+        paginated_ms = (time.perf_counter() - start) * 1000
+        # Cached admin email set (warm cache):
+        cognito.get_group_emails('admins')
+        cached_ms, _ = timed(lambda: cognito.check_user_is_admin({}, username))
+        # Group membership read from the token claim:
+        token = jwt.encode({'cognito:groups': ['admins'], 'token_use': 'access'}, 'secret', algorithm='HS256')
+        claim_ms, _ = timed(lambda: cognito.check_user_is_admin({'AccessToken': token}, username))
+        print(f"{group_size:>10} | {legacy_ms:>10.2f} {str(legacy_result):>7} | {paginated_ms:>12.2f} | {cached_ms:>9.3f} | {claim_ms:>8.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Summary:
+    Benchmarks selecting one dashboard page from the scanned access requests when the table's
+    indexes are not available. Compares the original full sort, which parses every request date with
+    strptime and then counts statuses in a second pass, with the single-pass top-k heap selection.
+    Requests are measured both before and after the timestamp backfill, for the first and a deep page.
+Usage:
+    python scripts/benchmarks/dashboard_sort_benchmark.py
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from cfi_self_service.backend.utilities.access_requests import (
+    ACCESS_REQUEST_STATUSES, get_status_counts, sortable_timestamp, top_access_requests
+)
+
+ITEM_COUNTS = [1000, 10000, 100000]
+PAGE_SIZE = 10
+# Offsets of the pages measured: the first page and the tenth page:
+PAGE_OFFSETS = [0, 90]
+REPEATS = 5
+
+def make_items(item_count, backfilled):
+    random.seed(item_count)
+    start = datetime(2023, 1, 1)
+    items = []
+    for index in range(item_count):
+        request_date = start + timedelta(minutes=random.randrange(525600))
+        item = {
+            'Request-ID': str(index),
+            'access-status': random.choice(ACCESS_REQUEST_STATUSES),
+            'access-request-date': request_date.strftime('%d/%m/%Y %H:%M'),
+        }
+        if backfilled:
+            item['access-request-timestamp'] = sortable_timestamp(request_date)
+        items.append(item)
+    return items
+
+def legacy_page(items, offset):
+    # The original behaviour: sort everything on a strptime key, then count statuses in a second pass:
+    sorted_items = sorted(items, key=lambda x: ( x.get('access-status', ''), datetime.strptime(x.get('access-request-date'), '%d/%m/%Y %H:%M') ), reverse=True)
+    return sorted_items[offset:offset + PAGE_SIZE], get_status_counts(sorted_items)
+
+def top_k_page(items, offset):
+    top_items, status_counts = top_access_requests(iter(items), offset + PAGE_SIZE)
+    return top_items[offset:offset + PAGE_SIZE], status_counts
+
+def timed(function):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function()
+    return (time.perf_counter() - start) / REPEATS * 1000, result
+
+def main():
+    print(f"{'items':>7} {'backfilled':>10} {'offset':>6} | {'full sort ms':>12} | {'top-k ms':>8} | {'speed-up':>8} {'same':>5}")
+    for item_count in ITEM_COUNTS:
+        for backfilled in (False, True):
+            items = make_items(item_count, backfilled)
+            for offset in PAGE_OFFSETS:
+                legacy_ms, legacy_result = timed(lambda: legacy_page(items, offset))
+                top_k_ms, top_k_result = timed(lambda: top_k_page(items, offset))
+                same = [item['Request-ID'] for item in legacy_result[0]] == [item['Request-ID'] for item in top_k_result[0]] and legacy_result[1] == top_k_result[1]
+                print(f"{item_count:>7} {str(backfilled):>10} {offset:>6} | {legacy_ms:>12.2f} | {top_k_ms:>8.2f} | {legacy_ms / top_k_ms:>7.1f}x {str(same):>5}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Summary:
+    Benchmarks DynamoDB.parallel_scan with 1, 4 and 16 segments against a local stand-in table.
+    The stand-in holds the items in memory, splits them into segments by key hash like DynamoDB does,
+    returns pages of PAGE_SIZE items and sleeps for PAGE_LATENCY seconds per page to model the
+    round trip of a real scan call.
+Usage:
+    python scripts/benchmarks/parallel_scan_benchmark.py
+"""
+
+import time
+import uuid
+import zlib
+from cfi_self_service.backend.aws.dynamodb import DynamoDB
+
+ITEM_COUNT = 20000
+PAGE_SIZE = 500
+PAGE_LATENCY = 0.02
+SEGMENT_COUNTS = [1, 4, 16]
+
+class LocalTable:
+
+    def __init__(self, items):
+        self.items = items
+        self.segments = {}
+
+    def split(self, total_segments):
+        # Assign every item to a segment by key hash, once per segment count:
+        if total_segments not in self.segments:
+            segments = [[] for _ in range(total_segments)]
+            for item in self.items:
+                segments[zlib.crc32(item['Request-ID'].encode()) % total_segments].append(item)
+            self.segments[total_segments] = segments
+        return self.segments[total_segments]
+
+    def scan(self, Segment=0, TotalSegments=1, ExclusiveStartKey=None, **kwargs):
+        time.sleep(PAGE_LATENCY)
+        segment_items = self.split(TotalSegments)[Segment]
+        start = ExclusiveStartKey['position'] if ExclusiveStartKey else 0
+        page = segment_items[start:start + PAGE_SIZE]
+        response = {'Items': page, 'ConsumedCapacity': {'CapacityUnits': len(page) / 10}}
+        if start + PAGE_SIZE < len(segment_items):
+            response['LastEvaluatedKey'] = {'position': start + PAGE_SIZE}
+        return response
+
+def main():
+    items = [{'Request-ID': str(uuid.uuid4()), 'access-status': 'Pending'} for _ in range(ITEM_COUNT)]
+    dynamodb_table = DynamoDB.__new__(DynamoDB)
+    dynamodb_table.table = LocalTable(items)
+    print(f"{'segments':>8} | {'items':>6} | {'seconds':>7} | {'time to first item':>18}")
+    for total_segments in SEGMENT_COUNTS:
+        dynamodb_table.table.split(total_segments)
+        start = time.perf_counter()
+        first_item_at = None
+        count = 0
+        for _ in dynamodb_table.parallel_scan(total_segments=total_segments, max_workers=total_segments):
+            if first_item_at is None:
+                first_item_at = time.perf_counter() - start
+            count += 1
+        print(f"{total_segments:>8} | {count:>6} | {time.perf_counter() - start:>7.3f} | {first_item_at:>17.3f}s")
+
+if __name__ == '__main__':
+    main()
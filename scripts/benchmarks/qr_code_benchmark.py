@@ -0,0 +1,52 @@
+"""
+Summary:
+    Benchmarks rendering the MFA setup QR code in memory as an SVG data URI against the original
+    path, which rendered a PNG with qrcode.make, saved it to disk and later removed it.
+    The PNG path needs Pillow and is skipped when it is not installed.
+Usage:
+    python scripts/benchmarks/qr_code_benchmark.py
+"""
+
+import os
+import tempfile
+import time
+import uuid
+import qrcode
+from cfi_self_service.backend.utilities.qr_codes import render_totp_qr_svg, svg_data_uri
+
+ITERATIONS = 200
+USERNAME = 'first.last@example.com'
+SECRET_CODE = 'JBSWY3DPEHPK3PXPJBSWY3DPEHPK3PXPJBSWY3DPEHPK3PXP'
+
+def png_to_disk(directory):
+    # The original behaviour: render a PNG, save it for the static view and delete it after setup:
+    qr_img = qrcode.make(f"otpauth://totp/{USERNAME}?secret={SECRET_CODE}")
+    qr_path = os.path.join(directory, f"qr-{str(uuid.uuid4())}.png")
+    qr_img.save(qr_path)
+    size = os.path.getsize(qr_path)
+    os.remove(qr_path)
+    return size
+
+def svg_in_memory():
+    return len(svg_data_uri(render_totp_qr_svg(USERNAME, SECRET_CODE)))
+
+def timed(function):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        size = function()
+    return (time.perf_counter() - start) / ITERATIONS * 1000, size
+
+def main():
+    svg_ms, svg_size = timed(svg_in_memory)
+    print(f"{'svg data uri (memory)':<24} {svg_ms:>8.3f} ms {svg_size:>8} bytes")
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print(f"{'png file (disk)':<24} skipped, Pillow is not installed")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        png_ms, png_size = timed(lambda: png_to_disk(directory))
+    print(f"{'png file (disk)':<24} {png_ms:>8.3f} ms {png_size:>8} bytes")
+
+if __name__ == '__main__':
+    main()
@@ -32,5 +32,10 @@ setup(
         'paste.app_factory': [
             'main = cfi_self_service:main',
         ],
+        'console_scripts': [
+            'cfi_setup_access_requests_table = cfi_self_service.scripts.setup_access_requests_table:main',
+            'cfi_backfill_access_request_timestamps = cfi_self_service.scripts.backfill_access_request_timestamps:main',
+            'cfi_reconcile_access_request_counts = cfi_self_service.scripts.reconcile_access_request_counts:main',
+        ],
     },
 )
@@ -0,0 +1,89 @@
+import pytest
+from botocore.stub import Stubber
+from cfi_self_service.backend.aws import dynamodb as dynamodb_module
+from cfi_self_service.backend.aws.dynamodb import AccessRequestCache, DynamoDB
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Control the time the cache sees, so entries can be expired without waiting:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(dynamodb_module.time, 'monotonic', fake_clock)
+    return fake_clock
+
+def test_read_started_before_a_write_is_not_stored():
+    cache = AccessRequestCache(ttl_seconds=30, max_entries=8)
+    _, generation = cache.lookup('request-1')
+    # A write lands while the read is in flight:
+    cache.store('request-1', {'access-status': 'Approved'})
+    cache.store('request-1', {'access-status': 'Pending'}, generation)
+    assert cache.lookup('request-1')[0] == {'access-status': 'Approved'}
+
+def test_read_started_before_an_invalidation_is_not_stored():
+    cache = AccessRequestCache(ttl_seconds=30, max_entries=8)
+    generation = cache.generation('request-1')
+    cache.invalidate('request-1')
+    cache.store('request-1', {'access-status': 'Pending'}, generation)
+    assert cache.lookup('request-1')[0] is None
+
+def test_read_started_after_a_write_is_stored():
+    cache = AccessRequestCache(ttl_seconds=30, max_entries=8)
+    cache.invalidate('request-1')
+    _, generation = cache.lookup('request-1')
+    cache.store('request-1', {'access-status': 'Approved'}, generation)
+    assert cache.lookup('request-1')[0] == {'access-status': 'Approved'}
+
+def test_evicting_an_entry_keeps_its_race_guard():
+    cache = AccessRequestCache(ttl_seconds=30, max_entries=2)
+    _, generation = cache.lookup('request-1')
+    cache.store('request-1', {'access-status': 'Approved'})
+    # Push the written entry out of the cache before the stale read finishes:
+    cache.store('request-2', {'access-status': 'Pending'})
+    cache.store('request-3', {'access-status': 'Pending'})
+    cache.store('request-1', {'access-status': 'Pending'}, generation)
+    assert cache.lookup('request-1')[0] is None
+
+def test_forgotten_writes_still_reject_older_reads():
+    cache = AccessRequestCache(ttl_seconds=30, max_entries=2)
+    _, generation = cache.lookup('request-1')
+    for index in range(1, 6):
+        cache.invalidate(f'request-{index}')
+    # The write bookkeeping is bounded, but the read of request-1 may still be stale:
+    assert len(cache._writes) == 2
+    cache.store('request-1', {'access-status': 'Pending'}, generation)
+    assert cache.lookup('request-1')[0] is None
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = AccessRequestCache(ttl_seconds=30, max_entries=8)
+    cache.store('request-1', {'access-status': 'Approved'})
+    clock.now += 29
+    assert cache.lookup('request-1')[0] == {'access-status': 'Approved'}
+    clock.now += 1
+    assert cache.lookup('request-1')[0] is None
+    assert cache.metrics()['entries'] == 0
+
+def test_get_item_reads_the_table_again_once_the_entry_expires(clock):
+    dynamodb_table = DynamoDB('eu-west-2', 'access-requests', cache=AccessRequestCache(ttl_seconds=30, max_entries=8))
+    expected_params = {'TableName': 'access-requests', 'Key': {'Request-ID': 'request-1'}, 'ConsistentRead': False}
+    with Stubber(dynamodb_table.dynamodb.meta.client) as stubber:
+        stubber.add_response('get_item', {'Item': {'Request-ID': {'S': 'request-1'}, 'access-status': {'S': 'Pending'}}}, expected_params)
+        stubber.add_response('get_item', {'Item': {'Request-ID': {'S': 'request-1'}, 'access-status': {'S': 'Approved'}}}, expected_params)
+        assert dynamodb_table.get_item('request-1')['access-status'] == 'Pending'
+        # Served from the cache within the TTL:
+        clock.now += 10
+        assert dynamodb_table.get_item('request-1')['access-status'] == 'Pending'
+        clock.now += 30
+        assert dynamodb_table.get_item('request-1')['access-status'] == 'Approved'
+        stubber.assert_no_pending_responses()
+
+def test_disabled_cache_stores_nothing():
+    cache = AccessRequestCache(ttl_seconds=0, max_entries=8)
+    cache.store('request-1', {'access-status': 'Approved'})
+    assert cache.lookup('request-1')[0] is None
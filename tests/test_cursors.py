@@ -0,0 +1,30 @@
+from cfi_self_service.backend.security.cursors import sign_cursor, verify_cursor
+
+POSITION = {'Request-ID': 'request-1', 'access-request-timestamp': '2024-03-01T10:00'}
+
+def test_signed_cursor_round_trips():
+    assert verify_cursor(sign_cursor(POSITION)) == POSITION
+
+def test_missing_cursor_has_no_position():
+    assert verify_cursor(None) is None
+    assert verify_cursor('') is None
+
+def test_tampered_body_is_rejected():
+    body, _, signature = sign_cursor(POSITION).partition('.')
+    tampered_body = sign_cursor({'Request-ID': 'request-2'}).partition('.')[0]
+    assert verify_cursor(f'{tampered_body}.{signature}') is None
+
+def test_tampered_signature_is_rejected():
+    body, _, signature = sign_cursor(POSITION).partition('.')
+    tampered_signature = ('0' if signature[0] != '0' else '1') + signature[1:]
+    assert verify_cursor(f'{body}.{tampered_signature}') is None
+    assert verify_cursor(body) is None
+
+def test_non_ascii_cursors_are_rejected():
+    body, _, signature = sign_cursor(POSITION).partition('.')
+    assert verify_cursor(f'{body}.{signature[:-1]}é') is None
+    assert verify_cursor(f'{body}é.{signature}') is None
+    assert verify_cursor('ü.ü') is None
+
+def test_signed_non_dict_position_is_rejected():
+    assert verify_cursor(sign_cursor(['request-1'])) is None
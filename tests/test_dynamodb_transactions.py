@@ -0,0 +1,85 @@
+import pytest
+from botocore.stub import ANY, Stubber
+from pyramid.httpexceptions import HTTPConflict, HTTPServiceUnavailable
+from cfi_self_service.backend.aws import dynamodb as dynamodb_module
+from cfi_self_service.backend.aws.dynamodb import AccessRequestCache, DynamoDB, TRANSACTION_ATTEMPTS
+
+PENDING_ITEM = {'Request-ID': 'request-1', 'access-status': 'Pending', 'access-environment': 'Test'}
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    # A table with a counts table configured, so status changes and deletes are written in transactions:
+    monkeypatch.setenv('DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME', 'access-request-counts')
+    monkeypatch.setattr(dynamodb_module.time, 'sleep', lambda seconds: None)
+    return DynamoDB('eu-west-2', 'access-requests', cache=AccessRequestCache(ttl_seconds=30, max_entries=8))
+
+@pytest.fixture
+def stubber(dynamodb_table):
+    # Stub the client shared by the table resource and transact_write, so no call reaches AWS:
+    with Stubber(dynamodb_table.dynamodb.meta.client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+def add_transaction_cancelled(stubber, *reason_codes):
+    stubber.add_client_error(
+        'transact_write_items',
+        service_error_code='TransactionCanceledException',
+        http_status_code=400,
+        modeled_fields={'CancellationReasons': [{'Code': code} for code in reason_codes]}
+    )
+
+def add_consistent_read(stubber, item):
+    stubber.add_response(
+        'get_item',
+        {'Item': {name: {'S': value} for name, value in item.items()}},
+        {'TableName': 'access-requests', 'Key': {'Request-ID': item['Request-ID']}, 'ConsistentRead': True}
+    )
+
+def test_update_access_request_retries_a_transaction_conflict(dynamodb_table, stubber):
+    # The first transaction loses to another one, so the item is read again and the update retried:
+    add_transaction_cancelled(stubber, 'TransactionConflict', 'None')
+    add_consistent_read(stubber, PENDING_ITEM)
+    stubber.add_response('transact_write_items', {}, {'TransactItems': ANY})
+    dynamodb_table.update_access_request('request-1', {'access-status': 'Approved'}, dict(PENDING_ITEM))
+    assert dynamodb_table.cache.lookup('request-1')[0] is None
+
+def test_update_access_request_retries_a_changed_item(dynamodb_table, stubber):
+    # The item changed since it was read, so the condition fails and the update is retried on the new item:
+    add_transaction_cancelled(stubber, 'ConditionalCheckFailed', 'None')
+    add_consistent_read(stubber, dict(PENDING_ITEM, **{'access-environment': 'Production'}))
+    stubber.add_response('transact_write_items', {}, {'TransactItems': ANY})
+    dynamodb_table.update_access_request('request-1', {'access-status': 'Approved'}, dict(PENDING_ITEM))
+
+def test_update_access_request_gives_up_after_repeated_conflicts(dynamodb_table, stubber):
+    add_transaction_cancelled(stubber, 'TransactionConflict', 'None')
+    for _ in range(TRANSACTION_ATTEMPTS - 1):
+        add_consistent_read(stubber, PENDING_ITEM)
+        add_transaction_cancelled(stubber, 'TransactionConflict', 'None')
+    with pytest.raises(HTTPServiceUnavailable):
+        dynamodb_table.update_access_request('request-1', {'access-status': 'Approved'}, dict(PENDING_ITEM))
+
+def test_delete_item_retries_a_transaction_conflict(dynamodb_table, stubber):
+    dynamodb_table.cache.store('request-1', PENDING_ITEM)
+    add_transaction_cancelled(stubber, 'TransactionConflict', 'None')
+    add_consistent_read(stubber, PENDING_ITEM)
+    stubber.add_response('transact_write_items', {}, {'TransactItems': ANY})
+    dynamodb_table.delete_item('request-1', dict(PENDING_ITEM))
+    assert dynamodb_table.cache.lookup('request-1')[0] is None
+
+def test_delete_item_stops_when_the_item_is_gone(dynamodb_table, stubber):
+    # Another request deleted the item first, so there is nothing left to retry:
+    add_transaction_cancelled(stubber, 'ConditionalCheckFailed', 'None')
+    stubber.add_response('get_item', {}, {'TableName': 'access-requests', 'Key': {'Request-ID': 'request-1'}, 'ConsistentRead': True})
+    dynamodb_table.delete_item('request-1', dict(PENDING_ITEM))
+
+def test_create_item_retries_a_transaction_conflict(dynamodb_table, stubber):
+    add_transaction_cancelled(stubber, 'None', 'TransactionConflict')
+    stubber.add_response('transact_write_items', {}, {'TransactItems': ANY})
+    dynamodb_table.create_item(dict(PENDING_ITEM))
+    assert dynamodb_table.cache.lookup('request-1')[0]['access-status'] == 'Pending'
+
+def test_create_item_reports_an_existing_item_as_a_conflict(dynamodb_table, stubber):
+    # An item with the same Request-ID is not retried, and is not reported as missing:
+    add_transaction_cancelled(stubber, 'ConditionalCheckFailed', 'None')
+    with pytest.raises(HTTPConflict):
+        dynamodb_table.create_item(dict(PENDING_ITEM))
@@ -0,0 +1,42 @@
+from botocore.stub import Stubber
+from cfi_self_service.backend.aws.dynamodb import AccessRequestCache, DynamoDB, access_request_update_parameters
+from cfi_self_service.scripts.setup_access_requests_table import backfill_index_attributes
+
+# An access request written before the secondary indexes existed:
+LEGACY_ITEM = {
+    'Request-ID': 'request-1',
+    'access-status': 'Approved',
+    'access-environment': 'Test',
+    'access-email-address': 'user@example.com',
+    'access-request-date': '01/02/2023 10:00',
+}
+
+def test_backfill_sets_the_status_date_of_a_legacy_item(monkeypatch):
+    monkeypatch.delenv('DYNAMO_DB_ACCESS_REQUEST_COUNTS_TABLE_NAME', raising=False)
+    dynamodb_table = DynamoDB('eu-west-2', 'access-requests', cache=AccessRequestCache(ttl_seconds=30, max_entries=8))
+    monkeypatch.setattr(dynamodb_table, 'parallel_scan', lambda **kwargs: iter([dict(LEGACY_ITEM)]))
+    with Stubber(dynamodb_table.dynamodb.meta.client) as stubber:
+        stubber.add_response('update_item', {'Attributes': {'Request-ID': {'S': 'request-1'}}}, {
+            'TableName': 'access-requests',
+            'Key': {'Request-ID': 'request-1'},
+            'UpdateExpression': 'SET #a0 = :v0, #a1 = :v1, #a2 = :v2',
+            'ExpressionAttributeNames': {'#a0': 'access-status-date', '#a1': 'access-request-timestamp', '#a2': 'record-type'},
+            'ExpressionAttributeValues': {
+                ':v0': 'Approved#2023-02-01T10:00',
+                ':v1': '2023-02-01T10:00',
+                ':v2': 'access-request'
+            },
+            'ReturnValues': 'ALL_NEW'
+        })
+        assert backfill_index_attributes(dynamodb_table) == 1
+        stubber.assert_no_pending_responses()
+
+def test_explicit_derived_attributes_are_not_derived_again():
+    # Without the rest of the item the status date cannot be derived, so the given one is kept:
+    update_parameters = access_request_update_parameters('request-1', {
+        'access-status-date': 'Approved#2023-02-01T10:00',
+        'access-request-timestamp': '2023-02-01T10:00'
+    })
+    assert 'REMOVE' not in update_parameters['UpdateExpression']
+    assert ':v0' in update_parameters['ExpressionAttributeValues']
+    assert update_parameters['ExpressionAttributeValues'][':v0'] == 'Approved#2023-02-01T10:00'
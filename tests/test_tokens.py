@@ -0,0 +1,75 @@
+import json
+import time
+import urllib.error
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from pyramid import testing
+from pyramid.httpexceptions import HTTPServiceUnavailable
+from cfi_self_service.backend.aws.cognito import Cognito
+from cfi_self_service.backend.aws.resilience import KeySetUnavailableError, aws_error_response
+from cfi_self_service.backend.security import tokens
+from cfi_self_service.backend.security.tokens import JWKS_MIN_REFRESH_INTERVAL, JWKSCache
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+class FakeResponse:
+
+    def __init__(self, document):
+        self.document = document
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def read(self, *args):
+        return json.dumps(self.document).encode('utf-8')
+
+def jwks_document(kid):
+    key = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(PRIVATE_KEY.public_key()))
+    return {'keys': [dict(key, kid=kid, alg='RS256', use='sig')]}
+
+def unreachable(*args, **kwargs):
+    raise urllib.error.URLError('timed out')
+
+def test_first_download_failing_is_transient(monkeypatch):
+    monkeypatch.setattr(tokens.urllib.request, 'urlopen', unreachable)
+    jwks_cache = JWKSCache(jwks_url='https://jwks.example/first-failure')
+    with pytest.raises(KeySetUnavailableError) as error:
+        jwks_cache.get_key('key-1')
+    # Reported as a 503, so the view does not end the session:
+    assert isinstance(aws_error_response(error.value), HTTPServiceUnavailable)
+
+def test_last_good_key_set_is_served_while_downloads_fail(monkeypatch):
+    jwks_cache = JWKSCache(jwks_url='https://jwks.example/last-good')
+    monkeypatch.setattr(tokens.urllib.request, 'urlopen', lambda *args, **kwargs: FakeResponse(jwks_document('key-1')))
+    assert jwks_cache.get_key('key-1') is not None
+    monkeypatch.setattr(tokens.urllib.request, 'urlopen', unreachable)
+    # Force the next unknown key ID to download the key set again:
+    jwks_cache._loaded_at -= JWKS_MIN_REFRESH_INTERVAL
+    with pytest.raises(KeySetUnavailableError):
+        jwks_cache.get_key('key-2')
+    assert jwks_cache.get_key('key-1') is not None
+
+def test_unknown_key_after_a_good_download_is_not_transient(monkeypatch):
+    monkeypatch.setattr(tokens.urllib.request, 'urlopen', lambda *args, **kwargs: FakeResponse(jwks_document('key-1')))
+    jwks_cache = JWKSCache(jwks_url='https://jwks.example/unknown-key')
+    assert jwks_cache.get_key('key-2') is None
+
+def test_local_authentication_does_not_log_out_when_keys_are_unavailable(monkeypatch):
+    monkeypatch.setenv('COGNITO_AUTHENTICATION_MODE', 'local')
+    monkeypatch.setenv('COGNITO_JWKS_URL', 'https://jwks.example/local-authentication')
+    monkeypatch.delenv('COGNITO_JWKS_FILE', raising=False)
+    monkeypatch.setattr(tokens.urllib.request, 'urlopen', unreachable)
+    access_token = jwt.encode(
+        {'token_use': 'access', 'client_id': 'client', 'iss': 'https://cognito-idp.eu-west-2.amazonaws.com/pool', 'exp': int(time.time()) + 300},
+        PRIVATE_KEY,
+        algorithm='RS256',
+        headers={'kid': 'key-1'}
+    )
+    request = testing.DummyRequest()
+    request.session['access_token'] = access_token
+    with pytest.raises(HTTPServiceUnavailable):
+        Cognito(client_id='client', user_pool_id='pool', region_name='eu-west-2').check_cognito_authentication(request)